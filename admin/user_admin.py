@@ -490,6 +490,53 @@ async def get_reminder_scheduler_status():
         })
 
 
+@user_admin_router.get("/vector-index/status")
+async def get_vector_index_status():
+    """Get the active vector index configuration of every shard."""
+    try:
+        from services.vector_index_maintenance import vector_index_maintainer
+        
+        shards = await vector_index_maintainer.get_configuration()
+        
+        return JSONResponse({
+            "success": True,
+            "enabled": vector_index_maintainer.enabled,
+            "shards": shards
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting vector index status: {e}")
+        return JSONResponse({
+            "success": False,
+            "error": str(e),
+            "message": "Failed to get vector index status"
+        })
+
+
+@user_admin_router.get("/vector-index/explain/{user_id}")
+async def explain_vector_search(user_id: str, limit: int = Query(10, ge=1, le=100),
+                                threshold: float = Query(0.7, description="Similarity threshold")):
+    """EXPLAIN ANALYZE the vector search for a user, using their latest embedding as the query."""
+    try:
+        from uuid import UUID
+        from services.vector_index_maintenance import vector_index_maintainer
+        
+        result = await vector_index_maintainer.explain(UUID(user_id), limit=limit, threshold=threshold)
+        
+        return JSONResponse({
+            "success": True,
+            **result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error explaining vector search for user {user_id}: {e}")
+        return JSONResponse({
+            "success": False,
+            "error": str(e),
+            "message": "Failed to explain vector search"
+        })
+
+
 @user_admin_router.get("/media-monitor/status")
 async def get_media_monitor_status():
     """Get media processing monitor status."""
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Standalone scheduler runner for the Cute WhatsApp Bot.
+Runs reminder dispatch and the media processing monitor outside the web
+server, so uvicorn workers carry no scheduler load (set
+EMBEDDED_SCHEDULERS=false for the web processes).
+
+Several instances can run at once: they split reminders between them by
+user partition using Postgres advisory locks (DATABASE_URL), and one of them
+is elected leader for the singleton jobs.
+"""
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+from typing import Optional, Set
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import settings  # noqa: E402
+from src.config.database import db_manager  # noqa: E402
+from src.services.http_clients import http_clients  # noqa: E402
+from src.services.last_seen_buffer import last_seen_buffer  # noqa: E402
+from src.services.outbound_message_writer import outbound_message_writer  # noqa: E402
+from src.services.media_monitor import MediaProcessingMonitor  # noqa: E402
+from src.services.reminder_scheduler import get_reminder_scheduler  # noqa: E402
+from src.services.scheduler_coordinator import SchedulerCoordinator  # noqa: E402
+from src.utils.logger import setup_application_logging  # noqa: E402
+
+logger = logging.getLogger("run_scheduler")
+
+
+class SchedulerRuntime:
+    """Owns the scheduler services of one worker process."""
+
+    def __init__(self):
+        self.reminder_scheduler = None
+        self.media_monitor: Optional[MediaProcessingMonitor] = None
+        self.coordinator = SchedulerCoordinator(on_change=self.on_partitions_changed)
+        self._stopping = asyncio.Event()
+
+    async def on_partitions_changed(self, owned_buckets: Optional[Set[int]], is_leader: bool):
+        """Apply a new partition assignment; the leader also runs the media monitor."""
+        await self.reminder_scheduler.set_partitions(owned_buckets, is_leader)
+
+        if is_leader and self.media_monitor is None:
+            self.media_monitor = MediaProcessingMonitor(self.reminder_scheduler.db_service)
+            await self.media_monitor.start()
+        elif not is_leader and self.media_monitor is not None:
+            await self.media_monitor.stop()
+            self.media_monitor = None
+
+    async def run(self):
+        await http_clients.start()
+        await db_manager.setup_database()
+        await last_seen_buffer.start()
+        await outbound_message_writer.start()
+
+        self.reminder_scheduler = await get_reminder_scheduler()
+        # Claim partitions before the first load so only owned reminders are queued
+        await self.coordinator.start()
+        await self.reminder_scheduler.start()
+        logger.info(f"Scheduler worker started: {self.coordinator.get_status()}")
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.scheduler_rebalance_interval_seconds)
+            except asyncio.TimeoutError:
+                await self.coordinator.rebalance()
+
+        await self.shutdown()
+
+    def request_stop(self):
+        self._stopping.set()
+
+    async def shutdown(self):
+        logger.info("Stopping scheduler worker...")
+        try:
+            await self.reminder_scheduler.stop()
+            if self.media_monitor is not None:
+                await self.media_monitor.stop()
+        finally:
+            # Releasing the locks lets the remaining instances take over right away
+            await self.coordinator.stop()
+            await last_seen_buffer.stop()
+            await outbound_message_writer.stop()
+            db_manager.shutdown()
+            await http_clients.close()
+        logger.info("Scheduler worker stopped")
+
+
+async def main():
+    setup_application_logging()
+    runtime = SchedulerRuntime()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, runtime.request_stop)
+        except NotImplementedError:  # Windows
+            signal.signal(sig, lambda *_: runtime.request_stop())
+
+    await runtime.run()
+
+
+if __name__ == "__main__":
+    print("⏰ Starting Cute WhatsApp Bot scheduler worker...")
+    print(f"🧩 Partitions: {settings.scheduler_partitions}, rebalance every {settings.scheduler_rebalance_interval_seconds}s")
+    print("=" * 50)
+    asyncio.run(main())
@@ -0,0 +1,249 @@
+"""
+Response cache for chat completions.
+Users send the same requests over and over ("remind me to take meds at 9"
+every day), so completions are cached per prompt type, keyed on the
+normalised message plus the context the answer depends on (timezone, date
+or hour bucket, the user's tags). Two tiers:
+
+- exact: hash of the normalised key, LRU with TTL
+- semantic: for prompt types where near-duplicates share an answer
+  (classification, search intent, tag suggestions), the nearest cached
+  message by embedding cosine similarity within the same context
+
+Extraction prompts only use the exact tier, since "call John at 5" and
+"call John at 6" embed almost identically. Messages with times relative to
+now ("in 20 minutes") are never cached.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Answers that depend on the exact moment the message was sent
+_RELATIVE_TIME_RE = re.compile(
+    r"\b(in|after|within)\s+(a|an|one|half\s+an?|\d+|a\s+few|few|couple(\s+of)?)\s*"
+    r"(min(ute)?s?|hours?|hrs?|h|secs?|seconds?)\b|\bright\s+now\b|\bfrom\s+now\b",
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class PromptPolicy:
+    """How one prompt type is cached."""
+    semantic: bool = False
+    skip_relative_times: bool = False
+
+
+PROMPT_POLICIES: Dict[str, PromptPolicy] = {
+    "classification": PromptPolicy(semantic=True),
+    "classify_and_extract": PromptPolicy(skip_relative_times=True),
+    "suggest_tags": PromptPolicy(semantic=True),
+    "search_intent": PromptPolicy(semantic=True),
+    "reminder_extraction": PromptPolicy(skip_relative_times=True),
+    "birthday_extraction": PromptPolicy(),
+}
+
+# Completion text, prompt tokens, completion tokens
+CompletionResult = Tuple[Optional[str], int, int]
+
+
+@dataclass
+class _CachedCompletion:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    seconds: float
+
+
+def normalize_content(content: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return " ".join(content.lower().split()).rstrip(" .!?")
+
+
+class CompletionCache:
+    """Exact and embedding-similarity cache in front of chat completions."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        similarity_threshold: Optional[float] = None,
+        embed: Optional[Callable[[str], Awaitable[Optional[List[float]]]]] = None
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Completions kept in the exact tier
+            ttl_seconds: How long a cached completion is reused
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            embed: Coroutine returning an embedding for a text (defaults to the OpenAI embedding service)
+        """
+        self.enabled = settings.llm_cache_enabled
+        self.similarity_threshold = similarity_threshold or settings.llm_cache_similarity_threshold
+        self._entries = TTLCache(
+            max_entries=max_entries or settings.llm_cache_max_entries,
+            ttl_seconds=ttl_seconds or settings.llm_cache_ttl_seconds
+        )
+        # Semantic tier: context namespace -> cache key -> unit vector
+        self._vectors: "OrderedDict[str, OrderedDict[str, np.ndarray]]" = OrderedDict()
+        self._embed = embed
+        self._embedding_service = None
+
+        # Per prompt type counters
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    async def get_or_create(
+        self,
+        prompt_type: str,
+        content: str,
+        context: Optional[Dict[str, Any]],
+        create: Callable[[], Awaitable[CompletionResult]]
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Return a cached completion or call create() and cache its result.
+
+        Args:
+            prompt_type: Prompt family (see PROMPT_POLICIES)
+            content: The user text the prompt is about
+            context: Everything else the answer depends on (timezone, date bucket, ...)
+            create: Coroutine making the real API call
+
+        Returns:
+            Tuple of (completion text, whether it was served from the cache)
+        """
+        policy = PROMPT_POLICIES.get(prompt_type, PromptPolicy())
+        stats = self._stats_for(prompt_type)
+        normalized = normalize_content(content or "")
+        if (not self.enabled or not normalized
+                or (policy.skip_relative_times and _RELATIVE_TIME_RE.search(normalized))):
+            stats["bypassed"] += 1
+            return (await self._timed_create(create))[0], False
+
+        namespace = json.dumps([prompt_type, context or {}], sort_keys=True, default=str)
+        key = hashlib.sha256(f"{namespace}\n{normalized}".encode("utf-8")).hexdigest()
+
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._record_hit(stats, "exact_hits", cached)
+            return cached.text, True
+
+        vector = None
+        if policy.semantic:
+            vector = await self._embedding(normalized)
+            if vector is not None:
+                cached = self._nearest(namespace, vector)
+                if cached is not None:
+                    self._record_hit(stats, "semantic_hits", cached)
+                    return cached.text, True
+
+        stats["misses"] += 1
+        text, entry = await self._timed_create(create)
+        if entry is not None:
+            self._entries.set(key, entry)
+            if vector is not None:
+                self._remember_vector(namespace, key, vector)
+        return text, False
+
+    async def _timed_create(self, create) -> Tuple[Optional[str], Optional[_CachedCompletion]]:
+        started = time.perf_counter()
+        text, prompt_tokens, completion_tokens = await create()
+        if not text:
+            return text, None  # Errors and empty answers are never cached
+        return text, _CachedCompletion(text, prompt_tokens, completion_tokens, time.perf_counter() - started)
+
+    async def _embedding(self, text: str) -> Optional[np.ndarray]:
+        """Unit-length embedding, or None if embeddings are unavailable."""
+        try:
+            if self._embed is None:
+                from src.ai.embeddings import EmbeddingService
+                if self._embedding_service is None:
+                    self._embedding_service = EmbeddingService()
+                embedding = await self._embedding_service.create_embedding(text)
+            else:
+                embedding = await self._embed(text)
+        except Exception as e:
+            logger.debug(f"Completion cache embedding failed: {e}")
+            return None
+        if not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _nearest(self, namespace: str, vector: np.ndarray) -> Optional[_CachedCompletion]:
+        """Most similar live entry in the namespace above the similarity threshold."""
+        vectors = self._vectors.get(namespace)
+        if not vectors:
+            return None
+        self._vectors.move_to_end(namespace)
+
+        keys = list(vectors)
+        similarities = np.stack([vectors[key] for key in keys]) @ vector
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < self.similarity_threshold:
+                return None
+            cached = self._entries.get(keys[index])
+            if cached is not None:
+                vectors.move_to_end(keys[index])
+                return cached
+            del vectors[keys[index]]  # Expired or evicted from the exact tier
+        return None
+
+    def _remember_vector(self, namespace: str, key: str, vector: np.ndarray):
+        vectors = self._vectors.setdefault(namespace, OrderedDict())
+        self._vectors.move_to_end(namespace)
+        vectors[key] = vector
+        while len(vectors) > settings.llm_cache_semantic_entries_per_context:
+            vectors.popitem(last=False)
+        while len(self._vectors) > settings.llm_cache_semantic_contexts:
+            self._vectors.popitem(last=False)
+
+    def _stats_for(self, prompt_type: str) -> Dict[str, float]:
+        if prompt_type not in self._stats:
+            self._stats[prompt_type] = {
+                "exact_hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0,
+                "tokens_saved": 0, "cost_saved_usd": 0.0, "seconds_saved": 0.0
+            }
+        return self._stats[prompt_type]
+
+    def _record_hit(self, stats: Dict[str, float], tier: str, cached: _CachedCompletion):
+        stats[tier] += 1
+        stats["tokens_saved"] += cached.prompt_tokens + cached.completion_tokens
+        stats["cost_saved_usd"] += (cached.prompt_tokens * settings.openai_input_cost_per_million
+                                    + cached.completion_tokens * settings.openai_output_cost_per_million) / 1_000_000
+        stats["seconds_saved"] += cached.seconds
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get cache size and per prompt type hit rates and savings."""
+        prompt_types = {}
+        for prompt_type, stats in self._stats.items():
+            hits = stats["exact_hits"] + stats["semantic_hits"]
+            lookups = hits + stats["misses"]
+            prompt_types[prompt_type] = {
+                **{name: value for name, value in stats.items() if name not in ("cost_saved_usd", "seconds_saved")},
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "cost_saved_usd": round(stats["cost_saved_usd"], 4),
+                "seconds_saved": round(stats["seconds_saved"], 1)
+            }
+        return {
+            "enabled": self.enabled,
+            "entries": self._entries.stats(),
+            "semantic_contexts": len(self._vectors),
+            "similarity_threshold": self.similarity_threshold,
+            "prompt_types": prompt_types
+        }
+
+
+# Global completion cache instance
+completion_cache = CompletionCache()
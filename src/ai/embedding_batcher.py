@@ -0,0 +1,226 @@
+"""
+Micro-batching for OpenAI embedding requests.
+Every note and brain-dump item is embedded on the hot path. Instead of one
+embeddings.create call per text, concurrent requests are collected for a
+few milliseconds (or until a batch is full) and sent as one call; each
+caller awaits its own future. Inputs are truncated to the model's token
+limit with tiktoken, and batches are split so a request never exceeds the
+per-request token budget.
+
+The tiktoken encoding downloads its BPE file on first use, so it is loaded
+in a worker thread (start() at startup). Until it is available, input is
+measured at ~4 characters per token and the load is retried with a backoff.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from src.config.database import run_blocking
+from src.config.settings import settings
+from src.utils.vectors import Embedding, to_embedding
+
+logger = logging.getLogger(__name__)
+
+# text-embedding-3-* limits
+MAX_INPUT_TOKENS = 8191
+MAX_REQUEST_TOKENS = 300_000
+# Wait between attempts to load the tiktoken encoding
+ENCODING_RETRY_SECONDS = 300
+
+
+def _load_tiktoken_encoding(model: str):
+    """Blocking: the first call for an encoding downloads it."""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched API calls."""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_concurrent_requests: Optional[int] = None
+    ):
+        self.model = model or settings.openai_embedding_model
+        self.max_batch_size = max_batch_size or settings.embedding_batch_max_size
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.embedding_batch_wait_ms) / 1000
+        self.max_concurrent_requests = max_concurrent_requests or settings.embedding_max_concurrent_requests
+        self._client: Optional[AsyncOpenAI] = None
+        self._encoding = None
+        self._encoding_task: Optional[asyncio.Task] = None
+        self._encoding_attempted_at: Optional[float] = None
+        self._encoding_error: Optional[str] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set = set()
+
+        # Metrics
+        self._requests = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._truncated = 0
+        self._tokens = 0
+        self._largest_batch = 0
+        self._api_seconds = 0.0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, created on first use."""
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    async def start(self):
+        """Load the tokenizer off the event loop; later loads retry in the background."""
+        if self._encoding is None:
+            await self._load_encoding_once()
+
+    async def embed(self, text: str) -> Optional[Embedding]:
+        """
+        Embed one text as part of the next batch.
+
+        Returns:
+            The embedding as array('f'), or None for empty text or on error
+        """
+        if not text or not text.strip():
+            logger.warning("Empty text provided for embedding")
+            return None
+
+        clean_text, tokens = self._truncate(text.strip())
+        if self._pending and self._pending_tokens + tokens > MAX_REQUEST_TOKENS:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((clean_text, future))
+        self._pending_tokens += tokens
+        self._requests += 1
+        self._tokens += tokens
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[Optional[Embedding]]:
+        """Embed several texts; they share batches with every other caller."""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _truncate(self, text: str) -> Tuple[str, int]:
+        """Cut text to the model's input limit; returns (text, token count)."""
+        encoding = self._get_encoding()
+        if encoding is None:
+            # Without tiktoken assume ~4 characters per token
+            if len(text) > MAX_INPUT_TOKENS * 4:
+                self._truncated += 1
+                text = text[:MAX_INPUT_TOKENS * 4]
+            return text, len(text) // 4 + 1
+
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) > MAX_INPUT_TOKENS:
+            self._truncated += 1
+            tokens = tokens[:MAX_INPUT_TOKENS]
+            text = encoding.decode(tokens)
+        return text, len(tokens)
+
+    def _get_encoding(self):
+        """The loaded encoding, or None (starting a background load when one is due)."""
+        if self._encoding is None and self._encoding_task is None and (
+            self._encoding_attempted_at is None
+            or time.monotonic() - self._encoding_attempted_at >= ENCODING_RETRY_SECONDS
+        ):
+            self._encoding_task = asyncio.create_task(self._load_encoding_once())
+        return self._encoding
+
+    async def _load_encoding_once(self):
+        if self._encoding_task is not None and self._encoding_task is not asyncio.current_task():
+            await self._encoding_task
+            return
+        self._encoding_attempted_at = time.monotonic()
+        try:
+            self._encoding = await run_blocking(_load_tiktoken_encoding, self.model)
+            self._encoding_error = None
+            logger.info(f"Loaded tiktoken encoding {self._encoding.name} for {self.model}")
+        except Exception as e:
+            self._encoding_error = str(e)
+            logger.warning(f"tiktoken unavailable, truncating embedding input by length "
+                           f"(retrying in {ENCODING_RETRY_SECONDS}s): {e}")
+        finally:
+            self._encoding_task = None
+
+    def _flush(self):
+        """Send everything pending as one request."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self.client.embeddings.create(
+                    model=self.model,
+                    input=[text for text, _ in batch],
+                    encoding_format="base64"  # Raw float32 bytes instead of JSON floats
+                )
+                embeddings: List[Optional[Embedding]] = [None] * len(batch)
+                for item in response.data:
+                    embeddings[item.index] = to_embedding(item.embedding)
+            except Exception as e:
+                self._failed_batches += 1
+                logger.error(f"Error creating batch of {len(batch)} embeddings: {e}")
+                embeddings = [None] * len(batch)
+            finally:
+                self._api_seconds += time.perf_counter() - started
+
+        self._batches += 1
+        self._largest_batch = max(self._largest_batch, len(batch))
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():  # The caller may have been cancelled
+                future.set_result(embedding)
+        logger.debug(f"Created {len(batch)} embeddings in one request")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get batching metrics."""
+        return {
+            "model": self.model,
+            "requests": self._requests,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "average_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._in_flight),
+            "tokenizer": self._encoding.name if self._encoding is not None else "length estimate",
+            "tokenizer_error": self._encoding_error,
+            "truncated_inputs": self._truncated,
+            "tokens": self._tokens,
+            "average_request_ms": round(self._api_seconds / self._batches * 1000, 1) if self._batches else 0.0
+        }
+
+
+# Global embedding batcher instance
+embedding_batcher = EmbeddingBatcher()
@@ -0,0 +1,249 @@
+"""
+Cache of query embeddings.
+Users repeat the same searches ("groceries", "#work", "ideas"), and each one
+used to be embedded again. Short texts are cached by normalised text and
+model in two tiers:
+
+- memory: LRU with TTL of float32 vectors
+- disk: a fixed-size table of float16 vectors in an np.memmap, with a
+  parallel memmap of (key hash, written-at) slots as the index, so the
+  cache survives restarts without paying for the same embeddings again
+
+float16 halves the disk footprint; the rounding error (~1e-3 relative) is
+far below what changes a cosine ranking.
+
+Several processes (uvicorn workers, run_scheduler.py) share the disk files.
+A key can only live in a small window of slots derived from its hash, so
+every process finds entries the others wrote by probing that window, and a
+write replaces the matching, empty or oldest slot in it. Reads take a
+shared fcntl lock and writes an exclusive one; both run in the worker
+thread pool so lock contention never stalls the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from src.config.database import run_blocking
+from src.config.settings import settings
+from src.utils.ttl_cache import TTLCache
+from src.utils.vectors import Embedding
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_INDEX_DTYPE = np.dtype([("key", "S16"), ("written_at", "<f8")])
+# Slots a key may occupy, starting at its hash
+_PROBE_SLOTS = 8
+
+
+def cache_key(model: str, text: str) -> bytes:
+    """16-byte hash of the model and the normalised text."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).digest()[:16]
+
+
+class EmbeddingCache:
+    """LRU+TTL embedding cache backed by a shared float16 memmap on disk."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        disk_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        dimensions: Optional[int] = None
+    ):
+        """Initialize the cache; the disk tier is opened on first use.
+
+        Args:
+            path: File prefix of the disk tier ("" keeps the cache in memory only)
+            max_entries: Vectors kept in memory
+            disk_entries: Slots in the disk table
+            ttl_seconds: How long a cached embedding is reused
+            dimensions: Embedding dimensions
+        """
+        self.path = path if path is not None else settings.query_embedding_cache_path
+        self.disk_entries = disk_entries or settings.query_embedding_cache_disk_entries
+        self.ttl_seconds = ttl_seconds or settings.query_embedding_cache_ttl_seconds
+        self.dimensions = dimensions or settings.vector_dimensions
+        self._memory = TTLCache(max_entries or settings.query_embedding_cache_max_entries, self.ttl_seconds)
+
+        self._vectors: Optional[np.memmap] = None
+        self._index: Optional[np.memmap] = None
+        self._lock_file = None
+        # Serialises this process's worker threads; fcntl locks only exclude other processes
+        self._disk_lock = threading.Lock()
+        self._disk_failed = False
+        self._unflushed = 0
+        self._writes: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, model: str, text: str) -> Optional[Embedding]:
+        """Cached embedding of text, or None."""
+        key = cache_key(model, text)
+        vector = self._memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return array("f", vector.tobytes())
+
+        vector = await run_blocking(self._read_disk, key) if self.path and not self._disk_failed else None
+        if vector is not None:
+            self.disk_hits += 1
+            self._memory.set(key, vector)
+            return array("f", vector.tobytes())
+
+        self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, embedding: Sequence[float]):
+        """Cache an embedding in memory now and on disk in the background."""
+        if len(embedding) != self.dimensions:
+            return
+        key = cache_key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._memory.set(key, vector)
+        if not self.path or self._disk_failed:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(run_blocking(self._write_disk, key, vector))
+        except RuntimeError:
+            self._write_disk(key, vector)  # No event loop (scripts)
+            return
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    # Disk tier (runs in worker threads)
+    def _open(self) -> bool:
+        if self._vectors is not None:
+            return True
+        if self._disk_failed or not self.path:
+            return False
+        if not FCNTL_AVAILABLE:
+            self._disk_failed = True
+            logger.warning("Query embedding disk cache needs fcntl file locks, using memory only")
+            return False
+        try:
+            prefix = Path(self.path)
+            prefix.parent.mkdir(parents=True, exist_ok=True)
+            # The shape is part of the name, so differently configured processes never share a file
+            stem = f"{prefix.name}.{self.dimensions}x{self.disk_entries}"
+            vectors_path = prefix.with_name(stem + ".f16")
+            index_path = prefix.with_name(stem + ".idx")
+            self._lock_file = open(prefix.with_name(stem + ".lock"), "a+b")
+
+            with self._locked(fcntl.LOCK_EX):
+                # Checked under the lock, so a file another process has open is never re-created
+                fresh = not (vectors_path.exists() and index_path.exists()
+                             and vectors_path.stat().st_size == self.disk_entries * self.dimensions * 2
+                             and index_path.stat().st_size == self.disk_entries * _INDEX_DTYPE.itemsize)
+                mode = "w+" if fresh else "r+"
+                self._vectors = np.memmap(vectors_path, dtype=np.float16, mode=mode,
+                                          shape=(self.disk_entries, self.dimensions))
+                self._index = np.memmap(index_path, dtype=_INDEX_DTYPE, mode=mode, shape=(self.disk_entries,))
+            logger.info(f"Opened query embedding disk cache {vectors_path}")
+            return True
+        except Exception as e:
+            self._disk_failed = True
+            self._vectors = self._index = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            logger.warning(f"Query embedding disk cache unavailable, using memory only: {e}")
+            return False
+
+    @contextmanager
+    def _locked(self, operation: int):
+        fcntl.flock(self._lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _probe(self, key: bytes) -> List[int]:
+        """Slots the key may occupy; the same in every process."""
+        home = int.from_bytes(key[:8], "little") % self.disk_entries
+        return [(home + i) % self.disk_entries for i in range(min(_PROBE_SLOTS, self.disk_entries))]
+
+    def _read_disk(self, key: bytes) -> Optional[np.ndarray]:
+        with self._disk_lock:
+            if not self._open():
+                return None
+            slots = self._probe(key)
+            with self._locked(fcntl.LOCK_SH):
+                entries = self._index[slots]
+                # np.bytes_ on both sides, as S16 fields drop trailing NUL bytes
+                current = (entries["key"] == np.bytes_(key)) & (entries["written_at"] > time.time() - self.ttl_seconds)
+                hits = np.flatnonzero(current)
+                if not len(hits):
+                    return None
+                return np.array(self._vectors[slots[hits[0]]], dtype=np.float32)
+
+    def _write_disk(self, key: bytes, vector: np.ndarray):
+        try:
+            with self._disk_lock:
+                if not self._open():
+                    return
+                slots = self._probe(key)
+                with self._locked(fcntl.LOCK_EX):
+                    entries = self._index[slots]
+                    matches = np.flatnonzero(entries["key"] == np.bytes_(key))
+                    # Same key, else an empty slot (written_at 0) or the oldest one
+                    slot = slots[matches[0]] if len(matches) else slots[int(np.argmin(entries["written_at"]))]
+                    self._vectors[slot] = vector.astype(np.float16)
+                    self._index[slot] = (key, time.time())
+                self._unflushed += 1
+                if self._unflushed >= settings.query_embedding_cache_flush_every:
+                    self._flush_disk()
+        except Exception as e:
+            logger.warning(f"Error writing query embedding to disk cache: {e}")
+
+    def _flush_disk(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._index.flush()
+            self._unflushed = 0
+
+    def flush(self):
+        """Write dirty pages of the disk tier to the file."""
+        with self._disk_lock:
+            self._flush_disk()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get hit rates and memory / disk footprint."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        memory_entries = len(self._memory)
+        disk_open = self._index is not None
+        return {
+            "memory_entries": memory_entries,
+            "memory_bytes": memory_entries * self.dimensions * 4,
+            "disk_entries": (int(np.count_nonzero(self._index["written_at"] > time.time() - self.ttl_seconds))
+                             if disk_open else 0),
+            "disk_bytes": self.disk_entries * (self.dimensions * 2 + _INDEX_DTYPE.itemsize) if disk_open else 0,
+            "pending_disk_writes": len(self._writes),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+        }
+
+
+# Global query embedding cache instance
+query_embedding_cache = EmbeddingCache()
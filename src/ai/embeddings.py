@@ -1,10 +1,15 @@
 """
 AI service for creating vector embeddings using OpenAI.
+Requests go through the shared embedding batcher, so embeddings created
+concurrently from different places share one API call. Short texts such as
+search queries are served from the query embedding cache when possible.
 """
 import logging
 from typing import List, Optional
-from openai import AsyncOpenAI
+from src.ai.embedding_batcher import embedding_batcher
+from src.ai.embedding_cache import query_embedding_cache
 from src.config.settings import settings
+from src.utils.vectors import Embedding
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +18,11 @@ class EmbeddingService:
     """Service for creating vector embeddings using OpenAI."""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
-        self.model = "text-embedding-3-small"  # 1536 dimensions
+        self.batcher = embedding_batcher
+        self.cache = query_embedding_cache
+        self.model = embedding_batcher.model  # text-embedding-3-small: 1536 dimensions
     
-    async def create_embedding(self, text: str) -> Optional[List[float]]:
+    async def create_embedding(self, text: str) -> Optional[Embedding]:
         """
         Create a vector embedding for the given text.
         
@@ -24,33 +30,27 @@ class EmbeddingService:
             text: Text content to embed
             
         Returns:
-            List of floats representing the embedding vector, or None on error
+            The embedding vector as array('f'), or None on error
         """
         try:
-            if not text or not text.strip():
-                logger.warning("Empty text provided for embedding")
-                return None
-                
-            # Clean the text
-            clean_text = text.strip()
-            if len(clean_text) > 8192:  # OpenAI's token limit
-                clean_text = clean_text[:8192]
-                
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=clean_text,
-                encoding_format="float"
-            )
+            cacheable = bool(text) and len(text) <= settings.query_embedding_cache_max_chars
+            if cacheable:
+                embedding = await self.cache.get(self.model, text)
+                if embedding is not None:
+                    return embedding
             
-            embedding = response.data[0].embedding
-            logger.debug(f"Created embedding with {len(embedding)} dimensions")
+            embedding = await self.batcher.embed(text)
+            if embedding is not None:
+                logger.debug(f"Created embedding with {len(embedding)} dimensions")
+                if cacheable:
+                    self.cache.set(self.model, text, embedding)
             return embedding
             
         except Exception as e:
             logger.error(f"Error creating embedding: {e}")
             return None
     
-    async def create_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+    async def create_embeddings_batch(self, texts: List[str]) -> List[Optional[Embedding]]:
         """
         Create embeddings for multiple texts in a batch (more efficient).
         
@@ -58,35 +58,14 @@ class EmbeddingService:
             texts: List of text content to embed
             
         Returns:
-            List of embedding vectors (or None for failures)
+            List of embedding vectors (or None for failures and empty texts)
         """
         try:
             if not texts:
                 return []
                 
-            # Clean texts and limit length
-            clean_texts = []
-            for text in texts:
-                if text and text.strip():
-                    clean_text = text.strip()
-                    if len(clean_text) > 8192:
-                        clean_text = clean_text[:8192]
-                    clean_texts.append(clean_text)
-                else:
-                    clean_texts.append("")
-                    
-            if not any(clean_texts):
-                logger.warning("No valid texts provided for batch embedding")
-                return [None] * len(texts)
-                
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=clean_texts,
-                encoding_format="float"
-            )
-            
-            embeddings = [data.embedding if data else None for data in response.data]
-            logger.debug(f"Created {len(embeddings)} embeddings in batch")
+            embeddings = await self.batcher.embed_many(texts)
+            logger.debug(f"Created {sum(e is not None for e in embeddings)} embeddings in batch")
             return embeddings
             
         except Exception as e:
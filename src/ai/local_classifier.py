@@ -0,0 +1,322 @@
+"""
+Local fast path for message classification.
+Obvious messages never need a GPT round-trip: "remind me ..." phrases,
+birthday statements with a date and bare links are matched by deterministic
+rules, and everything else is scored by a small TF-IDF + logistic regression
+model trained on the classifications GPT made before. Only messages the
+local tiers aren't confident about are escalated to the LLM.
+
+Every LLM classification is appended to a JSONL log, which is the training
+set for the model (see train_classifier.py).
+"""
+import json
+import logging
+import logging.handlers
+import math
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+from src.models.message_types import ClassificationResult
+
+logger = logging.getLogger(__name__)
+
+LABELS = ["note", "reminder", "birthday"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_HASHTAG_RE = re.compile(r"#(\w+)")
+_URL_ONLY_RE = re.compile(r"^\s*(https?://\S+|www\.\S+)(\s+(https?://\S+|www\.\S+|#\w+))*\s*$", re.IGNORECASE)
+_REMINDER_RE = re.compile(
+    r"^\s*(please\s+|pls\s+|hey\s+)?(remind\s+me\b|set\s+(a\s+)?reminder\b|reminder\s*:|don'?t\s+let\s+me\s+forget\b)",
+    re.IGNORECASE
+)
+_MONTH = (r"(jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|"
+          r"sep(t(ember)?)?|oct(ober)?|nov(ember)?|dec(ember)?)")
+_DAY = r"\d{1,2}(st|nd|rd|th)?"
+_BIRTHDAY_RE = re.compile(
+    r"\b(birthday|bday|b-day)\s*(is|=|:|-|falls)?\s*(on\s+)?(the\s+)?"
+    rf"({_DAY}\s+(of\s+)?{_MONTH}\b|{_MONTH}\s+{_DAY}\b|\d{{1,2}}[/.-]\d{{1,2}}\b)",
+    re.IGNORECASE
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams and bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _extract_tags(content: str) -> List[str]:
+    return [tag.lower() for tag in _HASHTAG_RE.findall(content)]
+
+
+class TfidfLogisticModel:
+    """Multinomial logistic regression over L2-normalised TF-IDF features (numpy only)."""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, weights: np.ndarray,
+                 bias: np.ndarray, labels: List[str]):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights  # (features, classes)
+        self.bias = bias
+        self.labels = labels
+
+    @classmethod
+    def fit(cls, texts: List[str], labels: List[str], max_features: int = 20000, min_df: int = 2,
+            epochs: int = 40, learning_rate: float = 5.0, l2: float = 1e-4,
+            batch_size: int = 256, seed: int = 42) -> "TfidfLogisticModel":
+        """Train on labelled texts with mini-batch gradient descent."""
+        label_names = sorted(set(labels))
+        doc_tokens = [tokenize(text) for text in texts]
+
+        document_frequency = Counter(token for tokens in doc_tokens for token in set(tokens))
+        common = [token for token, df in document_frequency.most_common() if df >= min_df][:max_features]
+        vocabulary = {token: i for i, token in enumerate(common)}
+        idf = np.array([math.log((1 + len(texts)) / (1 + document_frequency[token])) + 1 for token in common],
+                       dtype=np.float32)
+
+        model = cls(vocabulary, idf, np.zeros((len(vocabulary), len(label_names)), dtype=np.float32),
+                    np.zeros(len(label_names), dtype=np.float32), label_names)
+        rows = [model._features(tokens) for tokens in doc_tokens]
+        targets = np.array([label_names.index(label) for label in labels])
+
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(rows))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                x = np.zeros((len(batch), len(vocabulary)), dtype=np.float32)
+                for i, row in enumerate(batch):
+                    indices, values = rows[row]
+                    x[i, indices] = values
+                probabilities = _softmax(x @ model.weights + model.bias)
+                probabilities[np.arange(len(batch)), targets[batch]] -= 1.0
+                model.weights -= learning_rate * (x.T @ probabilities / len(batch) + l2 * model.weights)
+                model.bias -= learning_rate * probabilities.mean(axis=0)
+        return model
+
+    def _features(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse TF-IDF vector as (indices, values)."""
+        counts = Counter(self.vocabulary[token] for token in tokens if token in self.vocabulary)
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts)) * self.idf[indices]
+        return indices, values / np.linalg.norm(values)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely label and its probability."""
+        indices, values = self._features(tokenize(text))
+        probabilities = _softmax((values @ self.weights[indices] + self.bias)[None, :])[0]
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tokens = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(path, tokens=np.array(tokens), idf=self.idf, weights=self.weights,
+                            bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfLogisticModel":
+        data = np.load(path, allow_pickle=False)
+        vocabulary = {str(token): i for i, token in enumerate(data["tokens"])}
+        return cls(vocabulary, data["idf"], data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_training_examples(path: str, min_confidence: float = 0.8) -> Tuple[List[str], List[str]]:
+    """Read confident LLM classifications from the JSONL log, keeping the latest label per text."""
+    examples: Dict[str, str] = {}
+    with open(path, encoding="utf-8") as log_file:
+        for line in log_file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("label") in LABELS and float(entry.get("confidence", 0)) >= min_confidence and entry.get("text"):
+                examples[entry["text"]] = entry["label"]
+    return list(examples), list(examples.values())
+
+
+class LocalClassifier:
+    """Rules first, then the local model; returns None when the LLM should decide."""
+
+    def __init__(self, model_path: Optional[str] = None, threshold: Optional[float] = None):
+        self.model_path = model_path or settings.local_classifier_model_path
+        self.threshold = threshold or settings.local_classifier_threshold
+        self.enabled = settings.local_classifier_enabled
+        self._model: Optional[TfidfLogisticModel] = None
+        self._model_loaded = False
+        self._example_logger: Optional[logging.Logger] = None
+
+        # Metrics
+        self._rule_hits: Counter = Counter()
+        self._model_hits: Counter = Counter()
+        self._escalated = 0
+        self._local_seconds = 0.0
+        self._llm_calls = 0
+        self._llm_seconds = 0.0
+
+    @property
+    def model(self) -> Optional[TfidfLogisticModel]:
+        """Trained model, loaded on first use (None until one has been trained)."""
+        if not self._model_loaded:
+            self._model_loaded = True
+            if os.path.exists(self.model_path):
+                try:
+                    self._model = TfidfLogisticModel.load(self.model_path)
+                    logger.info(f"Loaded local classifier with {len(self._model.vocabulary)} features from {self.model_path}")
+                except Exception as e:
+                    logger.error(f"Error loading local classifier from {self.model_path}: {e}")
+        return self._model
+
+    def classify(self, content: str) -> Optional[ClassificationResult]:
+        """Classify locally, or return None to escalate to the LLM."""
+        if not self.enabled:
+            return None
+
+        started = time.perf_counter()
+        try:
+            rule = self._match_rules(content)
+            if rule is not None:
+                self._rule_hits[rule.message_type] += 1
+                return rule
+
+            if self.model is not None:
+                label, probability = self.model.predict(content)
+                if probability >= self.threshold:
+                    self._model_hits[label] += 1
+                    return self._result(label, probability, content)
+
+            self._escalated += 1
+            return None
+        finally:
+            self._local_seconds += time.perf_counter() - started
+
+    def _match_rules(self, content: str) -> Optional[ClassificationResult]:
+        if _REMINDER_RE.search(content):
+            return self._result("reminder", 0.95, content)
+        if _BIRTHDAY_RE.search(content):
+            return self._result("birthday", 0.9, content)
+        if _URL_ONLY_RE.match(content):
+            return self._result("note", 0.95, content)
+        return None
+
+    def _result(self, label: str, confidence: float, content: str) -> ClassificationResult:
+        tags = _extract_tags(content)
+        extracted_data = {"content": content} if label == "note" else {"title": content}
+        return ClassificationResult(
+            message_type=label,
+            confidence=confidence,
+            extracted_data=extracted_data,
+            suggested_tags=tags,
+            requires_followup=False
+        )
+
+    def record_llm_classification(self, content: str, result: ClassificationResult, seconds: float):
+        """Track LLM latency and log the result as a training example."""
+        self._llm_calls += 1
+        self._llm_seconds += seconds
+        if result.message_type not in LABELS or not content.strip():
+            return
+        try:
+            self._get_example_logger().info(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "text": content,
+                "label": result.message_type,
+                "confidence": result.confidence
+            }))
+        except Exception as e:
+            logger.debug(f"Could not log classification example: {e}")
+
+    def _get_example_logger(self) -> logging.Logger:
+        if self._example_logger is None:
+            os.makedirs(os.path.dirname(settings.classification_log_path) or ".", exist_ok=True)
+            example_logger = logging.getLogger("classification_examples")
+            example_logger.setLevel(logging.INFO)
+            if not example_logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    settings.classification_log_path,
+                    maxBytes=50*1024*1024,  # 50MB
+                    backupCount=5,
+                    encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                example_logger.addHandler(handler)
+                example_logger.propagate = False
+            self._example_logger = example_logger
+        return self._example_logger
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the share of messages resolved locally and the latency saved."""
+        rule_hits = sum(self._rule_hits.values())
+        model_hits = sum(self._model_hits.values())
+        local = rule_hits + model_hits
+        total = local + self._escalated
+        average_llm_seconds = self._llm_seconds / self._llm_calls if self._llm_calls else 0.0
+        return {
+            "enabled": self.enabled,
+            "model_loaded": self._model is not None,
+            "threshold": self.threshold,
+            "resolved_by_rules": dict(self._rule_hits),
+            "resolved_by_model": dict(self._model_hits),
+            "escalated_to_llm": self._escalated,
+            "local_share": round(local / total, 3) if total else 0.0,
+            "average_llm_ms": round(average_llm_seconds * 1000, 1),
+            "average_local_ms": round(self._local_seconds / total * 1000, 3) if total else 0.0,
+            "latency_saved_seconds": round(max(local * average_llm_seconds - self._local_seconds, 0.0), 1)
+        }
+
+
+def train_from_log(log_path: Optional[str] = None, model_path: Optional[str] = None,
+                   holdout: float = 0.1, seed: int = 42) -> Dict[str, Any]:
+    """
+    Train the local model from the classification log and save it.
+
+    Returns:
+        Training report with held-out accuracy and coverage at the configured threshold
+    """
+    log_path = log_path or settings.classification_log_path
+    model_path = model_path or settings.local_classifier_model_path
+    texts, labels = load_training_examples(log_path)
+    if len(texts) < settings.local_classifier_min_examples:
+        raise ValueError(f"Need at least {settings.local_classifier_min_examples} confident examples, found {len(texts)}")
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    split = int(len(texts) * (1 - holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    model = TfidfLogisticModel.fit([texts[i] for i in train_idx], [labels[i] for i in train_idx], seed=seed)
+    confident = correct = 0
+    for i in test_idx:
+        label, probability = model.predict(texts[i])
+        if probability >= settings.local_classifier_threshold:
+            confident += 1
+            correct += label == labels[i]
+
+    # Ship a model trained on everything
+    model = TfidfLogisticModel.fit(texts, labels, seed=seed)
+    model.save(model_path)
+    return {
+        "examples": len(texts),
+        "label_counts": dict(Counter(labels)),
+        "features": len(model.vocabulary),
+        "holdout_coverage": round(confident / len(test_idx), 3) if len(test_idx) else 0.0,
+        "holdout_accuracy_when_confident": round(correct / confident, 3) if confident else 0.0,
+        "model_path": model_path
+    }
+
+
+# Global local classifier instance
+local_classifier = LocalClassifier()
@@ -4,11 +4,16 @@ AI-powered message classification service using OpenAI.
 import logging
 import json
 import re
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
 from openai import AsyncOpenAI
 from src.config.settings import settings
 from src.models.message_types import ClassificationResult
+from src.ai.local_classifier import local_classifier
+from src.ai.completion_cache import completion_cache
+from src.ai.prompts import CLASSIFY_AND_EXTRACT_PROMPT
+from src.utils.timezone_utils import TimezoneManager, get_user_current_time
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +25,8 @@ class MessageClassifier:
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = settings.openai_model
     
-    async def generate_completion(self, messages, max_tokens=500, temperature=0.1):
+    async def generate_completion(self, messages, max_tokens=500, temperature=0.1, prompt_type=None,
+                                  cache_content=None, cache_context=None):
         """
         Generate a completion using OpenAI for general use by handlers.
         
@@ -28,22 +34,46 @@ class MessageClassifier:
             messages: List of message dicts with 'role' and 'content'
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
+            prompt_type: Cache the response under this prompt type (see completion_cache)
+            cache_content: The user text the prompt is about (cache key)
+            cache_context: Everything else the answer depends on (cache key)
             
         Returns:
             String response content
         """
         try:
+            return await self._chat(messages, max_tokens, temperature, prompt_type, cache_content, cache_context)
+        except Exception as e:
+            logger.error(f"OpenAI completion error: {e}")
+            return None
+    
+    async def _chat(self, messages, max_tokens, temperature, prompt_type=None, cache_content=None, cache_context=None,
+                    response_format=None):
+        """Chat completion, served from the response cache when a prompt type is given."""
+        return (await self._chat_with_source(messages, max_tokens, temperature, prompt_type, cache_content,
+                                             cache_context, response_format))[0]
+    
+    async def _chat_with_source(self, messages, max_tokens, temperature, prompt_type=None, cache_content=None,
+                                cache_context=None, response_format=None) -> Tuple[Optional[str], bool]:
+        """Like _chat, also returning whether the answer came from the response cache."""
+        async def create():
+            extra = {"response_format": response_format} if response_format else {}
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 max_tokens=max_tokens,
-                temperature=temperature
+                temperature=temperature,
+                **extra
             )
             content = response.choices[0].message.content
-            return content.strip() if content else ""
-        except Exception as e:
-            logger.error(f"OpenAI completion error: {e}")
-            return None
+            usage = response.usage
+            return (content.strip() if content else "",
+                    usage.prompt_tokens if usage else 0,
+                    usage.completion_tokens if usage else 0)
+        
+        if prompt_type is None or cache_content is None:
+            return (await create())[0], False
+        return await completion_cache.get_or_create(prompt_type, cache_content, cache_context, create)
     
     async def classify_message(self, content: str, user_context: Optional[Dict[str, Any]] = None) -> ClassificationResult:
         """
@@ -51,40 +81,29 @@ class MessageClassifier:
         Extract relevant information based on the classification.
         """
         try:
-            # Quick check for slash commands
-            if content.strip().startswith('/'):
-                return ClassificationResult(
-                    message_type="slash_command",
-                    confidence=1.0,
-                    extracted_data={"command": content.strip().split()[0]},
-                    requires_followup=False
-                )
-            
-            # Quick check for tag-only messages (brain dump initiation)
-            if self._is_tags_only(content):
-                tags = self._extract_tags(content)
-                return ClassificationResult(
-                    message_type="brain_dump_start",
-                    confidence=1.0,
-                    extracted_data={"tags": tags},
-                    requires_followup=False
-                )
+            quick_result = self._quick_classification(content)
+            if quick_result is not None:
+                return quick_result
             
             # Use AI for complex classification
             system_prompt = self._get_classification_prompt()
             user_prompt = self._build_user_prompt(content, user_context)
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            started = time.perf_counter()
+            result_text, from_cache = await self._chat_with_source(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
+                max_tokens=500,
                 temperature=0.1,
-                max_tokens=500
+                prompt_type="classification",
+                cache_content=content,
+                cache_context={
+                    "timezone": (user_context or {}).get("timezone"),
+                    "date": datetime.now(timezone.utc).date().isoformat()
+                }
             )
-            
-            result_text = response.choices[0].message.content
             if not result_text or not result_text.strip():
                 logger.warning("Empty response from OpenAI")
                 return self._fallback_classification(content)
@@ -111,7 +130,7 @@ class MessageClassifier:
                 logger.error(f"Full JSON decode error: {je}")
                 return self._fallback_classification(content)
             
-            return ClassificationResult(
+            classification = ClassificationResult(
                 message_type=result.get("message_type", "note"),
                 confidence=float(result.get("confidence", 0.5)),
                 extracted_data=result.get("extracted_data", {}),
@@ -119,12 +138,119 @@ class MessageClassifier:
                 requires_followup=result.get("requires_followup", False),
                 followup_type=result.get("followup_type")
             )
+            # Cache hits aren't LLM calls: they would skew latency stats and duplicate training lines
+            if not from_cache:
+                local_classifier.record_llm_classification(content, classification, time.perf_counter() - started)
+            return classification
             
         except Exception as e:
             logger.error(f"Error in message classification: {e}")
             # Fallback to simple rule-based classification
             return self._fallback_classification(content)
     
+    async def classify_and_extract(self, content: str, user_context: Optional[Dict[str, Any]] = None) -> ClassificationResult:
+        """
+        Classify a message and extract its reminder/birthday fields and tags in one call.
+        
+        The extracted fields are returned in extracted_data["reminder"] or
+        extracted_data["birthday"]; handlers validate them exactly like the
+        output of their own extraction prompts and skip the second round-trip.
+        """
+        try:
+            quick_result = self._quick_classification(content)
+            if quick_result is not None:
+                return quick_result
+            
+            user_timezone = (user_context or {}).get("timezone") or "UTC"
+            user_current_time = get_user_current_time(user_timezone)
+            timezone_info = TimezoneManager.get_timezone_info(user_timezone)
+            user_prompt = f"""Current date/time in user's timezone ({user_timezone}): {user_current_time.strftime('%Y-%m-%d %H:%M:%S %A')}
+Timezone: {timezone_info['timezone_name']} (UTC{timezone_info['current_offset_hours']:+.0f})
+User's recent tags: {', '.join((user_context or {}).get('recent_tags') or []) or 'none'}
+
+Message: '{content}'
+
+IMPORTANT: All times should be interpreted in the user's timezone ({user_timezone}) unless explicitly stated otherwise."""
+            
+            started = time.perf_counter()
+            result_text, from_cache = await self._chat_with_source(
+                [
+                    {"role": "system", "content": CLASSIFY_AND_EXTRACT_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=700,
+                temperature=0.1,
+                prompt_type="classify_and_extract",
+                cache_content=content,
+                cache_context={
+                    "timezone": user_timezone,
+                    "hour": user_current_time.strftime('%Y-%m-%d %H'),
+                    "recent_tags": sorted((user_context or {}).get("recent_tags") or [])
+                },
+                response_format={"type": "json_object"}
+            )
+            if not result_text:
+                logger.warning("Empty response from OpenAI")
+                return self._fallback_classification(content)
+            
+            try:
+                result = json.loads(result_text)
+            except json.JSONDecodeError as je:
+                logger.warning(f"Could not parse AI response as JSON: {result_text[:100]}...")
+                logger.error(f"Full JSON decode error: {je}")
+                return self._fallback_classification(content)
+            
+            message_type = result.get("message_type")
+            if message_type not in ("note", "reminder", "birthday"):
+                message_type = "note"
+            
+            # Only pass on the block for the chosen type; handlers extract on their own if it's missing
+            extracted_data = {"title": result.get("title") or content}
+            details = result.get(message_type)
+            if message_type != "note" and isinstance(details, dict):
+                extracted_data[message_type] = details
+            
+            tags = result.get("suggested_tags")
+            classification = ClassificationResult(
+                message_type=message_type,
+                confidence=float(result.get("confidence", 0.5)),
+                extracted_data=extracted_data,
+                suggested_tags=[str(tag).lstrip('#').lower() for tag in tags] if isinstance(tags, list) else [],
+                requires_followup=False
+            )
+            # Cache hits aren't LLM calls: they would skew latency stats and duplicate training lines
+            if not from_cache:
+                local_classifier.record_llm_classification(content, classification, time.perf_counter() - started)
+            return classification
+            
+        except Exception as e:
+            logger.error(f"Error in combined classification: {e}")
+            return self._fallback_classification(content)
+    
+    def _quick_classification(self, content: str) -> Optional[ClassificationResult]:
+        """Classify slash commands, tag-only messages and obvious messages without calling the LLM."""
+        # Quick check for slash commands
+        if content.strip().startswith('/'):
+            return ClassificationResult(
+                message_type="slash_command",
+                confidence=1.0,
+                extracted_data={"command": content.strip().split()[0]},
+                requires_followup=False
+            )
+        
+        # Quick check for tag-only messages (brain dump initiation)
+        if self._is_tags_only(content):
+            tags = self._extract_tags(content)
+            return ClassificationResult(
+                message_type="brain_dump_start",
+                confidence=1.0,
+                extracted_data={"tags": tags},
+                requires_followup=False
+            )
+        
+        # Obvious messages are resolved by rules or the local model
+        return local_classifier.classify(content)
+    
     def _get_classification_prompt(self) -> str:
         """Get the system prompt for message classification."""
         return """You are an AI assistant that classifies WhatsApp messages for a personal productivity bot.
@@ -237,17 +363,17 @@ IMPORTANT: Respond with valid JSON array only, no markdown formatting.
 
 Only suggest existing tags or very obvious new ones."""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            result_text = await self._chat(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Content: {content}"}
                 ],
+                max_tokens=100,
                 temperature=0.3,
-                max_tokens=100
+                prompt_type="suggest_tags",
+                cache_content=content,
+                cache_context={"user_tags": sorted(user_tags[:20])}
             )
-            
-            result_text = response.choices[0].message.content
             if not result_text:
                 logger.warning("Empty response from OpenAI for tag suggestions")
                 return []
@@ -295,17 +421,17 @@ IMPORTANT: Respond with valid JSON only, no markdown formatting.
     "intent": "find_specific|browse_recent|search_concept"
 }"""
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            result_text = await self._chat(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Query: {query}"}
                 ],
+                max_tokens=300,
                 temperature=0.1,
-                max_tokens=300
+                prompt_type="search_intent",
+                cache_content=query,
+                cache_context={"date": datetime.now(timezone.utc).date().isoformat()}
             )
-            
-            result_text = response.choices[0].message.content
             if not result_text:
                 logger.warning("Empty response from OpenAI for search intent")
                 return {
@@ -0,0 +1,122 @@
+"""
+AI service for transcribing voice notes with OpenAI Whisper.
+Uses one shared AsyncOpenAI client, uploads audio straight from memory and
+limits how many transcriptions run at once so bursts of voice notes can't
+starve text traffic.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from openai import AsyncOpenAI
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionService:
+    """Service for transcribing audio using OpenAI Whisper."""
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.model = settings.openai_model_vtt
+        self.max_concurrency = max_concurrency or settings.transcription_max_concurrency
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Metrics
+        self._in_flight = 0
+        self._waiting = 0
+        self._files = 0
+        self._failures = 0
+        self._bytes_processed = 0
+        self._audio_chars = 0
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, created on first use."""
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    async def transcribe(self, file_content: bytes, filename: str) -> Optional[str]:
+        """
+        Transcribe an audio file.
+
+        Args:
+            file_content: Audio bytes
+            filename: Filename with an audio extension Whisper recognises (e.g. voice.ogg)
+
+        Returns:
+            Transcription text, or None if it failed or was empty
+        """
+        queued_at = time.monotonic()
+        self._waiting += 1
+        acquired = False
+        try:
+            async with self._semaphore:
+                acquired = True
+                self._waiting -= 1
+                self._in_flight += 1
+                started_at = time.monotonic()
+                try:
+                    transcript = await asyncio.wait_for(
+                        self.client.audio.transcriptions.create(
+                            model=self.model,
+                            file=(filename, file_content),
+                            response_format="text"
+                        ),
+                        timeout=settings.transcription_timeout_seconds
+                    )
+                finally:
+                    self._in_flight -= 1
+
+            latency = time.monotonic() - started_at
+            transcription_text = transcript.strip() if transcript else ""
+
+            self._files += 1
+            self._bytes_processed += len(file_content)
+            self._audio_chars += len(transcription_text)
+            self._recent.append({
+                "filename": filename,
+                "bytes": len(file_content),
+                "queue_wait_ms": round((started_at - queued_at) * 1000, 1),
+                "latency_ms": round(latency * 1000, 1),
+                "chars": len(transcription_text)
+            })
+            logger.info(f"Transcribed {filename}: {len(file_content)} bytes in {latency * 1000:.0f}ms "
+                        f"(waited {(started_at - queued_at) * 1000:.0f}ms), {len(transcription_text)} characters")
+
+            return transcription_text or None
+
+        except Exception as e:
+            self._failures += 1
+            logger.error(f"Error transcribing audio {filename}: {e}")
+            return None
+        finally:
+            if not acquired:
+                self._waiting -= 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get transcription throughput and latency metrics."""
+        latencies = sorted(item["latency_ms"] for item in self._recent)
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "files": self._files,
+            "failures": self._failures,
+            "bytes_processed": self._bytes_processed,
+            "characters_transcribed": self._audio_chars,
+            "p50_latency_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95_latency_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            "recent": list(self._recent)[-10:]
+        }
+
+
+# Global transcription service instance
+transcription_service = TranscriptionService()
@@ -1,8 +1,11 @@
 """
 Database connection and configuration for Supabase.
 """
+import asyncio
 import logging
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
 from supabase import create_client, Client
 from src.config.settings import settings
 
@@ -15,6 +18,15 @@ class DatabaseManager:
     def __init__(self):
         self._client: Optional[Client] = None
         self._admin_client: Optional[Client] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+        # Offload metrics
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_queue_wait = 0.0
+        self._total_run_time = 0.0
     
     @property
     def client(self) -> Client:
@@ -38,11 +50,70 @@ class DatabaseManager:
             logger.info("Supabase admin client initialized")
         return self._admin_client
     
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool that runs blocking supabase-py calls off the event loop."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.db_thread_pool_size,
+                thread_name_prefix="supabase"
+            )
+            logger.info(f"Supabase thread pool initialized with {settings.db_thread_pool_size} workers")
+        return self._executor
+    
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking database/storage call in the thread pool and await its result."""
+        submitted_at = time.monotonic()
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        
+        def timed_call():
+            started_at = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._total_queue_wait += started_at - submitted_at
+                self._total_run_time += time.monotonic() - started_at
+        
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, timed_call)
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+    
+    async def run_query(self, query) -> Any:
+        """Execute a supabase-py query builder without blocking the event loop."""
+        return await self.run_blocking(query.execute)
+    
+    def get_offload_stats(self) -> Dict[str, Any]:
+        """Get thread pool utilisation metrics."""
+        finished = self._completed + self._failed
+        return {
+            "pool_size": settings.db_thread_pool_size,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_queue_wait_ms": round(self._total_queue_wait / finished * 1000, 2) if finished else 0.0,
+            "avg_query_ms": round(self._total_run_time / finished * 1000, 2) if finished else 0.0
+        }
+    
+    def shutdown(self):
+        """Shut down the thread pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
     async def health_check(self) -> bool:
         """Check if database connection is healthy."""
         try:
             # Simple query to test connection
-            result = self.client.table("users").select("id").limit(1).execute()
+            result = await self.run_query(self.client.table("users").select("id").limit(1))
             return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
@@ -53,16 +124,16 @@ class DatabaseManager:
         try:
             # Check if vector search is available by testing a simple query
             logger.info("Checking vector search availability...")
-            result = self.client.table("messages").select("id").limit(1).execute()
+            result = await self.run_query(self.client.table("messages").select("id").limit(1))
             logger.info("Database connection verified successfully")
             
             # Try to check if pgvector functions are available
             try:
-                result = self.admin_client.rpc('search_messages_by_vector', {
+                result = await self.run_query(self.admin_client.rpc('search_messages_by_vector', {
                     'user_id': '00000000-0000-0000-0000-000000000000',
                     'query_embedding': [0.0] * 1536,
                     'match_count': 1
-                }).execute()
+                }))
                 logger.info("Vector search functions available")
             except Exception as ve:
                 logger.info("Vector search functions not available (run additional_analytics.sql for enhanced features)")
@@ -85,3 +156,11 @@ def get_db_client() -> Client:
 def get_admin_client() -> Client:
     """Get the admin database client."""
     return db_manager.admin_client
+
+async def run_query(query) -> Any:
+    """Execute a query builder in the database thread pool."""
+    return await db_manager.run_query(query)
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run any blocking supabase-py call (e.g. storage) in the database thread pool."""
+    return await db_manager.run_blocking(func, *args, **kwargs)
@@ -22,12 +22,16 @@ class Settings(BaseSettings):
     supabase_url: str = Field(default="", description="Supabase project URL")
     supabase_key: str = Field(default="", description="Supabase anon key")
     supabase_service_key: str = Field(default="", description="Supabase service role key")
+    db_thread_pool_size: int = Field(default=16, description="Threads running blocking Supabase queries off the event loop")
+    database_url: str = Field(default="", description="Direct Postgres connection string (session mode) used for scheduler advisory locks")
     
     # OpenAI Configuration
     openai_api_key: str = Field(default="", description="OpenAI API key")
     openai_model: str = Field(default="gpt-4o-mini", description="Default OpenAI model to use")
     openai_model_vtt: str = Field(default="whisper-1", description="OpenAI model for voice transcription")
     openai_model_image_recognition: str = Field(default="gpt-4o", description="OpenAI model for image recognition")
+    transcription_max_concurrency: int = Field(default=4, description="Voice notes transcribed at the same time")
+    transcription_timeout_seconds: float = Field(default=120.0, description="Timeout for a single transcription request")
     
     # WhatsApp Business API
     whatsapp_access_token: str = Field(default="", description="WhatsApp access token")
@@ -45,10 +49,111 @@ class Settings(BaseSettings):
     # Session Configuration
     brain_dump_timeout_minutes: int = Field(default=3, description="Brain dump session timeout")
     tag_response_timeout_minutes: int = Field(default=2, description="Tag response timeout")
-    
+
+    # Reminder Dispatch
+    reminder_preload_hours: float = Field(default=6.0, description="How far ahead reminders are loaded into the in-memory timer queue")
+    reminder_reconcile_interval_minutes: int = Field(default=15, description="How often the timer queue is rebuilt from a full scan")
+    reminder_poll_interval_seconds: int = Field(default=30, description="How often reminders created by other processes are picked up")
+    reminder_send_concurrency: int = Field(default=20, description="Reminder notifications sent at the same time")
+    whatsapp_send_rate_per_second: float = Field(default=80.0, description="Sustained proactive sends per second (WhatsApp Cloud API throughput tier)")
+    whatsapp_send_burst: float = Field(default=0.0, description="Sends allowed in a burst above the sustained rate (0 = one second's worth)")
+    reminder_claim_timeout_seconds: int = Field(default=300, description="After this long a claimed but unsent reminder can be claimed again")
+
+    # Local Classification
+    local_classifier_enabled: bool = Field(default=True, description="Resolve obvious messages with rules and the local model before calling GPT")
+    local_classifier_threshold: float = Field(default=0.9, description="Local model probability needed to skip the LLM")
+    local_classifier_model_path: str = Field(default="models/local_classifier.npz", description="Trained local classifier (see train_classifier.py)")
+    local_classifier_min_examples: int = Field(default=200, description="Minimum confident logged classifications needed to train")
+    classification_log_path: str = Field(default="logs/classifications.jsonl", description="LLM classifications logged as training examples")
+
+    # LLM Response Cache
+    llm_cache_enabled: bool = Field(default=True, description="Reuse chat completions for repeated prompts")
+    llm_cache_max_entries: int = Field(default=10000, description="Completions kept in the exact-match tier")
+    llm_cache_ttl_seconds: int = Field(default=86400, description="How long a cached completion is reused")
+    llm_cache_similarity_threshold: float = Field(default=0.97, description="Minimum embedding cosine similarity for a semantic cache hit")
+    llm_cache_semantic_entries_per_context: int = Field(default=500, description="Embeddings kept per prompt type and context")
+    llm_cache_semantic_contexts: int = Field(default=1000, description="Prompt type/context combinations kept in the semantic tier")
+    openai_input_cost_per_million: float = Field(default=0.15, description="USD per million prompt tokens, for cache savings")
+    openai_output_cost_per_million: float = Field(default=0.60, description="USD per million completion tokens, for cache savings")
+
+    # Birthday Notifications
+    birthday_digest_hour: int = Field(default=9, description="Local hour (user timezone) from which the daily birthday digest is sent")
+    birthday_notice_max_days: int = Field(default=7, description="Furthest ahead a birthday can be announced (largest days_before honoured)")
+
+    # Scheduler Runtime
+    embedded_schedulers: bool = Field(default=True, description="Run reminder and monitor schedulers inside the web process (disable when run_scheduler.py is deployed)")
+    scheduler_partitions: int = Field(default=16, description="Reminder partitions shared between scheduler instances (must divide 256)")
+    scheduler_rebalance_interval_seconds: int = Field(default=30, description="How often scheduler instances rebalance partition ownership")
+
+    # Webhook Ingestion Queue
+    ingestion_workers: int = Field(default=4, description="Background workers routing queued webhook messages")
+    ingestion_queue_max_size: int = Field(default=1000, description="Maximum queued messages before the webhook pushes back")
+    ingestion_enqueue_timeout_seconds: float = Field(default=2.0, description="How long the webhook waits for queue space before asking Meta to retry")
+    ingestion_drain_timeout_seconds: float = Field(default=30.0, description="How long shutdown waits for queued messages to finish")
+    dispatch_max_concurrent_users: int = Field(default=8, description="Users whose messages are routed concurrently")
+    dispatch_max_pending_messages: int = Field(default=500, description="Messages held across all user shards before dispatch pushes back")
+
+    # Outbound HTTP Connection Pools
+    http2_enabled: bool = Field(default=True, description="Use HTTP/2 for outbound API calls when the h2 package is installed")
+    http_max_connections: int = Field(default=100, description="Maximum open connections per upstream")
+    http_max_keepalive_connections: int = Field(default=20, description="Idle keep-alive connections kept per upstream")
+    http_keepalive_expiry_seconds: float = Field(default=30.0, description="How long idle connections are kept open")
+    http_connect_timeout_seconds: float = Field(default=5.0, description="Connection timeout for outbound calls")
+    http_read_timeout_seconds: float = Field(default=30.0, description="Read timeout for outbound calls")
+    http_pool_timeout_seconds: float = Field(default=10.0, description="How long to wait for a free pooled connection")
+
+    # Per-User Context Cache
+    user_context_cache_max_users: int = Field(default=10000, description="Users kept in the context cache")
+    user_cache_ttl_seconds: int = Field(default=300, description="How long a cached user row is reused")
+    session_cache_ttl_seconds: int = Field(default=30, description="How long a cached active session is reused")
+    timezone_cache_ttl_seconds: int = Field(default=600, description="How long a cached user timezone is reused")
+    tag_cache_ttl_seconds: int = Field(default=60, description="How long cached tag counts are reused")
+    last_seen_flush_interval_seconds: float = Field(default=30.0, description="How often coalesced last_seen updates are written")
+
+    # Outbound Message Storage
+    outbound_batch_size: int = Field(default=50, description="Bot responses stored per multi-row insert")
+    outbound_flush_interval_seconds: float = Field(default=2.0, description="Maximum delay before buffered bot responses are stored")
+    outbound_max_buffered: int = Field(default=10000, description="Bot responses held in memory before the oldest are spooled to disk")
+    outbound_spool_path: str = Field(default="logs/outbound_messages_spool.jsonl", description="Where unwritten bot responses are kept across restarts")
+
+    # Media Content Cache
+    media_cache_max_entries: int = Field(default=5000, description="Processed media entries kept in memory, keyed by user and content hash")
+    media_cache_ttl_seconds: int = Field(default=86400, description="How long processed media results are reused from memory")
+
+    # Message Deduplication
+    dedup_ttl_seconds: int = Field(default=86400, description="How long processed message IDs are remembered")
+    dedup_max_entries: int = Field(default=50000, description="Maximum message IDs kept in memory")
+    redis_url: str = Field(default="", description="Optional Redis URL for state shared across workers")
+
     # Vector Search Configuration
     vector_dimensions: int = Field(default=1536, description="Vector embedding dimensions")
+    openai_embedding_model: str = Field(default="text-embedding-3-small", description="OpenAI model for vector embeddings")
+    embedding_batch_max_size: int = Field(default=64, description="Maximum texts sent in one embeddings request")
+    embedding_batch_wait_ms: float = Field(default=10.0, description="How long an embedding request waits for others to share its batch")
+    embedding_max_concurrent_requests: int = Field(default=4, description="Embedding batches in flight at the same time")
+    query_embedding_cache_max_entries: int = Field(default=2000, description="Query embeddings kept in memory")
+    query_embedding_cache_disk_entries: int = Field(default=50000, description="Query embeddings kept on disk (~3 KB each at 1536 dimensions)")
+    query_embedding_cache_ttl_seconds: int = Field(default=30 * 86400, description="How long a cached query embedding is reused")
+    query_embedding_cache_path: str = Field(default="cache/query_embeddings", description="File prefix of the on-disk query embedding cache (empty for memory only)")
+    query_embedding_cache_max_chars: int = Field(default=500, description="Longest text whose embedding is cached")
+    query_embedding_cache_flush_every: int = Field(default=50, description="New disk entries between flushes of the memory map")
     search_results_limit: int = Field(default=10, description="Maximum search results")
+    vector_index_enabled: bool = Field(default=True, description="Search messages in a per-user in-memory vector index instead of the pgvector RPC")
+    vector_index_max_users: int = Field(default=500, description="Users whose vectors are kept in memory")
+    vector_index_max_vectors: int = Field(default=50000, description="Total vectors kept in memory (~6 KB each at 1536 dimensions)")
+    vector_index_ttl_seconds: int = Field(default=600, description="How long a user's loaded vectors are used before reloading")
+    vector_index_max_pending: int = Field(default=10000, description="Saved messages tracked while waiting for their embedding")
+    vector_index_precision: str = Field(default="float32", description="Storage of in-memory vectors: float32, float16 or int8 (re-ranked with exact vectors)")
+    vector_index_rerank_factor: int = Field(default=4, description="int8 candidates fetched per requested result for exact re-ranking")
+    hybrid_search_candidates: int = Field(default=50, description="Results each hybrid search retriever returns for fusion")
+    hybrid_search_max_candidates: int = Field(default=200, description="Upper bound on per-retriever results when paging deep")
+    hybrid_search_max_page_size: int = Field(default=50, description="Largest page a hybrid search returns")
+    hybrid_search_rrf_k: int = Field(default=60, description="Reciprocal-rank fusion constant")
+    hybrid_search_similarity_threshold: float = Field(default=0.3, description="Minimum cosine similarity for hybrid search vector matches")
+    vector_index_maintenance_hour: int = Field(default=3, description="UTC hour of the daily HNSW index retuning job")
+    vector_index_max_rebuilds_per_run: int = Field(default=2, description="Shard indexes rebuilt per maintenance run")
+    vector_index_maintenance_work_mem: str = Field(default="256MB", description="maintenance_work_mem for HNSW index builds")
+    vector_storage_type: str = Field(default="vector", description="pgvector column type of messages.vector_embedding: vector, or halfvec after convert_embeddings_to_halfvec.sql")
     
     # Media Configuration
     max_file_size_mb: int = Field(default=10, description="Maximum file size in MB")
@@ -8,6 +8,7 @@ import json
 from src.models.database import Birthday
 from src.models.message_types import ProcessedMessage, BirthdayExtraction
 from src.utils.logger import MessageProcessingLogger
+from src.ai.prompts import BIRTHDAY_EXTRACTION_PROMPT
 from .base_handler import BaseHandler
 
 
@@ -33,7 +34,9 @@ class BirthdayHandler(BaseHandler):
             self.msg_logger.log_message_stage("BIRTHDAY_PROCESSING", message_data)
             
             # Use AI to extract birthday information
-            birthday_info = await self._extract_birthday_with_ai(message.content, message, user)
+            # Use the fields from the combined classify-and-extract call, or extract them now
+            pre_extracted = (classification.get("extracted_data") or {}).get("birthday")
+            birthday_info = await self._extract_birthday_with_ai(message.content, message, user, pre_extracted)
             
             if birthday_info:
                 self.msg_logger.log_message_stage("BIRTHDAY_PARSED", message_data, 
@@ -107,7 +110,8 @@ class BirthdayHandler(BaseHandler):
                 "error": str(e)
             }
     
-    async def _extract_birthday_with_ai(self, content: str, message: ProcessedMessage, user=None) -> Optional[Dict[str, Any]]:
+    async def _extract_birthday_with_ai(self, content: str, message: ProcessedMessage, user=None,
+                                        pre_extracted: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """Use OpenAI to extract birthday information from any format."""
         
         def create_log_message_data():
@@ -122,45 +126,24 @@ class BirthdayHandler(BaseHandler):
             }
         
         try:
-            system_prompt = """You are an expert at extracting birthday information from text messages. 
-Extract the person's name/relationship and birthday from the user's message.
-
-The "person_name" can be:
-- Actual names: "John", "Sarah", "Mike"
-- Relationships: "wife", "husband", "mom", "dad", "brother", "sister", "partner", "boyfriend", "girlfriend"
-- Nicknames: "babe", "honey", "bestie", "buddy"
-- Possessive forms: "John's" becomes "John", "mom's" becomes "mom", "my wife's" becomes "wife"
-
-Return a JSON object with:
-- "person_name": The name/relationship (clean up possessives and remove "my")
-- "birthdate": ISO date string (YYYY-MM-DD) 
-- "year_known": boolean - true if year was provided, false if only month/day
-
-Examples:
-- "John's birthday is March 15th, 1990" → {"person_name": "John", "birthdate": "1990-03-15", "year_known": true}
-- "My wife's birthday is on 3 November" → {"person_name": "wife", "birthdate": "2000-11-03", "year_known": false}  
-- "Dad's birthday = 12 July 1965" → {"person_name": "dad", "birthdate": "1965-07-12", "year_known": true}
-- "Brother birthday is Feb 22" → {"person_name": "brother", "birthdate": "2000-02-22", "year_known": false}
-- "My partner's bday is 14th Dec" → {"person_name": "partner", "birthdate": "2000-12-14", "year_known": false}
-
-If no year is given, use 2000 as placeholder. Extract dates in various formats (March 15, 3/15, 15 Mar, etc).
-Only return valid JSON. If you cannot extract both name/relationship AND date, return null.
-- "Sarah was born on 25 Dec 1985"
-
-If no year is provided, use 1900 as a placeholder and set year_known to false.
-Clean up names (remove possessive 's, handle "my wife/husband/etc").
-"""
+            system_prompt = BIRTHDAY_EXTRACTION_PROMPT
             
             user_prompt = f"Extract birthday information from: '{content}'"
             
-            response = await self.classifier.generate_completion(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=200,
-                temperature=0.1
-            )
+            if pre_extracted:
+                # Already extracted by the combined call - validate it like a fresh response
+                response = json.dumps(pre_extracted)
+            else:
+                response = await self.classifier.generate_completion(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=200,
+                    temperature=0.1,
+                    prompt_type="birthday_extraction",
+                    cache_content=content
+                )
             
             if not response:
                 self.msg_logger.logger.warning("No response from AI for birthday extraction")
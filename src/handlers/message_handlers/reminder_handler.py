@@ -9,6 +9,7 @@ from src.models.message_types import ProcessedMessage
 from src.utils.logger import MessageProcessingLogger
 from src.utils.timezone_utils import TimezoneManager, get_user_current_time
 from src.services.user_timezone_service import UserTimezoneService
+from src.ai.prompts import REMINDER_EXTRACTION_PROMPT
 from .base_handler import BaseHandler
 
 
@@ -35,7 +36,9 @@ class ReminderHandler(BaseHandler):
             self.msg_logger.log_message_stage("REMINDER_PROCESSING", message_data)
             
             # Use AI to extract reminder information
-            reminder_info = await self._extract_reminder_with_ai(message.content, message, user)
+            # Use the fields from the combined classify-and-extract call, or extract them now
+            pre_extracted = (classification.get("extracted_data") or {}).get("reminder")
+            reminder_info = await self._extract_reminder_with_ai(message.content, message, user, pre_extracted)
             
             if reminder_info:
                 self.msg_logger.log_message_stage("REMINDER_PARSED", message_data, 
@@ -142,7 +145,8 @@ class ReminderHandler(BaseHandler):
                 "error": str(e)
             }
     
-    async def _extract_reminder_with_ai(self, content: str, message: ProcessedMessage, user=None) -> Optional[Dict[str, Any]]:
+    async def _extract_reminder_with_ai(self, content: str, message: ProcessedMessage, user=None,
+                                        pre_extracted: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """Use OpenAI to extract reminder information."""
         
         def create_log_message_data():
@@ -166,63 +170,7 @@ class ReminderHandler(BaseHandler):
             user_timezone = await self.timezone_service.get_user_timezone(user_id)
             user_current_time = get_user_current_time(user_timezone)
             
-            system_prompt = """You are an expert at extracting reminder information from text messages.
-Extract the reminder details from the user's message and handle complex time calculations.
-
-IMPORTANT: For reminders like "Remind me about X at Y time Z minutes/hours before":
-1. Calculate the actual trigger_time by subtracting the "before" time from the event time
-2. Set title to the main event name (e.g., "Vet visit")
-3. Set description to include the original event time (e.g., "You have a vet visit at 4PM")
-
-Return a JSON object with:
-- "title": The main reminder text (what to be reminded about) - keep it concise
-- "description": Detailed description including original event time when applicable
-- "trigger_time": ISO datetime string when the reminder should ACTUALLY trigger (after calculations)
-- "original_event_time": ISO datetime string of the original event time (if different from trigger_time)
-- "repeat_type": one of "none", "daily", "weekly", "monthly", "yearly" ONLY (NO hourly, minutely, or custom intervals)
-- "repeat_interval": Optional number for custom intervals
-- "repeat_until": ISO datetime string when recurring reminders should stop (if specified)
-- "extracted_tags": Array of relevant tags
-- "calculation_error": If time calculation is impossible/illogical, explain why
-- "suggested_clarification": If there's an error, suggest how user can clarify
-
-Handle various complex formats:
-- "Remind me about my vet visit at 4PM an hour before" → trigger: 3PM, title: "Vet visit", description: "You have a vet visit at 4PM"
-- "Remind me 30 minutes before my meeting at 3PM" → trigger: 2:30PM, title: "Meeting", description: "You have a meeting at 3PM"  
-- "Remind me about dinner reservation at 7PM, 15 minutes early" → trigger: 6:45PM, title: "Dinner reservation", description: "You have a dinner reservation at 7PM"
-- "Remind me to call John at 5PM" → trigger: 5PM, title: "Call John", description: null
-- "Daily reminder to take medicine at 8am" → trigger: 8AM daily, title: "Take medicine", repeat_type: "daily"
-- "Remind me every day to drink my pills at 9AM" → trigger: 9AM daily, title: "Drink pills", repeat_type: "daily"
-- "For the next 7 days, remind me to take my antibiotics at 9AM" → trigger: 9AM daily, title: "Take antibiotics", repeat_type: "daily", repeat_until: [7 days from now]
-- "Remind me every day for the next week to take vitamins at 8am" → trigger: 8AM daily, title: "Take vitamins", repeat_type: "daily", repeat_until: [1 week from now]
-- "Remind me every wednesday morning 15 minutes before 8PM that I need to take the trash out" → trigger: 7:45PM weekly (Wednesday), title: "Take trash out", repeat_type: "weekly", description: "You need to take the trash out at 8PM"
-- "Weekly reminder to check emails on Monday at 10am for the next month" → trigger: 10AM weekly (Monday), title: "Check emails", repeat_type: "weekly", repeat_until: [1 month from now]
-- "Remind me every month to pay rent on the 1st at noon" → trigger: 12PM monthly, title: "Pay rent", repeat_type: "monthly"
-
-RECURRING REMINDER RULES:
-- "every day/daily" → repeat_type: "daily"
-- "every week/weekly" → repeat_type: "weekly" 
-- "every month/monthly" → repeat_type: "monthly"
-- "every year/yearly/annually" → repeat_type: "yearly"
-- For weekly reminders, calculate the next occurrence of the specified day (e.g., "every Wednesday" = next Wednesday)
-- For "X minutes/hours before Y on Z day" → calculate trigger_time and set appropriate repeat_type
-
-REPEAT UNTIL RULES:
-- "for the next X days/weeks/months" → calculate repeat_until date
-- "until [date]" → set repeat_until to that date
-- "for X times" → calculate repeat_until based on frequency and count
-- If no end date specified, leave repeat_until as null for indefinite recurring
-
-VALIDATION RULES:
-- ONLY daily, weekly, monthly, or yearly repeat_type allowed (NO hourly, minutely, or custom intervals)
-- If user requests hourly, every minute, every 4 hours, etc. → set "calculation_error" with helpful message
-- If calculated trigger_time is in the past and it's clearly not intended for next day, set "calculation_error"
-- If the "before" time is longer than reasonable (e.g., "remind me 5 hours before lunch at 1PM" when it's already 3PM), set "calculation_error"
-- If times are ambiguous or conflicting, set "calculation_error"
-- If repeat_until is before trigger_time, set "calculation_error"
-
-For relative times like "tomorrow", "next week", use the current date/time as reference.
-For times without dates, assume today if it's a future time, otherwise tomorrow."""
+            system_prompt = REMINDER_EXTRACTION_PROMPT
             
             # Create timezone-aware prompt
             timezone_info = TimezoneManager.get_timezone_info(user_timezone)
@@ -233,14 +181,22 @@ Extract reminder from: '{content}'
 
 IMPORTANT: All times should be interpreted in the user's timezone ({user_timezone}) unless explicitly stated otherwise."""
             
-            response = await self.classifier.generate_completion(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=500,
-                temperature=0.1
-            )
+            if pre_extracted:
+                # Already extracted by the combined call - validate it like a fresh response
+                response = json.dumps(pre_extracted)
+            else:
+                response = await self.classifier.generate_completion(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=500,
+                    temperature=0.1,
+                    prompt_type="reminder_extraction",
+                    cache_content=content,
+                    # Times already past in the cached answer are moved to tomorrow below
+                    cache_context={"timezone": user_timezone, "hour": user_current_time.strftime('%Y-%m-%d %H')}
+                )
             
             if not response:
                 self.msg_logger.logger.warning("No response from AI for reminder extraction")
@@ -15,6 +15,7 @@ from src.models.message_types import ProcessedMessage, ClassificationResult
 from src.models.database import User, Message, MessageType, SourceType, SessionStatus
 from src.services.supabase_service import SupabaseService
 from src.services.whatsapp_service import WhatsAppService
+from src.services.user_timezone_service import UserTimezoneService
 from src.ai.message_classifier import MessageClassifier
 from src.workflows.brain_dump import BrainDumpWorkflow
 from src.workflows.tagging import TaggingWorkflow
@@ -41,6 +42,7 @@ class MessageRouter:
             self.whatsapp_service = WhatsAppService(self.db_service)
             
         self.classifier = MessageClassifier()
+        self.timezone_service = UserTimezoneService(self.db_service)
         
         # Initialize message handlers directly (pass classifier for OpenAI access)
         self.handlers: List[BaseHandler] = [
@@ -121,13 +123,15 @@ class MessageRouter:
                 return            # For regular messages, classify and process with handlers
             self.msg_logger.log_message_stage("AI_CLASSIFICATION", message_data)
             user_context = await self._get_user_context(user)
-            classification = await self.classifier.classify_message(message.content or "", user_context)
+            # One call classifies and extracts reminder/birthday fields for the handlers
+            classification = await self.classifier.classify_and_extract(message.content or "", user_context)
             
             classification_data = {
                 "message_type": classification.message_type,
                 "confidence": classification.confidence,
                 "suggested_tags": classification.suggested_tags,
-                "requires_followup": classification.requires_followup
+                "requires_followup": classification.requires_followup,
+                "extracted_data": classification.extracted_data
             }
             self.msg_logger.log_classification_result(message_data, classification_data)
             
@@ -181,7 +185,7 @@ class MessageRouter:
             
             return {
                 "recent_tags": recent_tags,
-                "timezone": "UTC",  # Would get from user preferences
+                "timezone": await self.timezone_service.get_user_timezone(str(user.id)),
                 "user_id": str(user.id)
             }
         except Exception as e:
@@ -272,7 +272,11 @@ class SlashCommandHandler:
 
 
 # FastAPI router for API endpoints
-from fastapi import APIRouter
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Query
+from src.services.hybrid_search import HybridSearchService, SearchFilters
 
 commands_router = APIRouter()
 
@@ -293,3 +297,33 @@ async def commands_info():
             {"command": "/search", "description": "Search your content"}
         ]
     }
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    return value.replace(tzinfo=timezone.utc) if value and value.tzinfo is None else value
+
+
+@commands_router.get("/search")
+async def search_messages(
+    token: str = Query(..., description="Portal access token"),
+    q: str = Query(..., min_length=1, description="Search text"),
+    tags: Optional[List[str]] = Query(None, description="Only messages with all of these tags"),
+    type: Optional[str] = Query(None, description="Only messages of this type (note, brain_dump, ...)"),
+    date_from: Optional[datetime] = Query(None, description="Messages on or after this time (UTC if no offset)"),
+    date_to: Optional[datetime] = Query(None, description="Messages before this time (UTC if no offset)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=50)
+):
+    """Hybrid full-text and semantic search over the token holder's messages."""
+    payload = AuthService().verify_portal_token(token)
+    if not payload or not payload.get("user_id"):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    filters = SearchFilters(
+        tags=[tag.lstrip("#") for tag in tags or []],
+        message_type=type,
+        date_from=_as_utc(date_from),
+        date_to=_as_utc(date_to)
+    )
+    search_service = HybridSearchService(SupabaseService())
+    return await search_service.search(UUID(payload["user_id"]), q.strip(), filters, page=page, page_size=page_size)
@@ -6,11 +6,14 @@ import json
 from datetime import datetime, timezone
 from typing import Dict, Any
 from fastapi import APIRouter, Request, HTTPException, Query
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, JSONResponse
 
 from models.message_types import WhatsAppWebhook, ProcessedMessage
 from services.whatsapp_service import WhatsAppService
 from services.supabase_service import SupabaseService
+from services.ingestion_queue import MessageIngestionQueue
+from services.user_dispatcher import UserOrderedDispatcher
+from services.idempotency_store import MessageIdempotencyStore
 from handlers.message_router import MessageRouter
 
 logger = logging.getLogger(__name__)
@@ -22,9 +25,13 @@ db_service = SupabaseService()
 whatsapp_service = WhatsAppService(db_service)
 message_router = MessageRouter(whatsapp_service)
 
-# Message deduplication cache (in production, use Redis or database)
-processed_message_ids = set()
-MAX_CACHE_SIZE = 1000  # Prevent memory issues
+# Messages are acknowledged immediately and routed by background workers,
+# in order per user and in parallel across users
+message_dispatcher = UserOrderedDispatcher(message_router.route_message)
+ingestion_queue = MessageIngestionQueue(message_dispatcher.dispatch)
+
+# Message deduplication - Meta redelivers webhooks it believes failed
+message_dedup = MessageIdempotencyStore()
 
 
 @webhook_router.get("/")
@@ -60,11 +67,17 @@ async def handle_webhook(request: Request):
         # Parse webhook payload
         webhook = WhatsAppWebhook(**webhook_data)
         
-        # Process each entry
+        # Queue each entry's messages for background processing
+        all_queued = True
         for entry in webhook.entry:
             for change in entry.changes:
                 if change.field == "messages":
-                    await process_messages(change.value)
+                    if not await process_messages(change.value):
+                        all_queued = False
+        
+        if not all_queued:
+            # Queue is saturated - ask WhatsApp to redeliver instead of dropping messages
+            return JSONResponse(status_code=503, content={"status": "busy"})
         
         return {"status": "ok"}
         
@@ -74,8 +87,12 @@ async def handle_webhook(request: Request):
         return {"status": "error", "message": str(e)}
 
 
-async def process_messages(value: Dict[str, Any]):
-    """Process incoming messages from webhook value."""
+async def process_messages(value: Dict[str, Any]) -> bool:
+    """Parse incoming messages from webhook value and queue them for routing.
+    
+    Returns False if any message could not be queued.
+    """
+    all_queued = True
     try:
         messages = value.get("messages", [])
         contacts = value.get("contacts", [])
@@ -95,16 +112,10 @@ async def process_messages(value: Dict[str, Any]):
                 continue
             
             # Check for duplicate message processing
-            if message_id in processed_message_ids:
+            if not await message_dedup.claim(message_id):
                 logger.info(f"Skipping duplicate message: {message_id}")
                 continue
             
-            # Add to processed cache (with size limit)
-            processed_message_ids.add(message_id)
-            if len(processed_message_ids) > MAX_CACHE_SIZE:
-                # Remove oldest entries (simplified - in production use LRU cache)
-                processed_message_ids.pop()
-            
             # Convert timestamp
             try:
                 # WhatsApp timestamps are in UTC, so use utcfromtimestamp
@@ -145,11 +156,16 @@ async def process_messages(value: Dict[str, Any]):
                 media_id=media_id
             )
             
-            # Route message for processing
-            await message_router.route_message(processed_message)
+            # Queue message for routing; release the claim if it was not accepted
+            # so the redelivery after backpressure is not skipped as a duplicate
+            if not await ingestion_queue.enqueue(processed_message):
+                await message_dedup.release(message_id)
+                all_queued = False
             
     except Exception as e:
         logger.error(f"Error processing messages: {e}")
+    
+    return all_queued
 
 
 @webhook_router.post("/test")
@@ -18,8 +18,19 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from config.settings import settings
-from config.database import db_manager
-from handlers.webhook_handler import webhook_router
+from src.config.database import db_manager
+from src.services.http_clients import http_clients
+from src.services.user_context_cache import user_context_cache
+from src.services.last_seen_buffer import last_seen_buffer
+from src.services.outbound_message_writer import outbound_message_writer
+from src.ai.transcription import transcription_service
+from src.ai.local_classifier import local_classifier
+from src.ai.completion_cache import completion_cache
+from src.ai.embedding_batcher import embedding_batcher
+from src.ai.embedding_cache import query_embedding_cache
+from src.services.media_cache import media_content_cache
+from src.services.vector_index import vector_index
+from handlers.webhook_handler import webhook_router, ingestion_queue, message_dispatcher, message_dedup
 from handlers.slash_commands import commands_router
 from utils.logger import setup_application_logging
 from services.reminder_scheduler import get_reminder_scheduler
@@ -81,6 +92,9 @@ async def startup_event():
     """Initialize application on startup."""
     logger.info("Starting Cute WhatsApp Bot...")
     
+    # Open shared outbound HTTP connection pools
+    await http_clients.start()
+    
     # Setup database
     await db_manager.setup_database()
     
@@ -90,21 +104,37 @@ async def startup_event():
     else:
         logger.error("Database connection failed")
     
-    # Start reminder scheduler
-    try:
-        scheduler = await get_reminder_scheduler()
-        await scheduler.start()
-        logger.info("Reminder scheduler started - checking every minute for due reminders")
-    except Exception as e:
-        logger.error(f"Failed to start reminder scheduler: {e}")
+    # Load the embedding tokenizer off the event loop
+    await embedding_batcher.start()
+    
+    # Start write-behind buffers
+    await last_seen_buffer.start()
+    await outbound_message_writer.start()
     
-    # Start media processing monitor
+    # Start webhook ingestion workers
     try:
-        media_monitor = await get_media_monitor()
-        await media_monitor.start()
-        logger.info("Media processing monitor started - checking every hour")
+        await ingestion_queue.start()
     except Exception as e:
-        logger.error(f"Failed to start media processing monitor: {e}")
+        logger.error(f"Failed to start ingestion queue: {e}")
+    
+    if settings.embedded_schedulers:
+        # Start reminder scheduler
+        try:
+            scheduler = await get_reminder_scheduler()
+            await scheduler.start()
+            logger.info("Reminder scheduler started - dispatching reminders at their trigger time")
+        except Exception as e:
+            logger.error(f"Failed to start reminder scheduler: {e}")
+        
+        # Start media processing monitor
+        try:
+            media_monitor = await get_media_monitor()
+            await media_monitor.start()
+            logger.info("Media processing monitor started - checking every hour")
+        except Exception as e:
+            logger.error(f"Failed to start media processing monitor: {e}")
+    else:
+        logger.info("Embedded schedulers disabled - reminders are dispatched by run_scheduler.py")
     
     logger.info("Application startup complete")
 
@@ -114,21 +144,51 @@ async def shutdown_event():
     """Clean up on application shutdown."""
     logger.info("Shutting down Cute WhatsApp Bot...")
     
-    # Stop reminder scheduler
+    # Drain queued webhook messages before stopping anything they depend on
+    try:
+        await ingestion_queue.stop()
+        await message_dispatcher.stop()
+        await message_dedup.close()
+        logger.info("Ingestion queue stopped successfully")
+    except Exception as e:
+        logger.error(f"Error stopping ingestion queue: {e}")
+    
+    if settings.embedded_schedulers:
+        # Stop reminder scheduler
+        try:
+            scheduler = await get_reminder_scheduler()
+            await scheduler.stop()
+            logger.info("Reminder scheduler stopped successfully")
+        except Exception as e:
+            logger.error(f"Error stopping reminder scheduler: {e}")
+        
+        # Stop media processing monitor
+        try:
+            media_monitor = await get_media_monitor()
+            await media_monitor.stop()
+            logger.info("Media processing monitor stopped successfully")
+        except Exception as e:
+            logger.error(f"Error stopping media processing monitor: {e}")
+    
+    # Flush write-behind buffers while the database pool is still up
     try:
-        scheduler = await get_reminder_scheduler()
-        await scheduler.stop()
-        logger.info("Reminder scheduler stopped successfully")
+        await last_seen_buffer.stop()
     except Exception as e:
-        logger.error(f"Error stopping reminder scheduler: {e}")
+        logger.error(f"Error flushing last_seen buffer: {e}")
     
-    # Stop media processing monitor
     try:
-        media_monitor = await get_media_monitor()
-        await media_monitor.stop()
-        logger.info("Media processing monitor stopped successfully")
+        await outbound_message_writer.stop()
     except Exception as e:
-        logger.error(f"Error stopping media processing monitor: {e}")
+        logger.error(f"Error flushing outbound message writer: {e}")
+    
+    try:
+        query_embedding_cache.flush()
+    except Exception as e:
+        logger.error(f"Error flushing query embedding cache: {e}")
+    
+    # Release database worker threads and outbound connections
+    db_manager.shutdown()
+    await http_clients.close()
     
     logger.info("👋 Application shutdown complete")
 
@@ -147,10 +207,29 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     db_healthy = await db_manager.health_check()
+    scheduler_status = {"embedded": False}
+    if settings.embedded_schedulers:
+        scheduler_status = (await get_reminder_scheduler()).get_status()
     
     return {
         "status": "healthy" if db_healthy else "unhealthy",
         "database": "connected" if db_healthy else "disconnected",
+        "db_offload": db_manager.get_offload_stats(),
+        "http_pools": http_clients.get_status(),
+        "user_context_cache": user_context_cache.get_status(),
+        "last_seen_buffer": last_seen_buffer.get_status(),
+        "outbound_messages": outbound_message_writer.get_status(),
+        "transcription": transcription_service.get_status(),
+        "local_classifier": local_classifier.get_status(),
+        "completion_cache": completion_cache.get_status(),
+        "embedding_batcher": embedding_batcher.get_status(),
+        "query_embedding_cache": query_embedding_cache.get_status(),
+        "media_cache": media_content_cache.get_status(),
+        "vector_index": vector_index.get_status(),
+        "ingestion_queue": ingestion_queue.get_status(),
+        "message_dispatcher": message_dispatcher.get_status(),
+        "message_dedup": message_dedup.get_status(),
+        "reminder_scheduler": scheduler_status,
         "timestamp": "2024-01-01T00:00:00Z"  # Would use actual timestamp
     }
 
@@ -1,12 +1,15 @@
 """
 Database schema models for Supabase tables.
 """
-from datetime import datetime
+from array import array
+from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
 
+from src.utils.vectors import to_embedding
+
 
 class MessageType(str, Enum):
     """Types of messages that can be processed."""
@@ -95,17 +98,25 @@ class Message(BaseModel):
     content: str
     tags: Optional[List[str]] = []
     session_id: Optional[UUID] = None
-    vector_embedding: Optional[List[float]] = None
+    vector_embedding: Optional[array] = None  # array('f'): 4 bytes per dimension
     transcription: Optional[str] = None
     source_type: SourceType
     origin_message_id: Optional[str] = None
     media_url: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
     
+    @field_validator("vector_embedding", mode="before")
+    @classmethod
+    def parse_vector_embedding(cls, value):
+        """Accept lists, NumPy arrays and pgvector's text form, e.g. "[0.1,0.2,...]"."""
+        return to_embedding(value)
+    
     class Config:
+        arbitrary_types_allowed = True
         json_encoders = {
             datetime: lambda v: v.isoformat(),
-            UUID: lambda v: str(v)
+            UUID: lambda v: str(v),
+            array: lambda v: v.tolist()
         }
 
 
@@ -119,10 +130,13 @@ class Reminder(BaseModel):
     repeat_type: RepeatType = RepeatType.NONE
     repeat_interval: Optional[int] = None
     repeat_until: Optional[datetime] = None  # End date for recurring reminders
+    series_id: Optional[UUID] = None  # Shared by every occurrence of a recurring reminder
     tags: Optional[List[str]] = []
     is_active: bool = True
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    claimed_at: Optional[datetime] = None  # Set by the scheduler instance sending this occurrence
+    claimed_by: Optional[str] = None
     
     class Config:
         json_encoders = {
@@ -139,6 +153,8 @@ class Birthday(BaseModel):
     birthdate: datetime  # Year can be 1900 if unknown
     tags: Optional[List[str]] = []
     notification_settings: Optional[Dict[str, Any]] = None
+    next_occurrence: Optional[date] = None  # Next anniversary, refreshed daily by the birthday notifier
+    last_notified_on: Optional[date] = None
     created_at: Optional[datetime] = None
     
     class Config:
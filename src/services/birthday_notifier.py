@@ -0,0 +1,147 @@
+"""
+Birthday notifications from a precomputed upcoming-birthday index.
+Every birthday stores its next anniversary in `next_occurrence`; a daily job
+rolls passed anniversaries forward so "upcoming birthdays" is a plain range
+scan. An hourly digest job sends each user one message per local day listing
+today's birthdays and the ones coming up on their `days_before` offsets,
+through the same rate-limited fan-out as reminders.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.settings import settings
+from src.models.database import Birthday, User
+from src.services.notification_fanout import notification_fanout
+from src.utils.helpers import birthday_reference_date
+from src.utils.timezone_utils import TimezoneManager
+
+logger = logging.getLogger(__name__)
+
+# Same as the notification_settings column default
+DEFAULT_DAYS_BEFORE = [1, 7]
+
+
+class BirthdayNotifier:
+    """Keeps next_occurrence current and sends the daily birthday digest."""
+
+    def __init__(self, db_service, whatsapp_service):
+        self.db_service = db_service
+        self.whatsapp_service = whatsapp_service
+
+        # Metrics
+        self._last_refresh_at: Optional[datetime] = None
+        self._refreshed = 0
+        self._last_digest_at: Optional[datetime] = None
+        self._digests_sent = 0
+        self._digests_failed = 0
+
+    async def refresh_occurrences(self) -> int:
+        """Roll every passed anniversary forward to the next one."""
+        try:
+            updated = await self.db_service.refresh_birthday_occurrences(birthday_reference_date())
+            self._refreshed += updated
+            self._last_refresh_at = datetime.now(timezone.utc)
+            if updated:
+                logger.info(f"Refreshed next occurrence of {updated} birthdays")
+            return updated
+        except Exception as e:
+            logger.error(f"Error refreshing birthday occurrences: {e}")
+            return 0
+
+    async def send_daily_digest(self) -> int:
+        """Send today's digest to every user whose local digest hour has passed and who has notices due."""
+        try:
+            now = datetime.now(timezone.utc)
+            # Local "today" ranges from UTC yesterday to UTC tomorrow
+            birthdays = await self.db_service.get_birthdays_occurring_between(
+                birthday_reference_date(now),
+                now.date() + timedelta(days=1 + settings.birthday_notice_max_days)
+            )
+            if not birthdays:
+                return 0
+
+            by_user: Dict[str, List[Birthday]] = defaultdict(list)
+            for birthday in birthdays:
+                by_user[str(birthday.user_id)].append(birthday)
+            users = await self.db_service.get_users_by_ids(list(by_user))
+
+            digests: List[Tuple[User, date, List[Tuple[Birthday, int]]]] = []
+            for user_id, user_birthdays in by_user.items():
+                user = users.get(user_id)
+                if not user:
+                    continue
+                local_now = TimezoneManager.convert_from_utc(now, user.timezone)
+                if local_now.hour < settings.birthday_digest_hour:
+                    continue  # A later run picks this user up
+                notices = self._due_notices(user_birthdays, local_now.date())
+                if notices:
+                    digests.append((user, local_now.date(), notices))
+
+            notified: Dict[date, List[str]] = defaultdict(list)
+
+            async def send(digest: Tuple[User, date, List[Tuple[Birthday, int]]]) -> bool:
+                user, local_today, notices = digest
+                success = await self.whatsapp_service.send_text_message(
+                    to=user.phone_number,
+                    message=self._format_digest(notices)
+                )
+                if success:
+                    notified[local_today].extend(str(birthday.id) for birthday, _ in notices)
+                return success
+
+            sent, failed = await notification_fanout.send_all(digests, send, label="birthday digests")
+
+            # Failed users are retried on the next hourly run
+            for local_today, birthday_ids in notified.items():
+                await self.db_service.set_birthday_fields(birthday_ids, {"last_notified_on": local_today.isoformat()})
+
+            self._digests_sent += sent
+            self._digests_failed += failed
+            self._last_digest_at = now
+            return sent
+
+        except Exception as e:
+            logger.error(f"Error sending birthday digest: {e}")
+            return 0
+
+    def _due_notices(self, birthdays: List[Birthday], local_today: date) -> List[Tuple[Birthday, int]]:
+        """Birthdays to mention today, with the number of days until each."""
+        notices = []
+        for birthday in birthdays:
+            if birthday.last_notified_on == local_today:
+                continue
+            notification_settings = birthday.notification_settings or {}
+            if not notification_settings.get("enabled", True):
+                continue
+
+            days_until = (birthday.next_occurrence - local_today).days
+            days_before = notification_settings.get("days_before") or DEFAULT_DAYS_BEFORE
+            if days_until == 0 or (days_until in days_before and days_until <= settings.birthday_notice_max_days):
+                notices.append((birthday, days_until))
+
+        notices.sort(key=lambda notice: notice[1])
+        return notices
+
+    def _format_digest(self, notices: List[Tuple[Birthday, int]]) -> str:
+        """Format the digest message for WhatsApp."""
+        message = "🎂 *Birthdays*\n"
+        for birthday, days_until in notices:
+            if days_until == 0:
+                message += f"\n🎉 Today is {birthday.person_name}'s birthday!"
+            elif days_until == 1:
+                message += f"\n📅 {birthday.person_name}'s birthday is tomorrow ({birthday.next_occurrence.strftime('%B %d')})"
+            else:
+                message += f"\n📅 {birthday.person_name}'s birthday is in {days_until} days ({birthday.next_occurrence.strftime('%B %d')})"
+        return message
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get refresh and digest metrics."""
+        return {
+            "last_refresh_at": self._last_refresh_at.isoformat() if self._last_refresh_at else None,
+            "occurrences_refreshed": self._refreshed,
+            "last_digest_at": self._last_digest_at.isoformat() if self._last_digest_at else None,
+            "digests_sent": self._digests_sent,
+            "digests_failed": self._digests_failed
+        }
@@ -11,6 +11,7 @@ import hashlib
 from datetime import datetime, timezone
 from supabase import create_client, Client
 import io
+from src.config.database import run_blocking
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -122,101 +123,153 @@ class FileStorageService:
             Dictionary with file info including path and metadata
         """
         try:
-            # Import models here to avoid circular imports
-            from src.models.database import File, FileType, UploadStatus, TranscriptionStatus
-            
             # Get user folder path
             user_folder_path = self.get_user_folder_path(user_id)
             
             # Generate unique filename
             unique_filename = self.generate_file_name(filename, file_content)
+            content_hash = hashlib.md5(file_content).hexdigest()
             
             # Create full storage path: user_id/file_type/unique_filename
             storage_path = f"{user_folder_path}/{file_type}/{unique_filename}"
             
             # Upload file to Supabase storage
-            result = self.supabase.storage.from_(self.storage_bucket).upload(
+            result = await run_blocking(
+                self.supabase.storage.from_(self.storage_bucket).upload,
                 path=storage_path,
                 file=file_content,
                 file_options={"content-type": self._get_content_type(filename, file_type)}
             )
             
-            # Get file size
-            file_size = len(file_content)
+            file_info = await self._create_file_record(
+                user_id=user_id,
+                filename=filename,
+                stored_name=unique_filename,
+                storage_path=storage_path,
+                file_size=len(file_content),
+                file_type=file_type,
+                message_id=message_id,
+                metadata={"content_hash": content_hash}
+            )
             
-            # Generate public URL (or signed URL if bucket is private)
-            public_url = self.supabase.storage.from_(self.storage_bucket).get_public_url(storage_path)
+            logger.info(f"File uploaded successfully to Supabase: {storage_path} ({file_info['file_size']} bytes), DB record: {file_info['file_id']}")
+            return file_info
             
-            # Map file_type string to FileType enum
-            file_type_enum = FileType.DOCUMENT  # Default
-            if file_type == "image":
-                file_type_enum = FileType.IMAGE
-            elif file_type == "audio":
-                file_type_enum = FileType.AUDIO
-            elif file_type == "video":
-                file_type_enum = FileType.VIDEO
-            elif file_type == "document":
-                file_type_enum = FileType.DOCUMENT
+        except Exception as e:
+            logger.error(f"Error uploading file for user {user_id}: {e}")
+            raise
+    
+    async def reference_existing_file(self, user_id: UUID, filename: str, file_type: str,
+                                      source: Dict[str, Any], message_id: Optional[UUID] = None) -> Dict[str, Any]:
+        """Create a file record that points at an object the user already uploaded.
+        
+        Used when the same content is sent again (forwarded images, re-sent voice
+        notes) so the bytes are not uploaded a second time.
+        
+        Args:
+            user_id: User's UUID
+            filename: Original filename of the new message
+            file_type: Type of file (image, audio, document, etc.)
+            source: Cached file entry with storage_path, stored_name, file_size, content_hash and file_id
+            message_id: Optional message ID to associate with the file
             
-            # Create file record in database
-            file_record = File(
-                id=uuid4(),
+        Returns:
+            Dictionary with file info, same shape as save_file
+        """
+        try:
+            file_info = await self._create_file_record(
                 user_id=user_id,
+                filename=filename,
+                stored_name=source["stored_name"],
+                storage_path=source["storage_path"],
+                file_size=source["file_size"],
+                file_type=file_type,
                 message_id=message_id,
-                filename=unique_filename,
-                original_filename=filename,
-                file_type=file_type_enum,
-                mime_type=self._get_content_type(filename, file_type),
-                file_size_bytes=file_size,
-                storage_path=storage_path,
-                storage_bucket=self.storage_bucket,
-                upload_status=UploadStatus.COMPLETED,
-                transcription_status=TranscriptionStatus.NOT_APPLICABLE if file_type != "audio" else TranscriptionStatus.PENDING,
                 metadata={
-                    "content_hash": hashlib.md5(file_content).hexdigest()
-                },
-                created_at=datetime.now(timezone.utc)
+                    "content_hash": source["content_hash"],
+                    "reused_from": source["file_id"]
+                }
             )
+            file_info["reused"] = True
             
-            # Save file record to database
-            saved_file_record = await self.db_service.save_file_record(file_record)
-            
-            # Create properly serialized database record (convert UUIDs to strings)
-            database_record = saved_file_record.dict()
-            if database_record.get('id'):
-                database_record['id'] = str(database_record['id'])
-            if database_record.get('user_id'):
-                database_record['user_id'] = str(database_record['user_id'])
-            if database_record.get('message_id'):
-                database_record['message_id'] = str(database_record['message_id'])
-            if database_record.get('created_at'):
-                database_record['created_at'] = database_record['created_at'].isoformat() if hasattr(database_record['created_at'], 'isoformat') else database_record['created_at']
-            if database_record.get('deleted_at'):
-                database_record['deleted_at'] = database_record['deleted_at'].isoformat() if hasattr(database_record['deleted_at'], 'isoformat') else database_record['deleted_at']
-            
-            # Create file info for backward compatibility
-            file_info = {
-                "original_name": filename,
-                "stored_name": unique_filename,
-                "storage_path": storage_path,
-                "public_url": public_url,
-                "file_size": file_size,
-                "file_type": file_type,
-                "user_id": str(user_id),
-                "bucket": self.storage_bucket,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "content_hash": hashlib.md5(file_content).hexdigest(),
-                "file_id": str(saved_file_record.id),  # Include database record ID
-                "database_record": database_record  # Include properly serialized database record
-            }
-            
-            logger.info(f"File uploaded successfully to Supabase: {storage_path} ({file_size} bytes), DB record: {saved_file_record.id}")
+            logger.info(f"Reused stored file {source['storage_path']} for {filename}, DB record: {file_info['file_id']}")
             return file_info
             
         except Exception as e:
-            logger.error(f"Error uploading file for user {user_id}: {e}")
+            logger.error(f"Error referencing existing file for user {user_id}: {e}")
             raise
     
+    async def _create_file_record(self, user_id: UUID, filename: str, stored_name: str, storage_path: str,
+                                  file_size: int, file_type: str, message_id: Optional[UUID],
+                                  metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the database record for a stored file and build the file info dict."""
+        # Import models here to avoid circular imports
+        from src.models.database import File, FileType, UploadStatus, TranscriptionStatus
+        
+        # Generate public URL (or signed URL if bucket is private)
+        public_url = self.supabase.storage.from_(self.storage_bucket).get_public_url(storage_path)
+        
+        # Map file_type string to FileType enum
+        file_type_enum = FileType.DOCUMENT  # Default
+        if file_type == "image":
+            file_type_enum = FileType.IMAGE
+        elif file_type == "audio":
+            file_type_enum = FileType.AUDIO
+        elif file_type == "video":
+            file_type_enum = FileType.VIDEO
+        elif file_type == "document":
+            file_type_enum = FileType.DOCUMENT
+        
+        # Create file record in database
+        file_record = File(
+            id=uuid4(),
+            user_id=user_id,
+            message_id=message_id,
+            filename=stored_name,
+            original_filename=filename,
+            file_type=file_type_enum,
+            mime_type=self._get_content_type(filename, file_type),
+            file_size_bytes=file_size,
+            storage_path=storage_path,
+            storage_bucket=self.storage_bucket,
+            upload_status=UploadStatus.COMPLETED,
+            transcription_status=TranscriptionStatus.NOT_APPLICABLE if file_type != "audio" else TranscriptionStatus.PENDING,
+            metadata=metadata,
+            created_at=datetime.now(timezone.utc)
+        )
+        
+        # Save file record to database
+        saved_file_record = await self.db_service.save_file_record(file_record)
+        
+        # Create properly serialized database record (convert UUIDs to strings)
+        database_record = saved_file_record.dict()
+        if database_record.get('id'):
+            database_record['id'] = str(database_record['id'])
+        if database_record.get('user_id'):
+            database_record['user_id'] = str(database_record['user_id'])
+        if database_record.get('message_id'):
+            database_record['message_id'] = str(database_record['message_id'])
+        if database_record.get('created_at'):
+            database_record['created_at'] = database_record['created_at'].isoformat() if hasattr(database_record['created_at'], 'isoformat') else database_record['created_at']
+        if database_record.get('deleted_at'):
+            database_record['deleted_at'] = database_record['deleted_at'].isoformat() if hasattr(database_record['deleted_at'], 'isoformat') else database_record['deleted_at']
+        
+        # Create file info for backward compatibility
+        return {
+            "original_name": filename,
+            "stored_name": stored_name,
+            "storage_path": storage_path,
+            "public_url": public_url,
+            "file_size": file_size,
+            "file_type": file_type,
+            "user_id": str(user_id),
+            "bucket": self.storage_bucket,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "content_hash": metadata.get("content_hash"),
+            "file_id": str(saved_file_record.id),  # Include database record ID
+            "database_record": database_record  # Include properly serialized database record
+        }
+    
     def _get_content_type(self, filename: str, file_type: str) -> str:
         """Get MIME content type based on filename and file type.
         
@@ -288,7 +341,7 @@ class FileStorageService:
                 return None
             
             # Download file from Supabase storage
-            result = self.supabase.storage.from_(self.storage_bucket).download(storage_path)
+            result = await run_blocking(self.supabase.storage.from_(self.storage_bucket).download, storage_path)
             
             if result:
                 logger.info(f"File retrieved successfully: {storage_path}")
@@ -319,7 +372,7 @@ class FileStorageService:
                 return False
             
             # Delete file from Supabase storage
-            result = self.supabase.storage.from_(self.storage_bucket).remove([storage_path])
+            result = await run_blocking(self.supabase.storage.from_(self.storage_bucket).remove, [storage_path])
             
             if result:
                 logger.info(f"File deleted successfully: {storage_path}")
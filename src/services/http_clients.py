@@ -0,0 +1,146 @@
+"""
+Shared, lifecycle-managed HTTP clients for outbound API calls.
+One keep-alive connection pool per upstream so calls to graph.facebook.com
+reuse TCP/TLS connections instead of opening a new client per request.
+"""
+import importlib.util
+import logging
+import time
+from typing import Any, Dict
+
+import httpx
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to count requests, in-flight calls and errors."""
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport):
+        self.transport = transport
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started_at = time.monotonic()
+        try:
+            return await self.transport.handle_async_request(request)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_latency += time.monotonic() - started_at
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection counts from the underlying httpcore pool, when exposed."""
+        pool = getattr(self.transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)()),
+            "http2_connections": sum(1 for conn in connections if "HTTP/2" in repr(conn))
+        }
+
+
+class HTTPClientPool:
+    """Registry of named httpx.AsyncClient instances, one per upstream."""
+
+    # Upstream name -> read timeout override (media downloads can be large)
+    UPSTREAMS = {
+        "graph": None,
+        "media": 120.0
+    }
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, _InstrumentedTransport] = {}
+        self.http2 = settings.http2_enabled and _http2_available()
+
+    def _create_client(self, name: str) -> httpx.AsyncClient:
+        """Build a pooled client for an upstream."""
+        read_timeout = self.UPSTREAMS.get(name) or settings.http_read_timeout_seconds
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds
+        )
+        timeout = httpx.Timeout(
+            read_timeout,
+            connect=settings.http_connect_timeout_seconds,
+            pool=settings.http_pool_timeout_seconds
+        )
+
+        transport = _InstrumentedTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=self.http2, retries=1)
+        )
+        self._transports[name] = transport
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    def get(self, name: str = "graph") -> httpx.AsyncClient:
+        """Get the shared client for an upstream, creating it if needed."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client(name)
+            self._clients[name] = client
+        return client
+
+    async def start(self):
+        """Create the clients for every known upstream."""
+        for name in self.UPSTREAMS:
+            self.get(name)
+        logger.info(f"HTTP client pools started: {', '.join(self.UPSTREAMS)} (HTTP/2: {self.http2})")
+
+    async def close(self):
+        """Close every client and its connection pool."""
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client '{name}': {e}")
+        self._clients.clear()
+        self._transports.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get per-upstream pool utilisation."""
+        status = {
+            "http2": self.http2,
+            "max_connections": settings.http_max_connections,
+            "max_keepalive_connections": settings.http_max_keepalive_connections,
+            "upstreams": {}
+        }
+        for name, transport in self._transports.items():
+            status["upstreams"][name] = {
+                "requests": transport.requests,
+                "errors": transport.errors,
+                "in_flight": transport.in_flight,
+                "max_in_flight": transport.max_in_flight,
+                "avg_latency_ms": round(transport.total_latency / transport.requests * 1000, 1) if transport.requests else 0.0,
+                **transport.pool_stats()
+            }
+        return status
+
+
+# Global HTTP client pool
+http_clients = HTTPClientPool()
+
+
+def get_http_client(name: str = "graph") -> httpx.AsyncClient:
+    """Get the shared HTTP client for an upstream."""
+    return http_clients.get(name)
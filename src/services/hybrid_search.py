@@ -0,0 +1,176 @@
+"""
+Hybrid message search: full-text/trigram and vector retrieval fused with
+reciprocal-rank fusion (RRF).
+The two retrievers run concurrently. Text search (search_messages_text)
+catches exact words, names and typos; vector search (the per-user vector
+index) catches paraphrases. Each result's fused score is
+sum(1 / (k + rank)) over the lists it appears in, so documents both
+retrievers agree on rise to the top without calibrating their raw scores.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from src.ai.embeddings import EmbeddingService
+from src.config.settings import settings
+from src.services.supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Timezone-aware datetime from a row value; naive values are taken as UTC."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class SearchFilters:
+    """Restrictions applied to both retrievers."""
+    tags: List[str] = field(default_factory=list)
+    message_type: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        """Whether a result row passes the filters; fields missing from the row aren't checked."""
+        if self.tags and "tags" in row and not set(self.tags) <= set(row.get("tags") or []):
+            return False
+        if self.message_type and row.get("type") is not None and row["type"] != self.message_type:
+            return False
+        if self.date_from or self.date_to:
+            timestamp = _parse_timestamp(row.get("message_timestamp"))
+            if timestamp is not None:
+                if self.date_from and timestamp < self.date_from:
+                    return False
+                if self.date_to and timestamp >= self.date_to:
+                    return False
+        return True
+
+    @property
+    def active(self) -> bool:
+        return bool(self.tags or self.message_type or self.date_from or self.date_to)
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Dict[str, Any]]], k: int) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists by message ID.
+
+    Args:
+        rankings: Retriever name -> results, best first
+        k: RRF constant; larger values flatten the advantage of top ranks
+
+    Returns:
+        Merged results with "score" and a "<retriever>_rank" per list they appeared in
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for name, results in rankings.items():
+        for rank, row in enumerate(results, start=1):
+            message_id = str(row["id"])
+            entry = fused.get(message_id)
+            if entry is None:
+                entry = fused[message_id] = {**row, "id": message_id, "score": 0.0}
+            else:
+                entry.update({key: value for key, value in row.items() if entry.get(key) is None})
+            entry["score"] += 1.0 / (k + rank)
+            entry[f"{name}_rank"] = rank
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+
+class HybridSearchService:
+    """Runs text and vector search concurrently and fuses them."""
+
+    def __init__(self, db_service: SupabaseService):
+        self.db_service = db_service
+        self.embedding_service = EmbeddingService()
+
+    async def search(
+        self,
+        user_id: UUID,
+        query: str,
+        filters: Optional[SearchFilters] = None,
+        page: int = 1,
+        page_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Search a user's messages.
+
+        Returns:
+            One page of fused results with the size of the fused pool, whether
+            more pages exist and the time each stage took in milliseconds
+        """
+        started = time.perf_counter()
+        filters = filters or SearchFilters()
+        page = max(page, 1)
+        page_size = max(1, min(page_size or settings.search_results_limit, settings.hybrid_search_max_page_size))
+        # Each retriever returns enough candidates to fill the requested page on its own
+        candidates = min(max(settings.hybrid_search_candidates, page * page_size), settings.hybrid_search_max_candidates)
+        timings: Dict[str, float] = {}
+
+        text_results, vector_results = await asyncio.gather(
+            self._text_search(user_id, query, filters, candidates, timings),
+            self._vector_search(user_id, query, filters, candidates, timings)
+        )
+
+        fusion_started = time.perf_counter()
+        fused = reciprocal_rank_fusion({"text": text_results, "vector": vector_results}, settings.hybrid_search_rrf_k)
+        offset = (page - 1) * page_size
+        results = fused[offset:offset + page_size]
+        timings["fusion"] = (time.perf_counter() - fusion_started) * 1000
+        timings["total"] = (time.perf_counter() - started) * 1000
+
+        return {
+            "query": query,
+            "results": results,
+            "page": page,
+            "page_size": page_size,
+            "total_candidates": len(fused),
+            "has_more": offset + page_size < len(fused),
+            "timings_ms": {stage: round(ms, 2) for stage, ms in timings.items()}
+        }
+
+    async def _text_search(self, user_id: UUID, query: str, filters: SearchFilters,
+                           limit: int, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return await self.db_service.search_messages_text(
+                user_id, query, limit=limit, tags=filters.tags,
+                message_type=filters.message_type, date_from=filters.date_from, date_to=filters.date_to
+            )
+        except Exception as e:
+            logger.error(f"Hybrid search text stage failed: {e}")
+            return []
+        finally:
+            timings["text"] = (time.perf_counter() - started) * 1000
+
+    async def _vector_search(self, user_id: UUID, query: str, filters: SearchFilters,
+                             limit: int, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            embedding = await self.embedding_service.create_embedding(query)
+            timings["embedding"] = (time.perf_counter() - started) * 1000
+            if embedding is None:
+                return []
+
+            search_started = time.perf_counter()
+            results = await self.db_service.search_messages_vector(
+                user_id, embedding, limit=limit,
+                similarity_threshold=settings.hybrid_search_similarity_threshold,
+                predicate=filters.matches if filters.active else None
+            )
+            timings["vector"] = (time.perf_counter() - search_started) * 1000
+            # The text-search fallback returns unranked rows without an ID
+            return [row for row in results if row.get("id") and "similarity" in row]
+        except Exception as e:
+            logger.error(f"Hybrid search vector stage failed: {e}")
+            return []
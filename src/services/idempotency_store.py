@@ -0,0 +1,132 @@
+"""
+Idempotency store for incoming WhatsApp message IDs.
+Meta redelivers webhooks it thinks failed, so every message ID is claimed
+once before processing. Claims live in a bounded TTL cache and, when
+REDIS_URL is configured, in Redis so they survive restarts and are shared
+across uvicorn workers.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from src.config.settings import settings
+from src.utils.ttl_cache import TTLCache
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis is optional - fall back to in-memory only
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class MessageIdempotencyStore:
+    """Claims message IDs so each one is processed only once."""
+
+    KEY_PREFIX = "wa:msg:"
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        redis_url: Optional[str] = None
+    ):
+        """Initialize the store.
+
+        Args:
+            ttl_seconds: How long a claimed ID is remembered (defaults to settings)
+            max_entries: In-memory capacity (defaults to settings)
+            redis_url: Shared Redis backend, empty to stay in-memory (defaults to settings)
+        """
+        self.ttl_seconds = ttl_seconds or settings.dedup_ttl_seconds
+        self._local = TTLCache(max_entries or settings.dedup_max_entries, self.ttl_seconds)
+
+        redis_url = redis_url if redis_url is not None else settings.redis_url
+        self._redis = None
+        if redis_url:
+            if redis_asyncio is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed - using in-memory dedup only")
+            else:
+                self._redis = redis_asyncio.from_url(redis_url)
+
+        # Metrics
+        self._duplicates = 0
+        self._new = 0
+        self._shared_duplicates = 0
+        self._backend_errors = 0
+        self._max_duplicate_age = 0.0
+        self._total_duplicate_age = 0.0
+
+    @property
+    def backend(self) -> str:
+        """Name of the backend in use."""
+        return "redis" if self._redis is not None else "memory"
+
+    async def claim(self, message_id: str) -> bool:
+        """Claim a message ID.
+
+        Returns:
+            True if this is the first time the ID was seen, False for a duplicate
+        """
+        now = time.time()
+        first_seen = self._local.get(message_id)
+        if first_seen is not None:
+            self._record_duplicate(now - first_seen)
+            return False
+
+        if self._redis is not None:
+            try:
+                claimed = await self._redis.set(
+                    self.KEY_PREFIX + message_id, str(now), nx=True, ex=self.ttl_seconds
+                )
+                if not claimed:
+                    stored = await self._redis.get(self.KEY_PREFIX + message_id)
+                    first_seen = float(stored) if stored else now
+                    self._local.set(message_id, first_seen)
+                    self._shared_duplicates += 1
+                    self._record_duplicate(now - first_seen)
+                    return False
+            except Exception as e:
+                # Don't drop messages because Redis is unavailable
+                self._backend_errors += 1
+                logger.error(f"Redis dedup check failed for {message_id}, using local cache only: {e}")
+
+        self._local.set(message_id, now)
+        self._new += 1
+        return True
+
+    async def release(self, message_id: str):
+        """Forget a claim so a redelivery of the message is processed."""
+        self._local.pop(message_id)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(self.KEY_PREFIX + message_id)
+            except Exception as e:
+                self._backend_errors += 1
+                logger.error(f"Error releasing dedup claim for {message_id}: {e}")
+
+    def _record_duplicate(self, age_seconds: float):
+        """Track duplicate counts and how long after first delivery they arrive."""
+        self._duplicates += 1
+        self._total_duplicate_age += age_seconds
+        self._max_duplicate_age = max(self._max_duplicate_age, age_seconds)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get dedup hit/miss counters for sizing against Meta's retry window."""
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "duplicates": self._duplicates,
+            "new": self._new,
+            "duplicate_ratio": round(self._duplicates / (self._duplicates + self._new), 4) if (self._duplicates + self._new) else 0.0,
+            "shared_duplicates": self._shared_duplicates,
+            "avg_duplicate_age_seconds": round(self._total_duplicate_age / self._duplicates, 1) if self._duplicates else 0.0,
+            "max_duplicate_age_seconds": round(self._max_duplicate_age, 1),
+            "backend_errors": self._backend_errors,
+            "local_cache": self._local.stats()
+        }
+
+    async def close(self):
+        """Close the Redis connection if one was opened."""
+        if self._redis is not None:
+            await self._redis.close()
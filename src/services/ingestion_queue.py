@@ -0,0 +1,160 @@
+"""
+In-process ingestion queue for incoming WhatsApp messages.
+Lets the webhook acknowledge Meta as soon as a payload is parsed while a
+pool of background workers does the slow routing work.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.config.settings import settings
+from src.models.message_types import ProcessedMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MessageIngestionQueue:
+    """Bounded message queue drained by a fixed pool of async workers."""
+
+    def __init__(
+        self,
+        handler: Callable[[ProcessedMessage], Awaitable[Any]],
+        max_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        enqueue_timeout: Optional[float] = None
+    ):
+        """Initialize the queue.
+
+        Args:
+            handler: Coroutine function called for every queued message
+            max_size: Maximum queue depth (defaults to settings)
+            workers: Number of worker tasks (defaults to settings)
+            enqueue_timeout: Seconds to wait for space when the queue is full
+        """
+        self.handler = handler
+        self.max_size = max_size or settings.ingestion_queue_max_size
+        self.worker_count = workers or settings.ingestion_workers
+        self.enqueue_timeout = enqueue_timeout if enqueue_timeout is not None else settings.ingestion_enqueue_timeout_seconds
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers: List[asyncio.Task] = []
+        self.is_running = False
+        self._accepting = False
+
+        # Metrics
+        self._busy_workers = 0
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._blocked_enqueues = 0
+        self._high_watermark = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    async def start(self):
+        """Start the worker pool."""
+        if self.is_running:
+            logger.warning("Ingestion queue is already running")
+            return
+
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        self.is_running = True
+        self._accepting = True
+        logger.info(f"Ingestion queue started with {self.worker_count} workers (max depth {self.max_size})")
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Stop accepting messages, drain what is queued, then stop the workers."""
+        if not self.is_running:
+            return
+
+        self._accepting = False
+        drain_timeout = timeout if timeout is not None else settings.ingestion_drain_timeout_seconds
+        pending = self._queue.qsize()
+        logger.info(f"Draining ingestion queue ({pending} queued, {self._busy_workers} in progress)...")
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            logger.info("Ingestion queue drained")
+        except asyncio.TimeoutError:
+            logger.error(f"Ingestion queue drain timed out after {drain_timeout}s - {self._queue.qsize()} messages not processed")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.is_running = False
+
+    async def enqueue(self, message: ProcessedMessage) -> bool:
+        """Queue a message for background routing.
+
+        Returns:
+            True if the message was queued, False if the queue is full or stopped
+        """
+        if not self._accepting:
+            logger.warning(f"Ingestion queue not accepting messages, rejecting {message.message_id}")
+            self._rejected += 1
+            return False
+
+        item = (time.monotonic(), message)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._blocked_enqueues += 1
+            logger.warning(f"Ingestion queue full ({self.max_size}), waiting up to {self.enqueue_timeout}s for space")
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self._rejected += 1
+                logger.error(f"Ingestion queue still full, rejecting message {message.message_id}")
+                return False
+
+        self._enqueued += 1
+        self._high_watermark = max(self._high_watermark, self._queue.qsize())
+        return True
+
+    async def _worker(self, worker_id: int):
+        """Worker loop - route queued messages until cancelled."""
+        while True:
+            enqueued_at, message = await self._queue.get()
+            self._busy_workers += 1
+            try:
+                wait_seconds = time.monotonic() - enqueued_at
+                self._total_wait_seconds += wait_seconds
+                self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+                await self.handler(message)
+                self._processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Ingestion worker {worker_id} failed processing {message.message_id}: {e}", exc_info=True)
+            finally:
+                self._busy_workers -= 1
+                self._queue.task_done()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get queue depth and backpressure metrics."""
+        completed = self._processed + self._failed
+        return {
+            "is_running": self.is_running,
+            "accepting": self._accepting,
+            "workers": self.worker_count,
+            "busy_workers": self._busy_workers,
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_size,
+            "high_watermark": self._high_watermark,
+            "utilization": round(self._queue.qsize() / self.max_size, 3) if self.max_size else 0.0,
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "blocked_enqueues": self._blocked_enqueues,
+            "avg_wait_ms": round(self._total_wait_seconds / completed * 1000, 1) if completed else 0.0,
+            "max_wait_ms": round(self._max_wait_seconds * 1000, 1)
+        }
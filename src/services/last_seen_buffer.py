@@ -0,0 +1,126 @@
+"""
+Write-behind buffer for users.last_seen.
+Every inbound and outbound message used to UPDATE the user's last_seen.
+Instead, touches are coalesced per user in memory and flushed periodically
+(and at shutdown) with one UPDATE per minute bucket, which is the
+granularity the admin panel shows anyway.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from src.config.database import get_admin_client, run_query
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LastSeenBuffer:
+    """Coalesces last_seen updates per user and flushes them in bulk."""
+
+    # Keep PostgREST "id=in.(...)" filters to a sane URL length
+    MAX_IDS_PER_STATEMENT = 200
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = flush_interval or settings.last_seen_flush_interval_seconds
+        self._pending: Dict[str, datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._touches = 0
+        self._flushes = 0
+        self._statements = 0
+        self._rows_written = 0
+        self._failures = 0
+
+    def touch(self, user_id: UUID, seen_at: datetime):
+        """Record that a user was seen; only the latest time per user is kept."""
+        self._touches += 1
+        key = str(user_id)
+        current = self._pending.get(key)
+        if current is None or seen_at > current:
+            self._pending[key] = seen_at
+
+    async def start(self):
+        """Start the periodic flush loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info(f"last_seen buffer started - flushing every {self.flush_interval}s")
+
+    async def stop(self):
+        """Stop the flush loop and write out anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write pending last_seen values. Returns the number of users updated."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            self._flushes += 1
+
+            # Group users by the minute they were last seen so each group is one UPDATE
+            buckets: Dict[datetime, List[str]] = defaultdict(list)
+            for user_id, seen_at in batch.items():
+                buckets[seen_at.replace(second=0, microsecond=0)].append(user_id)
+
+            written = 0
+            for minute, user_ids in buckets.items():
+                for i in range(0, len(user_ids), self.MAX_IDS_PER_STATEMENT):
+                    chunk = user_ids[i:i + self.MAX_IDS_PER_STATEMENT]
+                    try:
+                        await run_query(
+                            get_admin_client().table("users").update(
+                                {"last_seen": minute.isoformat()}
+                            ).in_("id", chunk)
+                        )
+                        self._statements += 1
+                        written += len(chunk)
+                    except Exception as e:
+                        self._failures += 1
+                        logger.error(f"Error flushing last_seen for {len(chunk)} users: {e}")
+                        # Put them back unless a newer touch arrived meanwhile
+                        for user_id in chunk:
+                            self.touch_if_newer(user_id, batch[user_id])
+
+            self._rows_written += written
+            logger.debug(f"Flushed last_seen for {written} users in {len(buckets)} buckets")
+            return written
+
+    def touch_if_newer(self, user_id: str, seen_at: datetime):
+        """Re-queue a value after a failed flush without counting it as a new touch."""
+        current = self._pending.get(user_id)
+        if current is None or seen_at > current:
+            self._pending[user_id] = seen_at
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get buffer metrics, including how many writes coalescing has saved."""
+        return {
+            "is_running": self._task is not None,
+            "flush_interval_seconds": self.flush_interval,
+            "pending_users": len(self._pending),
+            "touches": self._touches,
+            "flushes": self._flushes,
+            "statements": self._statements,
+            "rows_written": self._rows_written,
+            "writes_saved": max(self._touches - self._statements - len(self._pending), 0),
+            "failures": self._failures
+        }
+
+
+# Global last_seen buffer instance
+last_seen_buffer = LastSeenBuffer()
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache for processed media.
+Forwarded images and re-sent voice notes arrive with identical bytes. Keyed on
+the MD5 content hash (per user), this remembers the stored object and the AI
+results derived from it so a repeat can skip the upload, image analysis,
+transcription and embedding. Misses fall back to the `files` table, looked up
+through the index on `metadata->>'content_hash'`.
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from src.config.settings import settings
+from src.utils.ttl_cache import TTLCache
+from src.utils.vectors import Embedding, to_embedding
+
+logger = logging.getLogger(__name__)
+
+# Artifacts that can be reused from an earlier copy of the same content
+REUSABLE_ARTIFACTS = ("upload", "image_analysis", "transcription", "embedding")
+
+
+def content_hash(file_content: bytes) -> str:
+    """Hash used to identify identical media (same as files.metadata.content_hash)."""
+    return hashlib.md5(file_content).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """Hash of the text an embedding was generated from."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+class MediaContentCache:
+    """Per-user cache of processed media keyed by content hash."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self._entries = TTLCache(
+            max_entries or settings.media_cache_max_entries,
+            ttl_seconds or settings.media_cache_ttl_seconds
+        )
+        self._db_service = None
+
+        # Metrics
+        self._lookups = 0
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._reused = {artifact: 0 for artifact in REUSABLE_ARTIFACTS}
+
+    @property
+    def db_service(self):
+        """Database service, created on first use."""
+        if self._db_service is None:
+            from src.services.supabase_service import SupabaseService
+            self._db_service = SupabaseService()
+        return self._db_service
+
+    def set_db_service(self, db_service):
+        """Use an existing database service instead of creating one."""
+        self._db_service = db_service
+
+    async def lookup(self, user_id: UUID, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Find an earlier copy of this content for the user.
+
+        Args:
+            user_id: User's UUID
+            file_hash: MD5 of the file content
+
+        Returns:
+            Cache entry (storage location and known AI results), or None
+        """
+        self._lookups += 1
+        key = (str(user_id), file_hash)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._memory_hits += 1
+            return entry
+
+        file_record = await self.db_service.find_file_by_content_hash(user_id, file_hash)
+        if file_record is None:
+            self._misses += 1
+            return None
+
+        self._db_hits += 1
+        metadata = file_record.metadata or {}
+        entry = {
+            "file_id": str(file_record.id),
+            "stored_name": file_record.filename,
+            "storage_path": file_record.storage_path,
+            "file_size": file_record.file_size_bytes,
+            "content_hash": file_hash,
+            "message_id": str(file_record.message_id) if file_record.message_id else None,
+            "ai_description": metadata.get("ai_description"),
+            "transcription": file_record.transcription_text,
+            "embedding_text_hash": metadata.get("embedding_text_hash"),
+            "embedding": None
+        }
+        self._entries.set(key, entry)
+        return entry
+
+    def remember(self, user_id: UUID, file_info: Dict[str, Any], ai_description: Optional[str] = None,
+                 transcription: Optional[str] = None, embedding_text: Optional[str] = None,
+                 embedding: Optional[Embedding] = None):
+        """
+        Store the results of processing a file so the next copy can reuse them.
+
+        Args:
+            user_id: User's UUID
+            file_info: File info returned by FileStorageService
+            ai_description: Image analysis, if any
+            transcription: Audio transcription, if any
+            embedding_text: Text the embedding was generated from
+            embedding: Vector embedding, if one was generated
+        """
+        file_hash = file_info.get("content_hash")
+        if not file_hash:
+            return
+        self._entries.set((str(user_id), file_hash), {
+            "file_id": file_info["file_id"],
+            "stored_name": file_info["stored_name"],
+            "storage_path": file_info["storage_path"],
+            "file_size": file_info["file_size"],
+            "content_hash": file_hash,
+            "message_id": None,
+            "ai_description": ai_description,
+            "transcription": transcription,
+            "embedding_text_hash": text_hash(embedding_text) if embedding_text else None,
+            # Compact float32 storage - embeddings are the bulk of an entry
+            "embedding": to_embedding(embedding) if embedding else None
+        })
+
+    async def get_embedding(self, entry: Dict[str, Any], embedding_text: str) -> Optional[Embedding]:
+        """
+        Reuse the cached embedding if it was generated from the same text.
+
+        The caption can differ between copies of the same image, so the
+        embedding is only reused when the embedded text matches exactly.
+        """
+        if entry.get("embedding_text_hash") != text_hash(embedding_text):
+            return None
+
+        embedding = entry.get("embedding")
+        if embedding is None and entry.get("message_id"):
+            stored = await self.db_service.get_message_embedding(UUID(entry["message_id"]))
+            if stored:
+                embedding = stored
+                entry["embedding"] = embedding
+
+        if embedding is None:
+            return None
+        self.record_reuse("embedding")
+        return embedding
+
+    def record_reuse(self, artifact: str):
+        """Count an artifact that didn't have to be recomputed."""
+        self._reused[artifact] = self._reused.get(artifact, 0) + 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get hit ratios and reuse counts."""
+        hits = self._memory_hits + self._db_hits
+        return {
+            "lookups": self._lookups,
+            "memory_hits": self._memory_hits,
+            "db_hits": self._db_hits,
+            "misses": self._misses,
+            "hit_ratio": round(hits / self._lookups, 3) if self._lookups else 0.0,
+            "reused": dict(self._reused),
+            "entries": self._entries.stats()
+        }
+
+
+# Global media content cache instance
+media_content_cache = MediaContentCache()
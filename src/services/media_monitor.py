@@ -10,6 +10,7 @@ from collections import defaultdict
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from src.config.database import run_query
 from src.services.supabase_service import SupabaseService
 
 logger = logging.getLogger(__name__)
@@ -81,9 +82,9 @@ class MediaProcessingMonitor:
             since_iso = since_time.isoformat()
             
             # Query recent media files
-            result = self.db_service.admin_client.table('files').select(
+            result = await run_query(self.db_service.admin_client.table('files').select(
                 'filename, file_type, upload_status, transcription_status'
-            ).gte('created_at', since_iso).execute()
+            ).gte('created_at', since_iso))
             
             recent_files = result.data or []
             
@@ -123,9 +124,9 @@ class MediaProcessingMonitor:
             since_iso = since_time.isoformat()
             
             # Query recent files
-            result = self.db_service.admin_client.table('files').select(
+            result = await run_query(self.db_service.admin_client.table('files').select(
                 'filename, file_type, mime_type, file_size, upload_status, transcription_status, created_at'
-            ).gte('created_at', since_iso).order('created_at', desc=True).limit(100).execute()
+            ).gte('created_at', since_iso).order('created_at', desc=True).limit(100))
             
             recent_files = result.data or []
             
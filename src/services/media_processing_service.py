@@ -4,15 +4,20 @@ Includes file download, storage, transcription, and vector embedding creation.
 """
 import os
 import logging
-import aiohttp
 import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from uuid import UUID
 from datetime import datetime, timezone
 import io
 from PIL import Image
 import openai
 
+from src.config.database import run_query
+from src.services.http_clients import get_http_client
+from src.ai.transcription import transcription_service
+from src.ai.embedding_batcher import embedding_batcher
+from src.utils.vectors import Embedding
+from src.services.media_cache import media_content_cache, content_hash, text_hash
 from src.services.file_storage_service import FileStorageService
 from src.services.supabase_service import SupabaseService
 from src.models.database import Message, MessageType, SourceType
@@ -29,6 +34,7 @@ class MediaProcessingService:
     def __init__(self):
         self.file_storage = FileStorageService()
         self.db_service = SupabaseService()
+        media_content_cache.set_db_service(self.db_service)
         
         # Supported file types
         self.image_types = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
@@ -47,42 +53,41 @@ class MediaProcessingService:
         """
         try:
             # Step 1: Get media URL and metadata
-            async with aiohttp.ClientSession() as session:
-                url = f"https://graph.facebook.com/v18.0/{media_id}"
-                headers = {"Authorization": f"Bearer {access_token}"}
+            url = f"https://graph.facebook.com/v18.0/{media_id}"
+            headers = {"Authorization": f"Bearer {access_token}"}
+            
+            response = await get_http_client("graph").get(url, headers=headers)
+            if response.status_code == 200:
+                media_info = response.json()
+                media_url = media_info.get('url')
+                mime_type = media_info.get('mime_type')
+                file_size = media_info.get('file_size')
                 
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        media_info = await response.json()
-                        media_url = media_info.get('url')
-                        mime_type = media_info.get('mime_type')
-                        file_size = media_info.get('file_size')
-                        
-                        logger.info(f"WhatsApp media info - MIME: {mime_type}, Size: {file_size}")
-                        
-                        if not media_url:
-                            logger.error(f"No URL found in media info: {media_info}")
-                            return None
-                    else:
-                        logger.error(f"Failed to get media URL: {response.status}")
-                        return None
+                logger.info(f"WhatsApp media info - MIME: {mime_type}, Size: {file_size}")
+                
+                if not media_url:
+                    logger.error(f"No URL found in media info: {media_info}")
+                    return None
+            else:
+                logger.error(f"Failed to get media URL: {response.status_code}")
+                return None
+            
+            # Step 2: Download the actual file
+            response = await get_http_client("media").get(media_url, headers=headers)
+            if response.status_code == 200:
+                file_content = response.content
+                logger.info(f"Downloaded media file: {len(file_content)} bytes, MIME: {mime_type}")
+                
+                return {
+                    "content": file_content,
+                    "mime_type": mime_type,
+                    "file_size": file_size,
+                    "media_id": media_id
+                }
+            else:
+                logger.error(f"Failed to download media file: {response.status_code}")
+                return None
                 
-                # Step 2: Download the actual file
-                async with session.get(media_url, headers=headers) as response:
-                    if response.status == 200:
-                        file_content = await response.read()
-                        logger.info(f"Downloaded media file: {len(file_content)} bytes, MIME: {mime_type}")
-                        
-                        return {
-                            "content": file_content,
-                            "mime_type": mime_type,
-                            "file_size": file_size,
-                            "media_id": media_id
-                        }
-                    else:
-                        logger.error(f"Failed to download media file: {response.status}")
-                        return None
-                        
         except Exception as e:
             logger.error(f"Error downloading WhatsApp media {media_id}: {e}")
             return None
@@ -173,13 +178,8 @@ class MediaProcessingService:
             Dictionary with processing results
         """
         try:
-            # Save file to storage
-            file_info = await self.file_storage.save_file(
-                user_id=user_id,
-                filename=filename,
-                file_content=file_content,
-                file_type="image"
-            )
+            # Save file to storage (or reuse the stored copy of identical content)
+            file_info, cached = await self._save_or_reuse_file(user_id, filename, file_content, "image")
             
             # Get image metadata
             try:
@@ -195,17 +195,25 @@ class MediaProcessingService:
                 metadata = {}
             
             # Generate AI description of the image using GPT-4V
-            ai_description = await self.analyze_image_content(file_content, filename)
+            if cached and cached.get("ai_description"):
+                ai_description = cached["ai_description"]
+                media_content_cache.record_reuse("image_analysis")
+                logger.info(f"Reusing image analysis for identical content: {filename}")
+            else:
+                ai_description = await self.analyze_image_content(file_content, filename)
             
-            # Create content for vector embedding
-            content_for_embedding = f"Image: {filename}"
+            # Create content for vector embedding (the generated filename is left out
+            # so identical images with the same caption embed to the same text)
+            content_for_embedding = "Image"
             if caption:
                 content_for_embedding += f" - {caption}"
             if ai_description:
                 content_for_embedding += f" - AI Analysis: {ai_description}"
             
             # Generate vector embedding
-            vector_embedding = await self.generate_vector_embedding(content_for_embedding)
+            vector_embedding = await self._get_media_embedding(content_for_embedding, cached)
+            await self._remember_media_results(user_id, file_info, ai_description=ai_description,
+                                               embedding_text=content_for_embedding, embedding=vector_embedding)
             
             result = {
                 "type": "image",
@@ -310,18 +318,18 @@ class MediaProcessingService:
         try:
             logger.info(f"Processing audio file: {filename} ({len(file_content)} bytes)")
             
-            # Save file to storage
-            file_info = await self.file_storage.save_file(
-                user_id=user_id,
-                filename=filename,
-                file_content=file_content,
-                file_type="audio"
-            )
+            # Save file to storage (or reuse the stored copy of identical content)
+            file_info, cached = await self._save_or_reuse_file(user_id, filename, file_content, "audio")
             logger.info(f"Audio file saved to storage: {file_info.get('public_url', 'No URL')}")
             
             # Transcribe audio using OpenAI Whisper
-            logger.info("Starting audio transcription with OpenAI Whisper...")
-            transcription = await self.transcribe_audio(file_content, filename)
+            if cached and cached.get("transcription"):
+                transcription = cached["transcription"]
+                media_content_cache.record_reuse("transcription")
+                logger.info("Reusing transcription for identical voice note")
+            else:
+                logger.info("Starting audio transcription with OpenAI Whisper...")
+                transcription = await self.transcribe_audio(file_content, filename)
             
             if transcription:
                 logger.info(f"Transcription successful: {len(transcription)} characters")
@@ -333,7 +341,9 @@ class MediaProcessingService:
             content_for_embedding = transcription or f"Voice note: {filename}"
             
             # Generate vector embedding
-            vector_embedding = await self.generate_vector_embedding(content_for_embedding)
+            vector_embedding = await self._get_media_embedding(content_for_embedding, cached)
+            await self._remember_media_results(user_id, file_info, transcription=transcription,
+                                               embedding_text=content_for_embedding, embedding=vector_embedding)
             
             result = {
                 "type": "audio",
@@ -363,13 +373,8 @@ class MediaProcessingService:
             Dictionary with processing results
         """
         try:
-            # Save file to storage
-            file_info = await self.file_storage.save_file(
-                user_id=user_id,
-                filename=filename,
-                file_content=file_content,
-                file_type="document"
-            )
+            # Save file to storage (or reuse the stored copy of identical content)
+            file_info, cached = await self._save_or_reuse_file(user_id, filename, file_content, "document")
             
             # Try to extract text content (basic implementation)
             extracted_text = await self.extract_document_text(file_content, filename)
@@ -378,7 +383,9 @@ class MediaProcessingService:
             content_for_embedding = extracted_text or f"Document: {filename}"
             
             # Generate vector embedding
-            vector_embedding = await self.generate_vector_embedding(content_for_embedding)
+            vector_embedding = await self._get_media_embedding(content_for_embedding, cached)
+            await self._remember_media_results(user_id, file_info, embedding_text=content_for_embedding,
+                                               embedding=vector_embedding)
             
             result = {
                 "type": "document",
@@ -396,6 +403,73 @@ class MediaProcessingService:
             logger.error(f"Error processing document {filename}: {e}")
             raise
     
+    async def _save_or_reuse_file(self, user_id: UUID, filename: str, file_content: bytes,
+                                  file_type: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Save a file, or reference the stored copy if the user sent identical content before.
+        
+        Args:
+            user_id: User's UUID
+            filename: Original filename
+            file_content: File content as bytes
+            file_type: Type of file (image, audio, document, etc.)
+            
+        Returns:
+            Tuple of (file info, media cache entry of the earlier copy or None)
+        """
+        cached = await media_content_cache.lookup(user_id, content_hash(file_content))
+        if cached:
+            try:
+                file_info = await self.file_storage.reference_existing_file(
+                    user_id=user_id,
+                    filename=filename,
+                    file_type=file_type,
+                    source=cached
+                )
+                media_content_cache.record_reuse("upload")
+                return file_info, cached
+            except Exception as e:
+                logger.warning(f"Could not reuse stored file for {filename}, uploading again: {e}")
+        
+        file_info = await self.file_storage.save_file(
+            user_id=user_id,
+            filename=filename,
+            file_content=file_content,
+            file_type=file_type
+        )
+        return file_info, cached
+    
+    async def _get_media_embedding(self, text: str, cached: Optional[Dict[str, Any]]) -> Optional[Embedding]:
+        """Reuse the earlier copy's embedding when the embedded text is unchanged, otherwise generate one."""
+        if cached:
+            embedding = await media_content_cache.get_embedding(cached, text)
+            if embedding is not None:
+                return embedding
+        return await self.generate_vector_embedding(text)
+    
+    async def _remember_media_results(self, user_id: UUID, file_info: Dict[str, Any],
+                                      ai_description: Optional[str] = None, transcription: Optional[str] = None,
+                                      embedding_text: Optional[str] = None,
+                                      embedding: Optional[Embedding] = None):
+        """Cache the AI results for this content and persist them on the file record.
+        
+        Storing them in files.metadata lets a later copy reuse them after a
+        restart or from another worker, not just from the in-memory cache.
+        """
+        media_content_cache.remember(
+            user_id, file_info,
+            ai_description=ai_description,
+            transcription=transcription,
+            embedding_text=embedding_text,
+            embedding=embedding
+        )
+        
+        metadata = dict((file_info.get("database_record") or {}).get("metadata") or {})
+        if ai_description:
+            metadata["ai_description"] = ai_description
+        if embedding_text:
+            metadata["embedding_text_hash"] = text_hash(embedding_text)
+        await self.db_service.update_file_metadata(UUID(file_info["file_id"]), metadata, transcription_text=transcription)
+    
     async def transcribe_audio(self, file_content: bytes, filename: str) -> Optional[str]:
         """Transcribe audio using OpenAI Whisper API.
         
@@ -406,51 +480,11 @@ class MediaProcessingService:
         Returns:
             Transcription text, or None if failed
         """
-        try:
-            logger.info(f"Transcribing audio file: {filename} ({len(file_content)} bytes)")
-            
-            # Import OpenAI client
-            from openai import OpenAI
-            import tempfile
-            import os
-            
-            # Initialize OpenAI client
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            
-            # Create a temporary file for the audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix=self._get_audio_extension(filename)) as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
-            try:
-                # Transcribe using OpenAI Whisper
-                with open(temp_file_path, "rb") as audio_file:
-                    transcript = client.audio.transcriptions.create(
-                        model=os.getenv("OPENAI_MODEL_VTT", "whisper-1"),
-                        file=audio_file,
-                        response_format="text"
-                    )
-                
-                # Clean up transcription text
-                transcription_text = transcript.strip() if transcript else ""
-                
-                if transcription_text:
-                    logger.info(f"Successfully transcribed audio: {len(transcription_text)} characters")
-                    return transcription_text
-                else:
-                    logger.warning(f"Empty transcription for {filename}")
-                    return None
-                    
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_file_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Could not delete temp file {temp_file_path}: {cleanup_error}")
-            
-        except Exception as e:
-            logger.error(f"Error transcribing audio {filename}: {e}")
-            return None
+        logger.info(f"Transcribing audio file: {filename} ({len(file_content)} bytes)")
+        
+        # Whisper detects the format from the extension, so make sure there is one
+        upload_name = os.path.splitext(os.path.basename(filename))[0] + self._get_audio_extension(filename)
+        return await transcription_service.transcribe(file_content, upload_name)
     
     def _generate_filename_with_extension(self, filename: str, mime_type: Optional[str]) -> str:
         """Generate appropriate filename with extension based on MIME type.
@@ -580,26 +614,20 @@ class MediaProcessingService:
             logger.error(f"Error extracting text from {filename}: {e}")
             return None
     
-    async def generate_vector_embedding(self, text: str) -> Optional[List[float]]:
+    async def generate_vector_embedding(self, text: str) -> Optional[Embedding]:
         """Generate vector embedding for text using OpenAI.
         
+        Concurrent calls are coalesced into batched requests by the embedding batcher.
+        
         Args:
             text: Text to embed
             
         Returns:
-            Vector embedding as list of floats, or None if failed
+            Vector embedding as array('f'), or None if failed
         """
         try:
-            # TODO: Implement actual OpenAI embeddings API call
-            # This would involve calling openai.Embedding.create()
-            
-            logger.info(f"Generating vector embedding for text: {text[:50]}...")
-            
-            # Placeholder implementation - would return actual embeddings
-            # return openai.Embedding.create(input=text, model="text-embedding-ada-002")['data'][0]['embedding']
-            
-            # For now, return None to indicate no embedding
-            return None
+            logger.debug(f"Generating vector embedding for text: {text[:50]}...")
+            return await embedding_batcher.embed(text)
             
         except Exception as e:
             logger.error(f"Error generating vector embedding: {e}")
@@ -652,12 +680,7 @@ class MediaProcessingService:
                 message_type = MessageType.NOTE
             else:
                 # Unknown file type - still save it
-                file_info = await self.file_storage.save_file(
-                    user_id=user_id,
-                    filename=filename,
-                    file_content=file_content,
-                    file_type="unknown"
-                )
+                file_info, _ = await self._save_or_reuse_file(user_id, filename, file_content, "unknown")
                 processing_result = {
                     "type": "unknown",
                     "file_info": file_info,
@@ -713,9 +736,9 @@ class MediaProcessingService:
                 self.db_service = SupabaseService()
             
             # Update the file record with the message ID
-            result = self.db_service.admin_client.table("files").update({
+            result = await run_query(self.db_service.admin_client.table("files").update({
                 "message_id": str(message_id)
-            }).eq("id", str(file_id)).execute()
+            }).eq("id", str(file_id)))
             
             return len(result.data) > 0
             
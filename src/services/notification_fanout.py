@@ -0,0 +1,124 @@
+"""
+Bounded-concurrency, rate-limited fan-out for proactive notifications.
+When thousands of reminders come due in the same minute (08:00, 09:00),
+sending them one at a time lets the tail drift by minutes. The fan-out runs
+a fixed pool of senders that share one token bucket sized to the WhatsApp
+Cloud API throughput tier, so batches go out as fast as the API allows
+without tripping its rate limit. One semaphore bounds in-flight sends
+across every batch, so overlapping batches don't multiply concurrency.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+from src.config.settings import settings
+from src.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class NotificationFanout:
+    """Sends batches of notifications concurrently under a shared rate limit."""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        self.concurrency = concurrency or settings.reminder_send_concurrency
+        # Shared by all batches, so concurrency bounds sends process-wide
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.limiter = TokenBucket(
+            rate_per_second or settings.whatsapp_send_rate_per_second,
+            burst or settings.whatsapp_send_burst or None
+        )
+
+        # Metrics
+        self._batches = 0
+        self._sent = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._last_batch: Dict[str, Any] = {}
+        self._peak_sends_per_second = 0.0
+
+    async def send_all(self, items: Iterable[T], send: Callable[[T], Awaitable[bool]],
+                       label: str = "notifications") -> Tuple[int, int]:
+        """
+        Send every item with bounded concurrency.
+
+        Args:
+            items: Notifications to send
+            send: Coroutine function sending one item, returning True on success
+            label: Name used in logs and metrics
+
+        Returns:
+            Tuple of (sent, failed)
+        """
+        items = list(items)
+        if not items:
+            return 0, 0
+
+        pending = iter(items)
+        sent = 0
+        failed = 0
+        started_at = time.monotonic()
+
+        async def sender():
+            nonlocal sent, failed
+            # Each sender pulls the next item as soon as it is free
+            for item in pending:
+                async with self._slots:
+                    await self.limiter.acquire()
+                    self._in_flight += 1
+                    try:
+                        ok = await send(item)
+                    except Exception as e:
+                        logger.error(f"Error sending one of {len(items)} {label}: {e}")
+                        ok = False
+                    finally:
+                        self._in_flight -= 1
+                if ok:
+                    sent += 1
+                else:
+                    failed += 1
+
+        await asyncio.gather(*(sender() for _ in range(min(self.concurrency, len(items)))))
+
+        duration = time.monotonic() - started_at
+        sends_per_second = sent / duration if duration > 0 else float(sent)
+        self._batches += 1
+        self._sent += sent
+        self._failed += failed
+        self._peak_sends_per_second = max(self._peak_sends_per_second, sends_per_second)
+        self._last_batch = {
+            "label": label,
+            "size": len(items),
+            "sent": sent,
+            "failed": failed,
+            "duration_seconds": round(duration, 3),
+            "sends_per_second": round(sends_per_second, 1)
+        }
+
+        logger.info(f"Sent {sent}/{len(items)} {label} in {duration:.2f}s ({sends_per_second:.1f}/s, {failed} failed)")
+        return sent, failed
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get throughput metrics."""
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self._in_flight,
+            "batches": self._batches,
+            "sent": self._sent,
+            "failed": self._failed,
+            "peak_sends_per_second": round(self._peak_sends_per_second, 1),
+            "last_batch": self._last_batch,
+            "rate_limiter": self.limiter.stats()
+        }
+
+
+# Global notification fan-out (one rate budget for every proactive sender)
+notification_fanout = NotificationFanout()
@@ -0,0 +1,216 @@
+"""
+Batching writer for outbound (bot) messages.
+Sending a reply only appends it to an in-memory buffer; a background task
+resolves users and inserts buffered replies into `messages` in multi-row
+batches when the batch size or flush interval is reached. Message IDs are
+assigned up front and inserts skip existing IDs, so retries are safe.
+Anything that can't be written at shutdown is spooled to disk and replayed
+on the next start (at-least-once across graceful restarts). While the
+database is unreachable and the buffer is full, the oldest entries are
+spooled too and re-buffered once writes succeed again.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from src.config.settings import settings
+from src.models.database import Message, MessageType, SourceType
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundMessageWriter:
+    """Accumulates bot responses and persists them in batches."""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffered: Optional[int] = None,
+        spool_path: Optional[str] = None
+    ):
+        self.batch_size = batch_size or settings.outbound_batch_size
+        self.flush_interval = flush_interval or settings.outbound_flush_interval_seconds
+        self.max_buffered = max_buffered or settings.outbound_max_buffered
+        self.spool_path = spool_path or settings.outbound_spool_path
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._db_service = None
+
+        # Metrics
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._dropped = 0
+        self._unresolved = 0
+        self._spooled = 0
+
+    @property
+    def db_service(self):
+        """Database service, created on first use."""
+        if self._db_service is None:
+            from src.services.supabase_service import SupabaseService
+            self._db_service = SupabaseService()
+        return self._db_service
+
+    def set_db_service(self, db_service):
+        """Use an existing database service instead of creating one."""
+        self._db_service = db_service
+
+    def enqueue(self, user_phone: str, content: str):
+        """Buffer an outgoing message. Never touches the database."""
+        if len(self._buffer) >= self.max_buffered:
+            # Move the oldest batch to disk; it is re-buffered once writes catch up
+            overflow = self._buffer[:self.batch_size]
+            if self._write_spool(overflow):
+                del self._buffer[:len(overflow)]
+            else:
+                self._buffer.pop(0)
+                self._dropped += 1
+                logger.warning(f"Outbound message buffer full ({self.max_buffered}), dropped oldest entry")
+
+        self._buffer.append({
+            "id": str(uuid4()),
+            "user_phone": user_phone,
+            "content": content,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+        self._enqueued += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def start(self):
+        """Replay any spooled messages and start the flush loop."""
+        if self._task is not None:
+            return
+        self._load_spool()
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Outbound message writer started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flush loop, write what is buffered and spool anything left."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        while self._buffer:
+            if not await self.flush():
+                break
+
+        if self._buffer and self._write_spool(self._buffer):
+            self._buffer.clear()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            if await self.flush() and len(self._buffer) < self.max_buffered // 2:
+                self._load_spool()
+
+    async def flush(self) -> bool:
+        """Write up to one batch. Returns False if the write failed."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+
+            try:
+                # Raises on lookup errors, so only entries whose user really doesn't exist are dropped
+                users = await self.db_service.get_users_by_phone([entry["user_phone"] for entry in batch])
+                messages = []
+                for entry in batch:
+                    user = users.get(entry["user_phone"])
+                    if not user:
+                        self._unresolved += 1
+                        logger.warning(f"No user for outgoing message to {entry['user_phone']}, not storing it")
+                        continue
+                    messages.append(self._build_message(entry, user.id))
+
+                await self.db_service.save_messages_batch(messages)
+                self._written += len(messages)
+                self._batches += 1
+                logger.debug(f"Stored {len(messages)} outgoing messages in one batch")
+                return True
+
+            except Exception as e:
+                # Put the batch back in front so order and at-least-once delivery are kept
+                self._failed_batches += 1
+                self._buffer[:0] = batch
+                logger.error(f"Failed to store batch of {len(batch)} outgoing messages: {e}")
+                return False
+
+    def _build_message(self, entry: Dict[str, Any], user_id) -> Message:
+        """Create the stored message for a bot response."""
+        return Message(
+            id=entry["id"],
+            user_id=user_id,
+            message_timestamp=datetime.fromisoformat(entry["timestamp"]),
+            type=MessageType.NOTE,  # Bot responses are generally notes/responses
+            content=f"🤖 {entry['content']}",  # Prefix with robot emoji to indicate bot response
+            source_type=SourceType.TEXT,
+            tags=["bot-response"],  # Tag all bot responses
+            metadata={"direction": "outgoing", "sender": "bot"}  # Store direction in metadata
+        )
+
+    def _write_spool(self, entries: List[Dict[str, Any]]) -> bool:
+        """Persist unwritten messages so they can be replayed. Returns False on failure."""
+        try:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as spool:
+                for entry in entries:
+                    spool.write(json.dumps(entry) + "\n")
+            self._spooled += len(entries)
+            logger.warning(f"Spooled {len(entries)} unwritten outgoing messages to {self.spool_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Could not spool {len(entries)} outgoing messages: {e}")
+            return False
+
+    def _load_spool(self):
+        """Re-buffer spooled messages (from a previous shutdown or a full buffer)."""
+        if not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as spool:
+                entries = [json.loads(line) for line in spool if line.strip()]
+            os.remove(self.spool_path)
+            self._buffer[:0] = entries
+            logger.info(f"Replaying {len(entries)} spooled outgoing messages")
+        except Exception as e:
+            logger.error(f"Error loading outgoing message spool: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get writer metrics."""
+        return {
+            "is_running": self._task is not None,
+            "buffered": len(self._buffer),
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "batches": self._batches,
+            "avg_batch_size": round(self._written / self._batches, 1) if self._batches else 0.0,
+            "failed_batches": self._failed_batches,
+            "unresolved_users": self._unresolved,
+            "dropped": self._dropped,
+            "spooled": self._spooled
+        }
+
+
+# Global outbound message writer instance
+outbound_message_writer = OutboundMessageWriter()
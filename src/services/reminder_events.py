@@ -0,0 +1,41 @@
+"""
+In-process notifications for reminder writes.
+SupabaseService publishes every saved reminder here so the reminder
+dispatcher can update its timer queue immediately instead of waiting for
+the next database scan.
+"""
+import logging
+from typing import Callable, List
+
+from src.models.database import Reminder
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderEvents:
+    """Fan-out of saved reminders to registered listeners."""
+
+    def __init__(self):
+        self._listeners: List[Callable[[Reminder], None]] = []
+
+    def subscribe(self, listener: Callable[[Reminder], None]):
+        """Register a callback that is called with every saved reminder."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Reminder], None]):
+        """Remove a previously registered callback."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def publish(self, reminder: Reminder):
+        """Notify listeners; a failing listener never fails the write."""
+        for listener in list(self._listeners):
+            try:
+                listener(reminder)
+            except Exception as e:
+                logger.error(f"Reminder listener failed for {reminder.id}: {e}")
+
+
+# Global reminder events instance
+reminder_events = ReminderEvents()
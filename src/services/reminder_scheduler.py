@@ -1,22 +1,62 @@
 """
-Reminder scheduler service that checks for due reminders and sends notifications.
+Reminder scheduler service that sends reminder notifications at their trigger time.
+Upcoming reminders are preloaded into an in-memory timer queue and fired as
+they come due. Saved reminders update the queue immediately, reminders
+created by other processes are picked up by a light incremental poll, and a
+periodic full scan reconciles anything missed.
 """
 import asyncio
 import logging
+import os
+import socket
+import time
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import Deque, List, Optional, Set, Tuple
+from uuid import uuid4
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from src.config.settings import settings
 from src.services.supabase_service import SupabaseService
 from src.services.whatsapp_service import WhatsAppService
+from src.services.reminder_events import reminder_events
+from src.services.reminder_timer import ReminderTimerQueue
+from src.services.notification_fanout import notification_fanout
+from src.services.birthday_notifier import BirthdayNotifier
+from src.services.vector_index_maintenance import vector_index_maintainer
+from src.services.scheduler_coordinator import user_bucket
+from src.utils.time_bucketed_set import TimeBucketedSet
 from src.models.database import Reminder, User
 
 logger = logging.getLogger(__name__)
 
 
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def _claim_columns_missing(error: Exception) -> bool:
+    """Whether a claim error means add_reminder_claims.sql hasn't been applied."""
+    # PGRST204: column not in PostgREST's schema cache; 42703: undefined column
+    code = str(getattr(error, "code", "") or "")
+    message = str(error)
+    if code in ("PGRST204", "42703") or "PGRST204" in message or "42703" in message:
+        return True
+    return "column" in message and ("claimed_at" in message or "claimed_by" in message)
+
+
 class ReminderScheduler:
-    """Manages reminder notifications using APScheduler."""
+    """Manages reminder notifications with an in-memory timer queue and APScheduler maintenance jobs."""
+    
+    # Re-read created_at slightly before the watermark to tolerate clock skew between processes
+    POLL_OVERLAP = timedelta(seconds=60)
+    # Upper bound on a single sleep so clock adjustments can't stall dispatch
+    MAX_SLEEP_SECONDS = 60.0
     
     def __init__(self, db_service: SupabaseService, whatsapp_service: WhatsAppService):
         """Initialize the reminder scheduler."""
@@ -25,7 +65,39 @@ class ReminderScheduler:
         # Configure scheduler to use UTC timezone explicitly
         self.scheduler = AsyncIOScheduler(timezone=timezone.utc)
         self.is_running = False
-        self._sent_reminders = set()  # Track recently sent reminders to prevent duplicates
+        # Track recently sent reminders to prevent duplicates (forgotten after an hour)
+        self._sent_reminders = TimeBucketedSet(retention_seconds=3600)
+        self._in_flight: Set[str] = set()  # Occurrences currently being sent
+        # Identifies this instance in reminders.claimed_by
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self._claims_enabled = True
+        
+        self.preload_hours = settings.reminder_preload_hours
+        self._timers = ReminderTimerQueue()
+        self._wakeup = asyncio.Event()
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._dispatch_batches: Set[asyncio.Task] = set()
+        self._horizon_end: Optional[datetime] = None  # Reminders after this wait for the next reconciliation
+        self._created_watermark: Optional[datetime] = None
+        self._reconciling = False
+        self._saved_during_reconcile: List[Reminder] = []
+        
+        # Partition ownership when several scheduler instances run (None = every user)
+        self.owned_buckets: Optional[Set[int]] = None
+        self.is_leader = True
+        
+        self.birthday_notifier = BirthdayNotifier(db_service, whatsapp_service)
+        
+        # Metrics
+        self._lateness: Deque[float] = deque(maxlen=1000)
+        self._fired = 0
+        self._sent = 0
+        self._failed = 0
+        self._stale = 0
+        self._claim_errors = 0
+        self._reconciles = 0
+        self._polled = 0
+        self._listener_updates = 0
         
     async def start(self):
         """Start the reminder scheduler."""
@@ -34,26 +106,65 @@ class ReminderScheduler:
             return
             
         try:
-            # Calculate when to start the scheduler - 5 seconds after the next minute
-            now = datetime.now(timezone.utc)
-            next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
-            start_time = next_minute + timedelta(seconds=5)
+            reminder_events.subscribe(self._on_reminder_saved)
+            
+            # Initial load; if it fails the reconciliation job retries
+            try:
+                await self._reconcile()
+            except Exception as e:
+                logger.error(f"Initial reminder load failed, will retry on next reconciliation: {e}")
             
-            # Add job to check reminders every minute, starting at 5 seconds past the minute
+            now = datetime.now(timezone.utc)
+            self.scheduler.add_job(
+                self._reconcile,
+                trigger=IntervalTrigger(minutes=settings.reminder_reconcile_interval_minutes),
+                id='reminder_reconciler',
+                name='Reconcile Reminder Timers',
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._poll_new_reminders,
+                trigger=IntervalTrigger(seconds=settings.reminder_poll_interval_seconds),
+                id='reminder_poller',
+                name='Pick Up New Reminders',
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._check_missed_recurring_reminders,
+                trigger=IntervalTrigger(hours=1, start_date=now + timedelta(minutes=1)),
+                id='missed_recurring_checker',
+                name='Check Missed Recurring Reminders',
+                replace_existing=True
+            )
             self.scheduler.add_job(
-                self._check_and_send_reminders,
-                trigger=IntervalTrigger(minutes=1, start_date=start_time),
-                id='reminder_checker',
-                name='Check Due Reminders',
+                self._refresh_birthdays,
+                trigger=CronTrigger(hour=0, minute=5, timezone=timezone.utc),
+                next_run_time=now + timedelta(seconds=30),  # Catch up after downtime
+                id='birthday_refresher',
+                name='Refresh Upcoming Birthdays',
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._send_birthday_digest,
+                trigger=CronTrigger(minute=1, timezone=timezone.utc),
+                id='birthday_digest',
+                name='Send Birthday Digest',
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._maintain_vector_indexes,
+                trigger=CronTrigger(hour=settings.vector_index_maintenance_hour, minute=30, timezone=timezone.utc),
+                id='vector_index_maintenance',
+                name='Retune Vector Indexes',
                 replace_existing=True
             )
             
             self.scheduler.start()
+            self._dispatch_task = asyncio.create_task(self._dispatch_loop())
             self.is_running = True
             
-            # Log the precise start time
-            delay_seconds = (start_time - now).total_seconds()
-            logger.info(f"Reminder scheduler started - first check in {delay_seconds:.1f}s at {start_time.strftime('%H:%M:%S')}, then every minute at :05 seconds")
+            logger.info(f"Reminder scheduler started - {len(self._timers)} reminders queued for the next "
+                        f"{self.preload_hours}h, reconciling every {settings.reminder_reconcile_interval_minutes} minutes")
             
         except Exception as e:
             logger.error(f"Failed to start reminder scheduler: {e}")
@@ -65,69 +176,223 @@ class ReminderScheduler:
             return
             
         try:
+            reminder_events.unsubscribe(self._on_reminder_saved)
             self.scheduler.shutdown(wait=True)
+            
+            if self._dispatch_task is not None:
+                self._dispatch_task.cancel()
+                await asyncio.gather(self._dispatch_task, return_exceptions=True)
+                self._dispatch_task = None
+            
+            # Let reminders that are already being sent finish
+            if self._dispatch_batches:
+                await asyncio.gather(*self._dispatch_batches, return_exceptions=True)
+            
             self.is_running = False
             logger.info("Reminder scheduler stopped")
             
         except Exception as e:
             logger.error(f"Error stopping reminder scheduler: {e}")
     
-    async def _check_and_send_reminders(self):
-        """Check for due reminders and send WhatsApp notifications."""
-        try:
-            logger.debug("Checking for due reminders...")
-            
-            # First, check for missed recurring reminders (failsafe)
-            await self._check_missed_recurring_reminders()
-            
-            # Get reminders due in the next 1 minute
-            due_reminders = await self.db_service.get_due_reminders(time_window_minutes=1)
-            
-            if not due_reminders:
-                logger.debug("No due reminders found")
-                return
+    async def _dispatch_loop(self):
+        """Sleep until the earliest reminder is due (or the queue changes) and fire it."""
+        while True:
+            try:
+                self._wakeup.clear()
                 
-            logger.info(f"Found {len(due_reminders)} due reminders")
-            
-            for reminder in due_reminders:
-                # Create unique key for this reminder occurrence
-                reminder_key = f"{reminder.id}_{reminder.trigger_time.isoformat()}"
+                due = self._timers.pop_due(time.time())
+                if due:
+                    batch = asyncio.create_task(self._dispatch_due(due))
+                    self._dispatch_batches.add(batch)
+                    batch.add_done_callback(self._dispatch_batches.discard)
                 
-                # Skip if we've already sent this specific reminder occurrence
-                if reminder_key in self._sent_reminders:
-                    logger.debug(f"Skipping duplicate reminder {reminder_key}")
-                    continue
+                next_fire = self._timers.next_fire_time()
+                timeout = self.MAX_SLEEP_SECONDS
+                if next_fire is not None:
+                    timeout = min(max(next_fire - time.time(), 0.0), self.MAX_SLEEP_SECONDS)
                 
-                # Send the reminder
-                success = await self._send_reminder_notification(reminder)
-                
-                # Track successful sends to prevent duplicates
-                if success:
-                    self._sent_reminders.add(reminder_key)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
                     
-                    # Clean up old entries (keep only last hour)
-                    from datetime import timedelta
-                    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=1)
-                    self._sent_reminders = {
-                        key for key in self._sent_reminders 
-                        if not any(key.endswith(old_time) for old_time in [
-                            t.isoformat() for t in [cutoff_time - timedelta(minutes=i) for i in range(0, 60)]
-                        ])
-                    }
-                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in reminder dispatch loop: {e}")
+                await asyncio.sleep(1)
+    
+    async def _dispatch_due(self, reminders: List[Reminder]):
+        """Claim and send reminders whose trigger time has arrived."""
+        self._fired += len(reminders)
+        
+        # Skip occurrences this process already sent (or is sending)
+        candidates = [r for r in reminders if self._occurrence_key(r) not in self._sent_reminders
+                      and self._occurrence_key(r) not in self._in_flight]
+        if not candidates:
+            return
+        
+        current = await self._claim(candidates)
+        if current is None:
+            return
+        self._stale += len(candidates) - len(current)
+        
+        now = datetime.now(timezone.utc)
+        to_send: List[Tuple[str, Reminder]] = []
+        for reminder in current:
+            if reminder.trigger_time > now + timedelta(seconds=1):
+                # Rescheduled to a later time - put it back in the queue
+                self._on_reminder_saved(reminder)
+                continue
+            
+            reminder_key = self._occurrence_key(reminder)
+            if reminder_key in self._sent_reminders or reminder_key in self._in_flight:
+                logger.debug(f"Skipping duplicate reminder {reminder_key}")
+                continue
+            
+            self._in_flight.add(reminder_key)
+            to_send.append((reminder_key, reminder))
+        
+        if not to_send:
+            return
+        
+        # One query for every recipient instead of a get_user round-trip per reminder
+        users = await self.db_service.get_users_by_ids([reminder.user_id for _, reminder in to_send])
+        
+        async def send(entry: Tuple[str, Reminder]) -> bool:
+            reminder_key, reminder = entry
+            try:
+                success = await self._send_reminder_notification(reminder, users.get(str(reminder.user_id)))
+            finally:
+                self._in_flight.discard(reminder_key)
+            
+            # Track successful sends to prevent duplicates
+            if success:
+                self._sent += 1
+                self._lateness.append((datetime.now(timezone.utc) - reminder.trigger_time).total_seconds())
+                self._sent_reminders.add(reminder_key)
+            else:
+                # Left unsent in the database; release the claim so a retry can pick it up
+                self._failed += 1
+                if self._claims_enabled:
+                    await self.db_service.release_reminder_claim(reminder.id, self.instance_id)
+            return success
+        
+        await notification_fanout.send_all(to_send, send, label="reminders")
+    
+    async def _claim(self, reminders: List[Reminder]) -> Optional[List[Reminder]]:
+        """Claim reminders in the database so no other scheduler instance sends them too.
+        
+        Returns None if claiming failed; the batch is skipped and the next
+        reconciliation queues it again.
+        """
+        if self._claims_enabled:
+            stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.reminder_claim_timeout_seconds)
+            try:
+                return await self.db_service.claim_due_reminders([r.id for r in reminders], self.instance_id, stale_before)
+            except Exception as e:
+                if not _claim_columns_missing(e):
+                    # Transient (network, 5xx, timeout) - sending unclaimed copies could duplicate them
+                    self._claim_errors += 1
+                    logger.error(f"Error claiming {len(reminders)} due reminders, retrying on next reconciliation: {e}")
+                    return None
+                # add_reminder_claims.sql hasn't been applied yet
+                self._claims_enabled = False
+                logger.warning(f"Reminder claims unavailable, falling back to in-process dedup only: {e}")
+        
+        # Another process may have completed, cancelled or moved these since they were queued
+        try:
+            return await self.db_service.get_pending_reminders_by_ids([r.id for r in reminders])
         except Exception as e:
-            logger.error(f"Error checking due reminders: {e}")
+            logger.warning(f"Could not re-read {len(reminders)} due reminders, sending queued copies: {e}")
+            return reminders
+    
+    def _occurrence_key(self, reminder: Reminder) -> str:
+        """Unique key for one occurrence of a reminder."""
+        return f"{reminder.id}_{reminder.trigger_time.isoformat()}"
+    
+    def _on_reminder_saved(self, reminder: Reminder):
+        """Keep the timer queue in step with reminder writes from this process."""
+        if self._reconciling:
+            self._saved_during_reconcile.append(reminder)
+        if self._horizon_end is None:
+            return
+        self._listener_updates += 1
+        
+        pending = reminder.is_active and reminder.completed_at is None and self._owns(reminder)
+        if pending and self._horizon_end is not None and reminder.trigger_time <= self._horizon_end:
+            if self._timers.schedule(reminder):
+                self._wakeup.set()
+        else:
+            self._timers.cancel(reminder.id)
+    
+    def _owns(self, reminder: Reminder) -> bool:
+        """Whether this instance dispatches reminders for the reminder's user."""
+        return self.owned_buckets is None or user_bucket(reminder.user_id) in self.owned_buckets
+    
+    def _bucket_filter(self) -> Optional[List[int]]:
+        return None if self.owned_buckets is None else sorted(self.owned_buckets)
+    
+    async def set_partitions(self, owned_buckets: Optional[Set[int]], is_leader: bool):
+        """Change which users this instance dispatches for and reload the timer queue."""
+        self.owned_buckets = owned_buckets
+        self.is_leader = is_leader
+        if self._horizon_end is None:
+            return  # Not started yet - start() does the first load
+        try:
+            await self._reconcile()
+        except Exception as e:
+            logger.error(f"Failed to reload reminders after partition change: {e}")
+    
+    async def _reconcile(self):
+        """Rebuild the timer queue from a full scan of pending reminders."""
+        now = datetime.now(timezone.utc)
+        horizon_end = now + timedelta(hours=self.preload_hours)
+        
+        self._reconciling = True
+        self._saved_during_reconcile = []
+        try:
+            # Look back 1 hour to catch reminders missed due to failed sends or downtime
+            reminders = await self.db_service.get_pending_reminders(
+                now - timedelta(hours=1), horizon_end, user_buckets=self._bucket_filter()
+            )
+        finally:
+            self._reconciling = False
+        
+        self._timers.replace_all(reminders)
+        self._horizon_end = horizon_end
+        # Writes that landed while the scan was running may not be in its result
+        for reminder in self._saved_during_reconcile:
+            self._on_reminder_saved(reminder)
+        self._saved_during_reconcile = []
+        
+        if self._created_watermark is None:
+            self._created_watermark = now
+        self._reconciles += 1
+        self._wakeup.set()
+        logger.debug(f"Reconciled reminder timers: {len(self._timers)} queued until {horizon_end.isoformat()}")
+    
+    async def _poll_new_reminders(self):
+        """Pick up reminders created by other processes since the last poll."""
+        if self._horizon_end is None or self._created_watermark is None:
+            return
+        
+        polled_at = datetime.now(timezone.utc)
+        reminders = await self.db_service.get_reminders_created_since(
+            self._created_watermark - self.POLL_OVERLAP, self._horizon_end, user_buckets=self._bucket_filter()
+        )
+        for reminder in reminders:
+            if str(reminder.id) not in self._timers:
+                self._polled += 1
+            if self._timers.schedule(reminder):
+                self._wakeup.set()
+        self._created_watermark = polled_at
     
     async def _check_missed_recurring_reminders(self):
         """Check for missed recurring reminders and create them (failsafe mechanism)."""
+        if not self.is_leader:
+            return  # Only one scheduler instance runs chain recovery
         try:
-            # Only check for missed reminders every hour to avoid overhead
-            if not hasattr(self, '_last_missed_check'):
-                self._last_missed_check = datetime.now(timezone.utc) - timedelta(hours=2)
-            
-            if datetime.now(timezone.utc) - self._last_missed_check < timedelta(hours=1):
-                return
-            
             logger.debug("Checking for missed recurring reminders...")
             
             # Look back 32 days for missed recurring reminders (to catch monthly ones)
@@ -144,17 +409,30 @@ class ReminderScheduler:
                     except Exception as e:
                         logger.error(f"Failed to save recovery reminder {recovery_reminder.title}: {e}")
             
-            # Update last check time
-            self._last_missed_check = datetime.now(timezone.utc)
-            
         except Exception as e:
             logger.error(f"Error checking missed recurring reminders: {e}")
     
-    async def _send_reminder_notification(self, reminder: Reminder) -> bool:
+    async def _refresh_birthdays(self):
+        """Daily roll-forward of birthday anniversaries (leader only)."""
+        if self.is_leader:
+            await self.birthday_notifier.refresh_occurrences()
+    
+    async def _send_birthday_digest(self):
+        """Hourly pass sending birthday digests to users whose local digest hour has come (leader only)."""
+        if self.is_leader:
+            await self.birthday_notifier.send_daily_digest()
+    
+    async def _maintain_vector_indexes(self):
+        """Daily retune/rebuild of the sharded HNSW message indexes (leader only)."""
+        if self.is_leader:
+            await vector_index_maintainer.run()
+    
+    async def _send_reminder_notification(self, reminder: Reminder, user: Optional[User] = None) -> bool:
         """Send WhatsApp notification for a specific reminder."""
         try:
-            # Get user information
-            user = await self.db_service.get_user(reminder.user_id)
+            # Get user information (unless it was prefetched for the batch)
+            if user is None:
+                user = await self.db_service.get_user(reminder.user_id)
             if not user:
                 logger.error(f"User not found for reminder {reminder.id}")
                 return False
@@ -249,6 +527,7 @@ class ReminderScheduler:
                             repeat_type=reminder.repeat_type,
                             repeat_interval=reminder.repeat_interval,
                             repeat_until=reminder.repeat_until,
+                            series_id=reminder.series_id or reminder.id,
                             tags=reminder.tags,
                             is_active=True,
                             created_at=datetime.now(timezone.utc)
@@ -282,15 +561,40 @@ class ReminderScheduler:
     def get_status(self) -> dict:
         """Get scheduler status information."""
         next_run = None
-        if self.scheduler and self.scheduler.get_job('reminder_checker'):
-            job = self.scheduler.get_job('reminder_checker')
+        if self.scheduler and self.scheduler.get_job('reminder_reconciler'):
+            job = self.scheduler.get_job('reminder_reconciler')
             if job and job.next_run_time:
                 next_run = job.next_run_time.isoformat()
         
+        next_fire = self._timers.next_fire_at()
+        lateness = sorted(self._lateness)
         return {
             "is_running": self.is_running,
             "jobs": len(self.scheduler.get_jobs()) if self.scheduler else 0,
-            "next_run": next_run
+            "next_run": next_run,
+            "queued_reminders": len(self._timers),
+            "next_fire": next_fire.isoformat() if next_fire else None,
+            "horizon_end": self._horizon_end.isoformat() if self._horizon_end else None,
+            "owned_buckets": len(self.owned_buckets) if self.owned_buckets is not None else "all",
+            "is_leader": self.is_leader,
+            "instance_id": self.instance_id,
+            "claims_enabled": self._claims_enabled,
+            "in_flight": len(self._in_flight),
+            "recently_sent": self._sent_reminders.stats(),
+            "fired": self._fired,
+            "sent": self._sent,
+            "failed": self._failed,
+            "stale_skipped": self._stale,
+            "claim_errors": self._claim_errors,
+            "reconciles": self._reconciles,
+            "picked_up_by_poll": self._polled,
+            "listener_updates": self._listener_updates,
+            "lateness_p50_seconds": round(_percentile(lateness, 0.50), 3),
+            "lateness_p99_seconds": round(_percentile(lateness, 0.99), 3),
+            "lateness_max_seconds": round(lateness[-1], 3) if lateness else 0.0,
+            "birthdays": self.birthday_notifier.get_status(),
+            "vector_index_maintenance": vector_index_maintainer.get_status(),
+            "fanout": notification_fanout.get_status()
         }
 
 
@@ -0,0 +1,84 @@
+"""
+In-memory timer queue of upcoming reminders.
+A min-heap ordered by trigger time with lazy invalidation: rescheduling or
+cancelling a reminder only updates the index, and stale heap entries are
+skipped when they reach the top.
+"""
+import heapq
+import itertools
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from src.models.database import Reminder
+
+
+class ReminderTimerQueue:
+    """Heap of reminders keyed by trigger time."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._index: Dict[str, Tuple[float, Reminder]] = {}
+        self._counter = itertools.count()
+
+    def schedule(self, reminder: Reminder) -> bool:
+        """
+        Add or reschedule a reminder.
+
+        Returns:
+            True if it became the earliest entry (the dispatcher should wake up)
+        """
+        key = str(reminder.id)
+        fire_at = reminder.trigger_time.timestamp()
+        current = self._index.get(key)
+        self._index[key] = (fire_at, reminder)
+        if current is not None and current[0] == fire_at:
+            return False  # Same slot - the heap entry is still valid
+
+        earliest = self.next_fire_time()
+        heapq.heappush(self._heap, (fire_at, next(self._counter), key))
+        return earliest is None or fire_at < earliest
+
+    def cancel(self, reminder_id) -> bool:
+        """Remove a reminder. Returns True if it was scheduled."""
+        return self._index.pop(str(reminder_id), None) is not None
+
+    def pop_due(self, now: float) -> List[Reminder]:
+        """Remove and return every reminder whose trigger time has passed."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, key = heapq.heappop(self._heap)
+            current = self._index.get(key)
+            if current is None or current[0] != fire_at:
+                continue  # Cancelled or rescheduled since this entry was pushed
+            del self._index[key]
+            due.append(current[1])
+        return due
+
+    def next_fire_time(self) -> Optional[float]:
+        """Timestamp of the earliest live entry, or None if empty."""
+        while self._heap:
+            fire_at, _, key = self._heap[0]
+            current = self._index.get(key)
+            if current is not None and current[0] == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)  # Drop stale entry
+        return None
+
+    def replace_all(self, reminders: List[Reminder]):
+        """Rebuild the queue from a full scan."""
+        self._index = {str(r.id): (r.trigger_time.timestamp(), r) for r in reminders}
+        self._heap = [(fire_at, next(self._counter), key) for key, (fire_at, _) in self._index.items()]
+        heapq.heapify(self._heap)
+
+    def __contains__(self, reminder_id) -> bool:
+        return str(reminder_id) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def next_fire_at(self) -> Optional[datetime]:
+        """Earliest trigger time as an aware datetime, for status output."""
+        fire_at = self.next_fire_time()
+        if fire_at is None:
+            return None
+        return datetime.fromtimestamp(fire_at, tz=timezone.utc)
@@ -0,0 +1,192 @@
+"""
+Partition ownership and leader election for scheduler instances.
+Reminders are split into partitions by a hash of user_id (the generated
+`reminders.user_bucket` column). Every scheduler instance holds Postgres
+session-level advisory locks on a fair share of the partitions and only
+dispatches reminders in those; one instance additionally holds the leader
+lock and runs the singleton jobs (missed-chain recovery, media monitor).
+When an instance dies its connection closes, its locks are released and the
+survivors pick up the orphaned partitions on their next rebalance.
+
+Advisory locks need a direct Postgres session (DATABASE_URL on port 5432,
+not the transaction-mode pooler).
+"""
+import hashlib
+import logging
+import math
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from src.config.database import run_blocking
+from src.config.settings import settings
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg2 = None
+    PSYCOPG2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Must match the user_bucket generated column (first byte of md5(user_id))
+USER_BUCKETS = 256
+
+# Advisory lock namespaces (first key of the two-key lock form)
+PARTITION_LOCK_NAMESPACE = 0x43550001
+MEMBER_LOCK_NAMESPACE = 0x43550002
+LEADER_LOCK_NAMESPACE = 0x43550003
+
+
+def user_bucket(user_id) -> int:
+    """Bucket of a user, same as reminders.user_bucket."""
+    return hashlib.md5(str(user_id).encode("utf-8")).digest()[0]
+
+
+def buckets_for_partitions(partitions: Set[int], partition_count: int) -> Set[int]:
+    """User buckets belonging to a set of partitions."""
+    return {bucket for bucket in range(USER_BUCKETS) if bucket % partition_count in partitions}
+
+
+class SchedulerCoordinator:
+    """Acquires a fair share of reminder partitions with advisory locks."""
+
+    def __init__(
+        self,
+        on_change: Callable[[Optional[Set[int]], bool], Awaitable[None]],
+        database_url: Optional[str] = None,
+        partition_count: Optional[int] = None
+    ):
+        """Initialize the coordinator.
+
+        Args:
+            on_change: Called with (owned user buckets or None for all, is_leader) whenever ownership changes
+            database_url: Direct Postgres connection string
+            partition_count: Number of partitions (must divide USER_BUCKETS)
+        """
+        self.on_change = on_change
+        self.database_url = database_url if database_url is not None else settings.database_url
+        self.partition_count = partition_count or settings.scheduler_partitions
+        if USER_BUCKETS % self.partition_count:
+            raise ValueError(f"scheduler_partitions must divide {USER_BUCKETS}, got {self.partition_count}")
+
+        self.member_id = random.randint(1, 2**31 - 1)
+        self._conn = None
+        self._held: Set[int] = set()
+        self._is_leader = False
+        self._members = 0
+        self._rebalances = 0
+        self._connection_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Coordination needs psycopg2 and a database URL; otherwise this instance owns everything."""
+        return PSYCOPG2_AVAILABLE and bool(self.database_url)
+
+    async def start(self):
+        """Join the group and take a first share of partitions."""
+        if not self.enabled:
+            logger.warning("Scheduler coordination disabled (no DATABASE_URL or psycopg2) - "
+                           "this instance owns every partition; run only one scheduler")
+            await self.on_change(None, True)
+            return
+        await self.rebalance()
+
+    async def stop(self):
+        """Release every lock by closing the session."""
+        if self._conn is not None:
+            await run_blocking(self._close)
+        self._held = set()
+        self._is_leader = False
+
+    async def rebalance(self):
+        """Grow or shrink the set of owned partitions to this instance's fair share."""
+        if not self.enabled:
+            return
+
+        before = (frozenset(self._held), self._is_leader)
+        try:
+            await run_blocking(self._rebalance)
+        except Exception as e:
+            # The session (and with it every lock) may be gone - stop dispatching until reconnected
+            self._connection_errors += 1
+            logger.error(f"Scheduler coordination failed, releasing partitions: {e}")
+            await run_blocking(self._close)
+            self._held = set()
+            self._is_leader = False
+
+        if (frozenset(self._held), self._is_leader) != before:
+            self._rebalances += 1
+            logger.info(f"Scheduler partitions now {sorted(self._held)} of {self.partition_count} "
+                        f"({self._members} instances), leader: {self._is_leader}")
+            await self.on_change(buckets_for_partitions(self._held, self.partition_count), self._is_leader)
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self.database_url)
+            self._conn.autocommit = True
+            self._held = set()
+            self._is_leader = False
+            self._execute("SELECT pg_advisory_lock(%s, %s)", (MEMBER_LOCK_NAMESPACE, self.member_id))
+
+    def _close(self):
+        try:
+            if self._conn is not None and not self._conn.closed:
+                self._conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing coordination connection: {e}")
+        self._conn = None
+
+    def _execute(self, sql: str, params: tuple) -> List[tuple]:
+        with self._conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _try_lock(self, namespace: int, key: int) -> bool:
+        return self._execute("SELECT pg_try_advisory_lock(%s, %s)", (namespace, key))[0][0]
+
+    def _unlock(self, namespace: int, key: int):
+        self._execute("SELECT pg_advisory_unlock(%s, %s)", (namespace, key))
+
+    def _rebalance(self):
+        """Runs in a worker thread; every statement is a quick lock call."""
+        self._connect()
+
+        self._members = max(self._execute(
+            "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND classid = %s AND granted",
+            (MEMBER_LOCK_NAMESPACE,)
+        )[0][0], 1)
+        share = math.ceil(self.partition_count / self._members)
+
+        # Give back partitions above our share so newcomers can take them
+        for partition in sorted(self._held, reverse=True)[:max(len(self._held) - share, 0)]:
+            self._unlock(PARTITION_LOCK_NAMESPACE, partition)
+            self._held.discard(partition)
+
+        # Take free partitions up to our share, starting at a per-instance offset
+        if len(self._held) < share:
+            offset = self.member_id % self.partition_count
+            for i in range(self.partition_count):
+                partition = (offset + i) % self.partition_count
+                if partition in self._held:
+                    continue
+                if self._try_lock(PARTITION_LOCK_NAMESPACE, partition):
+                    self._held.add(partition)
+                    if len(self._held) >= share:
+                        break
+
+        if not self._is_leader:
+            self._is_leader = self._try_lock(LEADER_LOCK_NAMESPACE, 0)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get ownership information."""
+        return {
+            "enabled": self.enabled,
+            "member_id": self.member_id,
+            "instances": self._members,
+            "partition_count": self.partition_count,
+            "partitions": sorted(self._held),
+            "is_leader": self._is_leader,
+            "rebalances": self._rebalances,
+            "connection_errors": self._connection_errors
+        }
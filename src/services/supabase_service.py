@@ -2,16 +2,22 @@
 Supabase database service for CRUD operations.
 """
 import logging
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from datetime import date, datetime, timedelta, timezone
 from uuid import UUID, uuid4
 
-from src.config.database import get_db_client, get_admin_client
+from src.config.database import get_db_client, get_admin_client, run_query
 from src.models.database import (
     User, Message, Reminder, Birthday, Session, File,
     MessageType, SourceType, SessionStatus, RepeatType, FileType, UploadStatus, TranscriptionStatus
 )
+from src.services.user_context_cache import user_context_cache
+from src.services.last_seen_buffer import last_seen_buffer
+from src.services.reminder_events import reminder_events
+from src.services.vector_index import vector_index
 from src.utils.logger import get_message_logger, safe_log_content
+from src.utils.helpers import next_birthday_occurrence, birthday_reference_date
+from src.utils.vectors import Embedding, to_embedding, to_pgvector
 
 logger = logging.getLogger(__name__)
 msg_logger = get_message_logger()
@@ -28,17 +34,24 @@ class SupabaseService:
     async def get_or_create_user(self, phone_number: str, platform: str = "whatsapp") -> tuple[User, bool]:
         """Get existing user or create new one. Returns (user, is_new_user)."""
         try:
+            cached_user = user_context_cache.get_user_by_phone(phone_number)
+            if cached_user:
+                cached_user.last_seen = datetime.now(timezone.utc)
+                last_seen_buffer.touch(cached_user.id, cached_user.last_seen)
+                return cached_user, False
+            
             # Try to get existing user (use admin client to bypass RLS)
-            result = self.admin_client.table("users").select("*").eq("phone_number", phone_number).execute()
+            result = await run_query(self.admin_client.table("users").select("*").eq("phone_number", phone_number))
             
             if result.data:
                 user_data = result.data[0]
                 user_data['last_seen'] = datetime.now(timezone.utc)
                 
-                # Update last_seen (use admin client)
-                self.admin_client.table("users").update({"last_seen": user_data['last_seen'].isoformat()}).eq("id", user_data['id']).execute()
-                
-                return User(**user_data), False  # Existing user
+                # last_seen is written behind in batches
+                user = User(**user_data)
+                last_seen_buffer.touch(user.id, user.last_seen)
+                user_context_cache.set_user(user)
+                return user, False  # Existing user
             else:
                 # Create new user (use admin client to bypass RLS)
                 new_user = User(
@@ -55,8 +68,12 @@ class SupabaseService:
                 user_data['created_at'] = user_data['created_at'].isoformat()
                 user_data['last_seen'] = user_data['last_seen'].isoformat()
                 
-                result = self.admin_client.table("users").insert(user_data).execute()
-                return User(**result.data[0]), True  # New user
+                result = await run_query(self.admin_client.table("users").insert(user_data))
+                user = User(**result.data[0])
+                user_context_cache.set_user(user)
+                # A brand new user has no session yet
+                user_context_cache.set_active_session(user.id, None)
+                return user, True  # New user
                 
         except Exception as e:
             logger.error(f"Error in get_or_create_user: {e}")
@@ -65,9 +82,15 @@ class SupabaseService:
     async def get_user(self, user_id: UUID) -> Optional[User]:
         """Get user by ID."""
         try:
-            result = self.admin_client.table("users").select("*").eq("id", str(user_id)).execute()
+            cached_user = user_context_cache.get_user_by_id(user_id)
+            if cached_user:
+                return cached_user
+            
+            result = await run_query(self.admin_client.table("users").select("*").eq("id", str(user_id)))
             if result.data:
-                return User(**result.data[0])
+                user = User(**result.data[0])
+                user_context_cache.set_user(user)
+                return user
             return None
         except Exception as e:
             logger.error(f"Error getting user {user_id}: {e}")
@@ -93,25 +116,18 @@ class SupabaseService:
             logger.info(f"Saving message: {safe_log_content(message.content)}...")
             msg_logger.log_database_operation("INSERT", "messages", None, success=True)
             
-            if not message.id:
-                message.id = uuid4()
-            
-            # Convert to dict with proper serialization
-            message_data = message.dict()
-            message_data['id'] = str(message_data['id'])  # Convert UUID to string
-            message_data['user_id'] = str(message_data['user_id'])  # Convert UUID to string
-            if message_data.get('session_id'):
-                message_data['session_id'] = str(message_data['session_id'])
-            message_data['message_timestamp'] = message_data['message_timestamp'].isoformat()
-            
-            # Recursively convert any UUID objects in metadata to strings
-            if message_data.get('metadata'):
-                message_data['metadata'] = self._serialize_nested_objects(message_data['metadata'])
+            message_data = self._serialize_message(message)
             
             # Use admin client to bypass RLS
-            result = self.admin_client.table("messages").insert(message_data).execute()
-            
-            saved_message = Message(**result.data[0])
+            result = await run_query(self.admin_client.table("messages").insert(message_data))
+            
+            row = result.data[0]
+            if message.vector_embedding is not None:
+                row["vector_embedding"] = message.vector_embedding  # Skip re-parsing the echoed literal
+            saved_message = Message(**row)
+            if saved_message.tags:
+                user_context_cache.invalidate_tags(saved_message.user_id)
+            vector_index.add_message(saved_message)
             logger.info(f"Successfully saved message with ID: {saved_message.id}")
             msg_logger.log_database_operation("INSERT", "messages", str(saved_message.id), success=True)
             
@@ -122,6 +138,102 @@ class SupabaseService:
             msg_logger.log_database_operation("INSERT", "messages", None, success=False, error=str(e))
             raise
     
+    def _serialize_message(self, message: Message) -> Dict[str, Any]:
+        """Convert a message to a JSON-ready row, assigning an ID if needed."""
+        if not message.id:
+            message.id = uuid4()
+        
+        # Convert to dict with proper serialization
+        message_data = message.dict()
+        message_data['id'] = str(message_data['id'])  # Convert UUID to string
+        message_data['user_id'] = str(message_data['user_id'])  # Convert UUID to string
+        if message_data.get('session_id'):
+            message_data['session_id'] = str(message_data['session_id'])
+        message_data['message_timestamp'] = message_data['message_timestamp'].isoformat()
+        
+        # Recursively convert any UUID objects in metadata to strings
+        if message_data.get('metadata'):
+            message_data['metadata'] = self._serialize_nested_objects(message_data['metadata'])
+        
+        # pgvector text literal at float32 precision (also valid for halfvec columns)
+        message_data['vector_embedding'] = to_pgvector(message_data.get('vector_embedding'))
+        
+        return message_data
+    
+    async def save_messages_batch(self, messages: List[Message]) -> int:
+        """Save several messages in one multi-row insert.
+        
+        Rows already present (same ID) are skipped, so retrying a batch is safe.
+        """
+        if not messages:
+            return 0
+        
+        try:
+            rows = [self._serialize_message(message) for message in messages]
+            result = await run_query(self.admin_client.table("messages").upsert(
+                rows, on_conflict="id", ignore_duplicates=True
+            ))
+            msg_logger.log_database_operation("INSERT", "messages", f"batch of {len(rows)}", success=True)
+            for message in messages:
+                vector_index.add_message(message)
+            return len(result.data or [])
+        except Exception as e:
+            logger.error(f"Error saving batch of {len(messages)} messages: {e}")
+            msg_logger.log_database_operation("INSERT", "messages", None, success=False, error=str(e))
+            raise
+    
+    async def get_users_by_ids(self, user_ids: List[UUID]) -> Dict[str, User]:
+        """Get several users by ID, keyed by the string user ID."""
+        users = {}
+        missing = []
+        for user_id in {str(user_id) for user_id in user_ids}:
+            cached_user = user_context_cache.get_user_by_id(user_id)
+            if cached_user:
+                users[user_id] = cached_user
+            else:
+                missing.append(user_id)
+        
+        # Keep "id=in.(...)" filters to a sane URL length
+        for i in range(0, len(missing), 200):
+            try:
+                result = await run_query(self.admin_client.table("users").select("*").in_("id", missing[i:i + 200]))
+                for row in result.data or []:
+                    user = User(**row)
+                    user_context_cache.set_user(user)
+                    users[str(user.id)] = user
+            except Exception as e:
+                logger.error(f"Error getting users by ID: {e}")
+        
+        return users
+    
+    async def get_users_by_phone(self, phone_numbers: List[str]) -> Dict[str, User]:
+        """Get existing users for several phone numbers in one query.
+        
+        Raises on query errors, so callers can tell "no such user" from a
+        failed lookup and retry.
+        """
+        users = {}
+        missing = []
+        for phone_number in set(phone_numbers):
+            cached_user = user_context_cache.get_user_by_phone(phone_number)
+            if cached_user:
+                users[phone_number] = cached_user
+            else:
+                missing.append(phone_number)
+        
+        if missing:
+            try:
+                result = await run_query(self.admin_client.table("users").select("*").in_("phone_number", missing))
+                for row in result.data or []:
+                    user = User(**row)
+                    user_context_cache.set_user(user)
+                    users[user.phone_number] = user
+            except Exception as e:
+                logger.error(f"Error getting users by phone: {e}")
+                raise
+        
+        return users
+    
     async def get_user_messages(
         self, 
         user_id: UUID, 
@@ -145,7 +257,7 @@ class SupabaseService:
             if since:
                 query = query.gte("message_timestamp", since.isoformat())
             
-            result = query.order("message_timestamp", desc=True).limit(limit).execute()
+            result = await run_query(query.order("message_timestamp", desc=True).limit(limit))
             return [Message(**msg) for msg in result.data]
         except Exception as e:
             logger.error(f"Error getting user messages: {e}")
@@ -154,23 +266,39 @@ class SupabaseService:
     async def search_messages_vector(
         self, 
         user_id: UUID, 
-        query_embedding: List[float], 
+        query_embedding: Sequence[float], 
         limit: int = 10,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
     ) -> List[Dict[str, Any]]:
-        """Search messages using vector similarity (requires pgvector setup)."""
+        """Search messages using vector similarity (requires pgvector setup).
+        
+        Searches the in-memory per-user index when enabled, falling back to the
+        search_messages_by_vector RPC if the user's vectors can't be loaded.
+        predicate filters results by message fields (content, tags, type,
+        message_timestamp); on the RPC path it runs on the returned rows.
+        """
+        if vector_index.enabled:
+            results = await vector_index.search(user_id, query_embedding, limit, similarity_threshold,
+                                                loader=self.get_user_message_vectors, predicate=predicate,
+                                                fetch_vectors=self.get_message_embeddings)
+            if results is not None:
+                return results
+        
         try:
             # Use RPC call for vector search with pgvector
-            result = self.admin_client.rpc(
+            result = await run_query(self.admin_client.rpc(
                 'search_messages_by_vector',
                 {
                     'user_id': str(user_id),
-                    'query_embedding': query_embedding,
+                    'query_embedding': to_pgvector(query_embedding),
                     'match_threshold': similarity_threshold,
                     'match_count': limit
                 }
-            ).execute()
+            ))
             
+            if predicate is not None:
+                return [row for row in result.data or [] if predicate(row)]
             return result.data
         except Exception as e:
             logger.info("Vector search not available - using text search fallback")
@@ -179,10 +307,81 @@ class SupabaseService:
             # Fallback to regular text search
             return await self._fallback_text_search(user_id, limit)
     
+    async def get_user_message_vectors(self, user_id: UUID, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Get every embedded message of a user with the fields vector search returns.
+        
+        Raises on errors so the vector index can fall back to the RPC.
+        """
+        rows = []
+        offset = 0
+        while True:
+            result = await run_query(
+                self.admin_client.table("messages")
+                .select("id, content, tags, type, message_timestamp, vector_embedding")
+                .eq("user_id", str(user_id))
+                .not_.is_("vector_embedding", "null")
+                .order("id")
+                .range(offset, offset + page_size - 1)
+            )
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            offset += page_size
+    
+    async def search_messages_text(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 50,
+        tags: Optional[List[str]] = None,
+        message_type: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Full-text and trigram search of a user's messages, best matches first."""
+        try:
+            result = await run_query(self.admin_client.rpc('search_messages_text', {
+                'user_id': str(user_id),
+                'search_query': query,
+                'match_count': limit,
+                'filter_tags': tags or None,
+                'filter_type': message_type,
+                'date_from': date_from.isoformat() if date_from else None,
+                'date_to': date_to.isoformat() if date_to else None
+            }))
+            return result.data or []
+        except Exception as e:
+            logger.info("Text search RPC not available - using full-text filter fallback")
+            logger.debug(f"Text search RPC error: {e}")
+        
+        # Unranked: plain full-text match, newest first
+        try:
+            builder = (
+                self.admin_client.table("messages")
+                .select("id, content, tags, type, message_timestamp")
+                .eq("user_id", str(user_id))
+            )
+            if tags:
+                builder = builder.contains("tags", tags)
+            if message_type:
+                builder = builder.eq("type", message_type)
+            if date_from:
+                builder = builder.gte("message_timestamp", date_from.isoformat())
+            if date_to:
+                builder = builder.lt("message_timestamp", date_to.isoformat())
+            builder = builder.order("message_timestamp", desc=True).limit(limit)
+            # text_search returns a builder without filter methods, so it goes last
+            result = await run_query(builder.text_search("content", query, options={"config": "english", "type": "plain"}))
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Error searching messages by text: {e}")
+            return []
+    
     async def _fallback_text_search(self, user_id: UUID, limit: int) -> List[Dict[str, Any]]:
         """Fallback text search when vector search is not available."""
         try:
-            result = self.client.table("messages").select("*").eq("user_id", str(user_id)).order("message_timestamp", desc=True).limit(limit).execute()
+            result = await run_query(self.client.table("messages").select("*").eq("user_id", str(user_id)).order("message_timestamp", desc=True).limit(limit))
             
             # Convert to vector search format
             return [
@@ -207,11 +406,18 @@ class SupabaseService:
                 reminder.id = uuid4()
             if not reminder.created_at:
                 reminder.created_at = datetime.now(timezone.utc)
-            
-            # Convert to dict with proper serialization
-            reminder_data = reminder.dict()
+            # The first occurrence of a recurring reminder starts its series
+            if reminder.repeat_type != RepeatType.NONE and not reminder.series_id:
+                reminder.series_id = reminder.id
+            
+            # Convert to dict with proper serialization. Claims are only written by
+            # claim_due_reminders / release_reminder_claim, so a stale copy can't
+            # overwrite a live claim and saves work before add_reminder_claims.sql
+            reminder_data = reminder.dict(exclude={'claimed_at', 'claimed_by'})
             reminder_data['id'] = str(reminder_data['id'])
             reminder_data['user_id'] = str(reminder_data['user_id'])
+            if reminder_data.get('series_id'):
+                reminder_data['series_id'] = str(reminder_data['series_id'])
             reminder_data['created_at'] = reminder_data['created_at'].isoformat()
             reminder_data['trigger_time'] = reminder_data['trigger_time'].isoformat()
             if reminder_data.get('completed_at'):
@@ -220,8 +426,10 @@ class SupabaseService:
                 reminder_data['repeat_until'] = reminder_data['repeat_until'].isoformat()
             
             # Use upsert to handle both create and update operations
-            result = self.admin_client.table("reminders").upsert(reminder_data).execute()
-            return Reminder(**result.data[0])
+            result = await run_query(self.admin_client.table("reminders").upsert(reminder_data))
+            saved_reminder = Reminder(**result.data[0])
+            reminder_events.publish(saved_reminder)
+            return saved_reminder
         except Exception as e:
             logger.error(f"Error saving reminder: {e}")
             raise
@@ -242,7 +450,7 @@ class SupabaseService:
             if upcoming_only:
                 query = query.gte("trigger_time", datetime.now(timezone.utc).isoformat())
             
-            result = query.order("trigger_time", desc=False).execute()
+            result = await run_query(query.order("trigger_time", desc=False))
             return [Reminder(**r) for r in result.data]
         except Exception as e:
             logger.error(f"Error getting user reminders: {e}")
@@ -261,7 +469,7 @@ class SupabaseService:
             # 1. Are active
             # 2. Have trigger_time between start_time and end_time
             # 3. Don't have completed_at set (haven't been sent yet)
-            result = self.admin_client.table("reminders").select("*").eq(
+            result = await run_query(self.admin_client.table("reminders").select("*").eq(
                 "is_active", True
             ).gte(
                 "trigger_time", start_time.isoformat()
@@ -269,55 +477,160 @@ class SupabaseService:
                 "trigger_time", end_time.isoformat()
             ).is_(
                 "completed_at", "null"
-            ).execute()
+            ))
             
             return [Reminder(**r) for r in result.data]
         except Exception as e:
             logger.error(f"Error getting due reminders: {e}")
             return []
     
+    async def get_pending_reminders(self, start_time: datetime, end_time: datetime, page_size: int = 1000,
+                                    user_buckets: Optional[List[int]] = None) -> List[Reminder]:
+        """Get active, unsent reminders with trigger_time in [start_time, end_time], paging through all rows.
+        
+        user_buckets restricts the scan to the partitions a scheduler instance owns (None = all).
+        """
+        reminders = []
+        if user_buckets is not None and not user_buckets:
+            return reminders
+        try:
+            offset = 0
+            while True:
+                query = self.admin_client.table("reminders").select("*").eq(
+                    "is_active", True
+                ).is_(
+                    "completed_at", "null"
+                ).gte(
+                    "trigger_time", start_time.isoformat()
+                ).lte(
+                    "trigger_time", end_time.isoformat()
+                )
+                if user_buckets is not None:
+                    query = query.in_("user_bucket", sorted(user_buckets))
+                result = await run_query(query.order("trigger_time").order("id").range(offset, offset + page_size - 1))
+                
+                reminders.extend(Reminder(**r) for r in result.data)
+                if len(result.data) < page_size:
+                    return reminders
+                offset += page_size
+        except Exception as e:
+            logger.error(f"Error getting pending reminders: {e}")
+            raise
+    
+    async def get_reminders_created_since(self, created_after: datetime, trigger_before: datetime,
+                                          user_buckets: Optional[List[int]] = None) -> List[Reminder]:
+        """Get active, unsent reminders created after a point in time (incremental pickup)."""
+        if user_buckets is not None and not user_buckets:
+            return []
+        try:
+            query = self.admin_client.table("reminders").select("*").eq(
+                "is_active", True
+            ).is_(
+                "completed_at", "null"
+            ).gt(
+                "created_at", created_after.isoformat()
+            ).lte(
+                "trigger_time", trigger_before.isoformat()
+            )
+            if user_buckets is not None:
+                query = query.in_("user_bucket", sorted(user_buckets))
+            result = await run_query(query.order("created_at"))
+            
+            return [Reminder(**r) for r in result.data]
+        except Exception as e:
+            logger.error(f"Error getting recently created reminders: {e}")
+            return []
+    
+    async def get_pending_reminders_by_ids(self, reminder_ids: List[UUID]) -> List[Reminder]:
+        """Re-read reminders and keep only those that are still active and unsent."""
+        reminders = []
+        try:
+            ids = [str(reminder_id) for reminder_id in reminder_ids]
+            # Keep "id=in.(...)" filters to a sane URL length
+            for i in range(0, len(ids), 200):
+                result = await run_query(self.admin_client.table("reminders").select("*").in_(
+                    "id", ids[i:i + 200]
+                ).eq(
+                    "is_active", True
+                ).is_(
+                    "completed_at", "null"
+                ))
+                reminders.extend(Reminder(**r) for r in result.data)
+            
+            return reminders
+        except Exception as e:
+            logger.error(f"Error re-reading reminders: {e}")
+            raise
+    
+    async def claim_due_reminders(self, reminder_ids: List[UUID], claimed_by: str,
+                                  stale_before: datetime) -> List[Reminder]:
+        """
+        Claim due reminders for sending with a conditional UPDATE.
+        
+        Only reminders that are still active, unsent, due and not claimed by
+        another instance (or whose claim went stale) are claimed; the claimed
+        rows are returned, so concurrent schedulers never send the same
+        occurrence twice.
+        """
+        claimed = []
+        now = datetime.now(timezone.utc)
+        ids = [str(reminder_id) for reminder_id in reminder_ids]
+        # Keep "id=in.(...)" filters to a sane URL length
+        for i in range(0, len(ids), 200):
+            result = await run_query(self.admin_client.table("reminders").update({
+                "claimed_at": now.isoformat(),
+                "claimed_by": claimed_by
+            }).in_(
+                "id", ids[i:i + 200]
+            ).eq(
+                "is_active", True
+            ).is_(
+                "completed_at", "null"
+            ).lte(
+                "trigger_time", now.isoformat()
+            ).or_(
+                f'claimed_at.is.null,claimed_at.lt."{stale_before.isoformat()}"'
+            ))
+            claimed.extend(Reminder(**r) for r in result.data)
+        return claimed
+    
+    async def release_reminder_claim(self, reminder_id: UUID, claimed_by: str) -> bool:
+        """Release a claim after a failed send so the reminder can be retried."""
+        try:
+            result = await run_query(self.admin_client.table("reminders").update({
+                "claimed_at": None,
+                "claimed_by": None
+            }).eq(
+                "id", str(reminder_id)
+            ).eq(
+                "claimed_by", claimed_by
+            ).is_(
+                "completed_at", "null"
+            ))
+            return len(result.data) > 0
+        except Exception as e:
+            logger.error(f"Error releasing reminder claim {reminder_id}: {e}")
+            return False
+    
     async def get_missed_recurring_reminders(self, hours_back: int = 768) -> List[Reminder]:  # 768 hours = 32 days
         """
         Find recurring reminders that should have triggered but didn't get their next occurrence created.
         This is a failsafe for system downtime scenarios.
         
-        Logic: For each completed recurring reminder, check if the NEXT occurrence in the chain exists.
-        If not, create ONE reminder for the next expected occurrence (not multiple missed ones).
+        Logic: A series is broken when it has a completed occurrence in the lookback window but no
+        active occurrence. For each broken series, create ONE reminder for the next expected
+        occurrence (not multiple missed ones).
         """
         try:
             # CRITICAL: Use UTC time to match database storage timezone
             now = datetime.now(timezone.utc)
-            cutoff_time = now - timedelta(hours=hours_back)
-            
-            # Find completed recurring reminders that:
-            # 1. Were completed (sent) in the past X hours (32 days for monthly reminders)
-            # 2. Are recurring (not NONE)
-            # 3. Should have had a next occurrence created
-            # 4. But no active reminder exists for the expected next trigger time
-            
-            result = self.admin_client.table("reminders").select("*").eq(
-                "is_active", False  # Completed reminders
-            ).neq(
-                "repeat_type", "none"  # Recurring reminders only
-            ).gte(
-                "completed_at", cutoff_time.isoformat()  # Completed in the lookback window
-            ).not_.is_(
-                "completed_at", "null"  # Must have completed_at set
-            ).execute()
+            broken_chains = await self._get_broken_recurring_chains(hours_back, now)
             
-            completed_recurring = [Reminder(**r) for r in result.data]
             recovery_reminders = []
-            
-            # For each completed recurring reminder, check if the recurring chain continues
-            for reminder in completed_recurring:
-                if not reminder.completed_at or not reminder.trigger_time:
-                    continue
-                
-                # Find the NEXT occurrence that should exist
-                next_expected_reminder = self._find_next_expected_occurrence(reminder, now)
-                
-                if next_expected_reminder:
-                    recovery_reminders.append(next_expected_reminder)
+            for reminder in broken_chains:
+                recovery_reminder = self._build_recovery_reminder(reminder, now)
+                if recovery_reminder:
+                    recovery_reminders.append(recovery_reminder)
             
             if recovery_reminders:
                 logger.info(f"Found {len(recovery_reminders)} broken recurring chains - creating recovery reminders")
@@ -328,9 +641,72 @@ class SupabaseService:
             logger.error(f"Error finding missed recurring reminders: {e}")
             return []
     
-    def _find_next_expected_occurrence(self, completed_reminder: Reminder, current_time: datetime) -> Optional[Reminder]:
+    async def _get_broken_recurring_chains(self, hours_back: int, now: datetime) -> List[Reminder]:
+        """Latest completed occurrence of every recurring series that has no active occurrence."""
+        try:
+            # Single indexed anti-join on series_id (see add_reminder_series.sql)
+            result = await run_query(self.admin_client.rpc(
+                'get_broken_recurring_chains',
+                {'hours_back': hours_back}
+            ))
+            return [Reminder(**r) for r in result.data]
+        except Exception as e:
+            logger.info("Broken chain RPC not available - using two-query fallback")
+            logger.debug(f"Broken chain RPC error: {e}")
+        
+        cutoff_time = now - timedelta(hours=hours_back)
+        
+        # Completed recurring reminders in the lookback window (32 days for monthly reminders)
+        result = await run_query(self.admin_client.table("reminders").select("*").eq(
+            "is_active", False  # Completed reminders
+        ).neq(
+            "repeat_type", "none"  # Recurring reminders only
+        ).gte(
+            "completed_at", cutoff_time.isoformat()  # Completed in the lookback window
+        ).order("trigger_time", desc=True))
+        
+        # Keep only the latest completed occurrence per series
+        latest: Dict[Any, Reminder] = {}
+        for row in result.data:
+            reminder = Reminder(**row)
+            latest.setdefault(self._series_key(reminder), reminder)
+        if not latest:
+            return []
+        
+        # Active recurring reminders of the same users, fetched once for all series
+        user_ids = list({str(reminder.user_id) for reminder in latest.values()})
+        active_keys = set()
+        for i in range(0, len(user_ids), 200):
+            active_result = await run_query(self.admin_client.table("reminders").select("*").in_(
+                "user_id", user_ids[i:i + 200]
+            ).eq(
+                "is_active", True
+            ).neq(
+                "repeat_type", "none"
+            ))
+            for row in active_result.data:
+                active = Reminder(**row)
+                active_keys.add(self._series_key(active))
+                active_keys.add(self._legacy_series_key(active))
+        
+        return [
+            reminder for key, reminder in latest.items()
+            if key not in active_keys and self._legacy_series_key(reminder) not in active_keys
+        ]
+    
+    def _series_key(self, reminder: Reminder):
+        """Identify a recurring series; rows from before series_id fall back to the legacy key."""
+        if reminder.series_id:
+            return str(reminder.series_id)
+        return self._legacy_series_key(reminder)
+    
+    def _legacy_series_key(self, reminder: Reminder):
+        """Chains used to be identified by user, title and repeat type."""
+        return (str(reminder.user_id), reminder.title, reminder.repeat_type)
+    
+    def _build_recovery_reminder(self, completed_reminder: Reminder, current_time: datetime) -> Optional[Reminder]:
         """
-        Find the next occurrence that should exist in the recurring chain.
+        Build the next occurrence for a broken recurring chain.
         Only creates ONE reminder to continue the chain, not multiple missed ones.
         """
         try:
@@ -347,24 +723,6 @@ class SupabaseService:
             if completed_reminder.repeat_until and next_trigger > completed_reminder.repeat_until:
                 return None
             
-            # Check if any active reminder exists for this recurring series
-            existing_result = self.admin_client.table("reminders").select("id").eq(
-                "user_id", str(completed_reminder.user_id)
-            ).eq(
-                "title", completed_reminder.title
-            ).eq(
-                "is_active", True
-            ).eq(
-                "repeat_type", completed_reminder.repeat_type
-            ).execute()
-            
-            # If an active reminder exists for this series, the chain is intact
-            if existing_result.data:
-                return None
-            
-            # No active reminder exists - the chain is broken
-            # Create the NEXT occurrence to continue the chain
-            
             # If the expected time has passed, calculate the next appropriate time
             if next_trigger <= current_time:
                 next_trigger = self._calculate_next_appropriate_time(
@@ -386,6 +744,7 @@ class SupabaseService:
                 repeat_type=completed_reminder.repeat_type,
                 repeat_interval=completed_reminder.repeat_interval,
                 repeat_until=completed_reminder.repeat_until,
+                series_id=completed_reminder.series_id or completed_reminder.id,
                 tags=completed_reminder.tags or [],
                 is_active=True,
                 created_at=current_time
@@ -395,7 +754,7 @@ class SupabaseService:
             return recovery_reminder
             
         except Exception as e:
-            logger.error(f"Error finding next expected occurrence: {e}")
+            logger.error(f"Error building recovery reminder: {e}")
             return None
     
     def _calculate_next_appropriate_time(
@@ -515,14 +874,18 @@ class SupabaseService:
                 birthday.id = uuid4()
                 birthday.created_at = datetime.now(timezone.utc)
             
-            # Convert to dict with proper serialization
-            birthday_data = birthday.dict()
+            # Keep the precomputed anniversary current so upcoming-birthday range scans see it right away
+            birthday.next_occurrence = next_birthday_occurrence(birthday.birthdate.date(), birthday_reference_date())
+            
+            # Convert to dict with proper serialization; last_notified_on belongs to the birthday notifier
+            birthday_data = birthday.dict(exclude={'last_notified_on'})
             birthday_data['id'] = str(birthday_data['id'])
             birthday_data['user_id'] = str(birthday_data['user_id'])
             birthday_data['created_at'] = birthday_data['created_at'].isoformat()
             birthday_data['birthdate'] = birthday_data['birthdate'].isoformat() if hasattr(birthday_data['birthdate'], 'isoformat') else str(birthday_data['birthdate'])
+            birthday_data['next_occurrence'] = birthday_data['next_occurrence'].isoformat()
             
-            result = self.admin_client.table("birthdays").insert(birthday_data).execute()
+            result = await run_query(self.admin_client.table("birthdays").insert(birthday_data))
             
             saved_birthday = Birthday(**result.data[0])
             logger.info(f"Successfully saved birthday for {birthday.person_name} with ID: {saved_birthday.id}")
@@ -538,31 +901,64 @@ class SupabaseService:
     async def get_user_birthdays(self, user_id: UUID) -> List[Birthday]:
         """Get user birthdays."""
         try:
-            result = self.admin_client.table("birthdays").select("*").eq("user_id", str(user_id)).order("birthdate", desc=False).execute()
+            result = await run_query(self.admin_client.table("birthdays").select("*").eq("user_id", str(user_id)).order("birthdate", desc=False))
             return [Birthday(**b) for b in result.data]
         except Exception as e:
             logger.error(f"Error getting user birthdays: {e}")
             return []
     
     async def get_upcoming_birthdays(self, user_id: UUID, days_ahead: int = 30) -> List[Birthday]:
-        """Get upcoming birthdays within specified days."""
+        """Get upcoming birthdays within specified days (requires add_birthday_occurrences.sql)."""
+        today = datetime.now(timezone.utc).date()
         try:
-            # Try custom RPC function for date calculations across years
-            result = self.admin_client.rpc(
-                'get_upcoming_birthdays',
-                {
-                    'user_id': str(user_id),
-                    'days_ahead': days_ahead
-                }
-            ).execute()
+            # Range scan on the precomputed next anniversary
+            result = await run_query(self.admin_client.table("birthdays").select("*").eq(
+                "user_id", str(user_id)
+            ).gte(
+                "next_occurrence", today.isoformat()
+            ).lte(
+                "next_occurrence", (today + timedelta(days=days_ahead)).isoformat()
+            ).order("next_occurrence"))
             
             return [Birthday(**b) for b in result.data]
         except Exception as e:
-            logger.info("Advanced birthday search not available - using simple fallback")
-            logger.debug(f"Birthday RPC error: {e}")
+            logger.error(f"Error getting upcoming birthdays: {e}")
+            return []
+    
+    async def refresh_birthday_occurrences(self, reference_date: date) -> int:
+        """
+        Roll next_occurrence forward for birthdays that have passed (or were never computed).
+        
+        Returns:
+            Number of birthdays updated
+        """
+        result = await run_query(self.admin_client.rpc(
+            'refresh_birthday_occurrences',
+            {'reference_date': reference_date.isoformat()}
+        ))
+        return int(result.data or 0)
+    
+    async def get_birthdays_occurring_between(self, start: date, end: date, page_size: int = 1000) -> List[Birthday]:
+        """Get every birthday whose next occurrence is in [start, end], paging through all rows."""
+        birthdays = []
+        offset = 0
+        while True:
+            result = await run_query(self.admin_client.table("birthdays").select("*").gte(
+                "next_occurrence", start.isoformat()
+            ).lte(
+                "next_occurrence", end.isoformat()
+            ).order("next_occurrence").order("id").range(offset, offset + page_size - 1))
             
-            # Fallback: just get all birthdays
-            return await self.get_user_birthdays(user_id)
+            birthdays.extend(Birthday(**b) for b in result.data)
+            if len(result.data) < page_size:
+                return birthdays
+            offset += page_size
+    
+    async def set_birthday_fields(self, birthday_ids: List[str], fields: Dict[str, Any]):
+        """Set the same column values on several birthdays."""
+        # Keep "id=in.(...)" filters to a sane URL length
+        for i in range(0, len(birthday_ids), 200):
+            await run_query(self.admin_client.table("birthdays").update(fields).in_("id", birthday_ids[i:i + 200]))
     
     # Session Operations
     async def create_session(self, user_id: UUID, session_type: str = "brain_dump", tags: Optional[List[str]] = None) -> Session:
@@ -585,8 +981,10 @@ class SupabaseService:
             if session_data.get('end_time'):
                 session_data['end_time'] = session_data['end_time'].isoformat()
             
-            result = self.admin_client.table("sessions").insert(session_data).execute()
-            return Session(**result.data[0])
+            result = await run_query(self.admin_client.table("sessions").insert(session_data))
+            saved_session = Session(**result.data[0])
+            user_context_cache.set_active_session(user_id, saved_session)
+            return saved_session
         except Exception as e:
             logger.error(f"Error creating session: {e}")
             raise
@@ -594,11 +992,15 @@ class SupabaseService:
     async def get_active_session(self, user_id: UUID) -> Optional[Session]:
         """Get active session for user."""
         try:
-            result = self.admin_client.table("sessions").select("*").eq("user_id", str(user_id)).eq("status", SessionStatus.ACTIVE.value).order("start_time", desc=True).limit(1).execute()
+            found, cached_session = user_context_cache.get_active_session(user_id)
+            if found:
+                return cached_session
             
-            if result.data:
-                return Session(**result.data[0])
-            return None
+            result = await run_query(self.admin_client.table("sessions").select("*").eq("user_id", str(user_id)).eq("status", SessionStatus.ACTIVE.value).order("start_time", desc=True).limit(1))
+            
+            session = Session(**result.data[0]) if result.data else None
+            user_context_cache.set_active_session(user_id, session)
+            return session
         except Exception as e:
             logger.error(f"Error getting active session: {e}")
             return None
@@ -606,10 +1008,11 @@ class SupabaseService:
     async def end_session(self, session_id: UUID, status: SessionStatus = SessionStatus.COMPLETED) -> bool:
         """End a session."""
         try:
-            result = self.admin_client.table("sessions").update({
+            result = await run_query(self.admin_client.table("sessions").update({
                 "status": status.value,
                 "end_time": datetime.now(timezone.utc).isoformat()
-            }).eq("id", str(session_id)).execute()
+            }).eq("id", str(session_id)))
+            user_context_cache.invalidate_session(session_id)
             
             return len(result.data) > 0
         except Exception as e:
@@ -619,9 +1022,10 @@ class SupabaseService:
     async def update_session_metadata(self, session_id: UUID, metadata: Dict[str, Any]) -> bool:
         """Update session metadata."""
         try:
-            result = self.admin_client.table("sessions").update({
+            result = await run_query(self.admin_client.table("sessions").update({
                 "metadata": metadata
-            }).eq("id", str(session_id)).execute()
+            }).eq("id", str(session_id)))
+            user_context_cache.invalidate_session(session_id)
             
             return len(result.data) > 0
         except Exception as e:
@@ -631,9 +1035,10 @@ class SupabaseService:
     async def update_session_tags(self, session_id: UUID, tags: List[str]) -> bool:
         """Update session tags."""
         try:
-            result = self.admin_client.table("sessions").update({
+            result = await run_query(self.admin_client.table("sessions").update({
                 "tags": tags
-            }).eq("id", str(session_id)).execute()
+            }).eq("id", str(session_id)))
+            user_context_cache.invalidate_session(session_id)
             
             return len(result.data) > 0
         except Exception as e:
@@ -643,14 +1048,20 @@ class SupabaseService:
     # Tag Operations
     async def get_user_tags(self, user_id: UUID) -> Dict[str, int]:
         """Get user tags with usage counts."""
+        cached_tags = user_context_cache.get_tag_counts(user_id)
+        if cached_tags is not None:
+            return cached_tags
+        
         try:
             # Try custom RPC function to aggregate tags
-            result = self.admin_client.rpc(
+            result = await run_query(self.admin_client.rpc(
                 'get_user_tag_counts',
                 {'user_id': str(user_id)}
-            ).execute()
+            ))
             
-            return {item['tag']: item['count'] for item in result.data}
+            tag_counts = {item['tag']: item['count'] for item in result.data}
+            user_context_cache.set_tag_counts(user_id, tag_counts)
+            return tag_counts
         except Exception as e:
             logger.info("Advanced tag counting not available - using simple fallback")
             logger.debug(f"Tag RPC error: {e}")
@@ -668,13 +1079,14 @@ class SupabaseService:
                 logger.error(f"Tag fallback failed: {fallback_error}")
                 return {}
     
-    async def update_message_vector(self, message_id: UUID, embedding: List[float]) -> bool:
+    async def update_message_vector(self, message_id: UUID, embedding: Sequence[float]) -> bool:
         """Update message with vector embedding."""
         try:
-            result = self.admin_client.table("messages").update({
-                "vector_embedding": embedding
-            }).eq("id", str(message_id)).execute()
+            result = await run_query(self.admin_client.table("messages").update({
+                "vector_embedding": to_pgvector(embedding)
+            }).eq("id", str(message_id)))
             
+            vector_index.update_vector(message_id, embedding)
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error updating message vector: {e}")
@@ -683,15 +1095,30 @@ class SupabaseService:
     async def update_message_tags(self, message_id: UUID, tags: List[str]) -> bool:
         """Update message with new tags."""
         try:
-            result = self.admin_client.table("messages").update({
+            result = await run_query(self.admin_client.table("messages").update({
                 "tags": tags
-            }).eq("id", str(message_id)).execute()
+            }).eq("id", str(message_id)))
             
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error updating message tags: {e}")
             return False
 
+    async def delete_message(self, message_id: UUID, user_id: UUID) -> bool:
+        """Delete one of a user's messages."""
+        try:
+            result = await run_query(self.admin_client.table("messages").delete().eq(
+                "id", str(message_id)
+            ).eq(
+                "user_id", str(user_id)
+            ))
+
+            vector_index.remove_message(message_id, user_id)
+            return len(result.data) > 0
+        except Exception as e:
+            logger.error(f"Error deleting message {message_id}: {e}")
+            return False
+
     # File Operations
     async def save_file_record(self, file: File) -> File:
         """Save a file record to the database."""
@@ -713,7 +1140,7 @@ class SupabaseService:
             if file_data.get('deleted_at'):
                 file_data['deleted_at'] = file_data['deleted_at'].isoformat()
             
-            result = self.admin_client.table("files").insert(file_data).execute()
+            result = await run_query(self.admin_client.table("files").insert(file_data))
             
             saved_file = File(**result.data[0])
             logger.info(f"Successfully saved file record with ID: {saved_file.id}")
@@ -732,7 +1159,7 @@ class SupabaseService:
             if file_type:
                 query = query.eq("file_type", file_type)
             
-            result = query.order("created_at", desc=True).execute()
+            result = await run_query(query.order("created_at", desc=True))
             return [File(**f) for f in result.data]
         except Exception as e:
             logger.error(f"Error getting user files: {e}")
@@ -746,16 +1173,78 @@ class SupabaseService:
                 update_data["transcription_text"] = transcription_text
                 update_data["transcription_status"] = "completed"
             
-            result = self.admin_client.table("files").update(update_data).eq("id", str(file_id)).execute()
+            result = await run_query(self.admin_client.table("files").update(update_data).eq("id", str(file_id)))
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error updating file status: {e}")
             return False
     
+    async def find_file_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[File]:
+        """Get the user's most recent completed file with the given content hash."""
+        try:
+            result = await run_query(
+                self.admin_client.table("files").select("*")
+                .eq("user_id", str(user_id))
+                .eq("metadata->>content_hash", content_hash)
+                .eq("upload_status", "completed")
+                .is_("deleted_at", "null")
+                .order("created_at", desc=True)
+                .limit(1)
+            )
+            return File(**result.data[0]) if result.data else None
+        except Exception as e:
+            logger.error(f"Error finding file by content hash: {e}")
+            return None
+    
+    async def update_file_metadata(self, file_id: UUID, metadata: Dict[str, Any],
+                                   transcription_text: Optional[str] = None) -> bool:
+        """Replace file metadata (callers merge with the existing metadata first)."""
+        try:
+            update_data = {"metadata": metadata}
+            if transcription_text:
+                update_data["transcription_text"] = transcription_text
+                update_data["transcription_status"] = "completed"
+            
+            result = await run_query(self.admin_client.table("files").update(update_data).eq("id", str(file_id)))
+            return len(result.data) > 0
+        except Exception as e:
+            logger.error(f"Error updating file metadata: {e}")
+            return False
+    
+    async def get_message_embedding(self, message_id: UUID) -> Optional[Embedding]:
+        """Get the stored vector embedding of a message."""
+        try:
+            result = await run_query(self.admin_client.table("messages").select("vector_embedding").eq("id", str(message_id)))
+            if not result.data or not result.data[0].get("vector_embedding"):
+                return None
+            # pgvector columns come back as their text form, e.g. "[0.1,0.2,...]"
+            return to_embedding(result.data[0]["vector_embedding"])
+        except Exception as e:
+            logger.error(f"Error getting message embedding {message_id}: {e}")
+            return None
+    
+    async def get_message_embeddings(self, message_ids: List[str]) -> Dict[str, Embedding]:
+        """Get the stored vector embeddings of several messages, keyed by message ID.
+        
+        Raises on errors so the vector index can keep its approximate ranking.
+        """
+        embeddings: Dict[str, Embedding] = {}
+        for start in range(0, len(message_ids), 200):
+            result = await run_query(
+                self.admin_client.table("messages")
+                .select("id, vector_embedding")
+                .in_("id", [str(message_id) for message_id in message_ids[start:start + 200]])
+            )
+            for row in result.data or []:
+                embedding = to_embedding(row.get("vector_embedding"))
+                if embedding is not None:
+                    embeddings[str(row["id"])] = embedding
+        return embeddings
+    
     async def get_file_by_id(self, file_id: UUID) -> Optional[File]:
         """Get file by ID."""
         try:
-            result = self.client.table("files").select("*").eq("id", str(file_id)).execute()
+            result = await run_query(self.client.table("files").select("*").eq("id", str(file_id)))
             if result.data:
                 return File(**result.data[0])
             return None
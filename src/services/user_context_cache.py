@@ -0,0 +1,111 @@
+"""
+Per-user context cache shared by every SupabaseService instance.
+Holds the user row, active session, timezone and tag counts with short TTLs
+so routing a message doesn't re-read the same rows several times. Writes
+that change this state update or invalidate the cache (write-through).
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from src.config.settings import settings
+from src.models.database import Session, User
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_NO_SESSION = object()  # Cached "user has no active session"
+
+
+class UserContextCache:
+    """Short-lived cache of per-user lookups with write-through invalidation."""
+
+    def __init__(self):
+        max_users = settings.user_context_cache_max_users
+        self._users_by_phone = TTLCache(max_users, settings.user_cache_ttl_seconds)
+        self._users_by_id = TTLCache(max_users, settings.user_cache_ttl_seconds)
+        self._sessions = TTLCache(max_users, settings.session_cache_ttl_seconds)
+        self._session_owners = TTLCache(max_users, settings.session_cache_ttl_seconds)
+        self._timezones = TTLCache(max_users, settings.timezone_cache_ttl_seconds)
+        self._tag_counts = TTLCache(max_users, settings.tag_cache_ttl_seconds)
+        self.invalidations = 0
+
+    # Users
+    def get_user_by_phone(self, phone_number: str) -> Optional[User]:
+        return self._users_by_phone.get(phone_number)
+
+    def get_user_by_id(self, user_id: UUID) -> Optional[User]:
+        return self._users_by_id.get(str(user_id))
+
+    def set_user(self, user: User):
+        if user.id is None:
+            return
+        self._users_by_phone.set(user.phone_number, user)
+        self._users_by_id.set(str(user.id), user)
+        if user.timezone:
+            self._timezones.set(str(user.id), user.timezone)
+
+    def invalidate_user(self, user_id: UUID):
+        user = self._users_by_id.pop(str(user_id))
+        if user is not None:
+            self._users_by_phone.pop(user.phone_number)
+        self.invalidations += 1
+
+    # Sessions
+    def get_active_session(self, user_id: UUID) -> Tuple[bool, Optional[Session]]:
+        """Returns (found, session); found is True for a cached 'no active session'."""
+        cached = self._sessions.get(str(user_id))
+        if cached is None:
+            return False, None
+        return True, None if cached is _NO_SESSION else cached
+
+    def set_active_session(self, user_id: UUID, session: Optional[Session]):
+        self._sessions.set(str(user_id), session if session is not None else _NO_SESSION)
+        if session is not None and session.id is not None:
+            self._session_owners.set(str(session.id), str(user_id))
+
+    def invalidate_session(self, session_id: UUID):
+        """Drop the cached active session of whichever user owns session_id."""
+        user_id = self._session_owners.pop(str(session_id))
+        if user_id is not None:
+            self._sessions.pop(user_id)
+        else:
+            # Owner unknown - be safe and drop every cached session
+            self._sessions.clear()
+        self.invalidations += 1
+
+    # Timezones
+    def get_timezone(self, user_id: UUID) -> Optional[str]:
+        return self._timezones.get(str(user_id))
+
+    def set_timezone(self, user_id: UUID, timezone_str: str):
+        self._timezones.set(str(user_id), timezone_str)
+        user = self._users_by_id.get(str(user_id))
+        if user is not None:
+            self.set_user(user.copy(update={"timezone": timezone_str}))
+
+    # Tags
+    def get_tag_counts(self, user_id: UUID) -> Optional[Dict[str, int]]:
+        return self._tag_counts.get(str(user_id))
+
+    def set_tag_counts(self, user_id: UUID, tag_counts: Dict[str, int]):
+        self._tag_counts.set(str(user_id), tag_counts)
+
+    def invalidate_tags(self, user_id: UUID):
+        if self._tag_counts.pop(str(user_id)) is not None:
+            self.invalidations += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get per-kind hit/miss statistics."""
+        return {
+            "users": self._users_by_phone.stats(),
+            "users_by_id": self._users_by_id.stats(),
+            "sessions": self._sessions.stats(),
+            "timezones": self._timezones.stats(),
+            "tag_counts": self._tag_counts.stats(),
+            "invalidations": self.invalidations
+        }
+
+
+# Global user context cache instance
+user_context_cache = UserContextCache()
@@ -0,0 +1,150 @@
+"""
+Per-user ordered message dispatcher.
+Messages from the same user are routed strictly in arrival order (brain-dump
+sessions and tag replies depend on it) while different users are processed
+concurrently up to a configurable limit.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.config.settings import settings
+from src.models.message_types import ProcessedMessage
+
+logger = logging.getLogger(__name__)
+
+
+class UserOrderedDispatcher:
+    """Shards messages by user_phone and runs one drainer task per active user."""
+
+    def __init__(
+        self,
+        handler: Callable[[ProcessedMessage], Awaitable[Any]],
+        max_concurrent_users: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        """Initialize the dispatcher.
+
+        Args:
+            handler: Coroutine function that routes a single message
+            max_concurrent_users: Users processed at the same time (defaults to settings)
+            max_pending: Total queued messages before dispatch() starts waiting (defaults to settings)
+        """
+        self.handler = handler
+        self.max_concurrent_users = max_concurrent_users or settings.dispatch_max_concurrent_users
+        self.max_pending = max_pending or settings.dispatch_max_pending_messages
+
+        self._concurrency = asyncio.Semaphore(self.max_concurrent_users)
+        self._space = asyncio.Condition()
+        self._shards: Dict[str, Deque[Tuple[float, ProcessedMessage]]] = {}
+        self._drainers: Dict[str, asyncio.Task] = {}
+        self._pending = 0
+
+        # Metrics
+        self._busy = 0
+        self._dispatched = 0
+        self._processed = 0
+        self._failed = 0
+        self._backpressure_waits = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._max_shard_depth = 0
+
+    async def dispatch(self, message: ProcessedMessage):
+        """Queue a message on its user's shard.
+
+        The message is appended before the first await so arrival order is
+        preserved; the call then waits while the dispatcher is over capacity,
+        pushing back on the caller.
+        """
+        shard = self._shards.get(message.user_phone)
+        if shard is None:
+            shard = deque()
+            self._shards[message.user_phone] = shard
+
+        shard.append((time.monotonic(), message))
+        self._pending += 1
+        self._dispatched += 1
+        self._max_shard_depth = max(self._max_shard_depth, len(shard))
+
+        if message.user_phone not in self._drainers:
+            self._drainers[message.user_phone] = asyncio.create_task(
+                self._drain_shard(message.user_phone, shard)
+            )
+
+        if self._pending > self.max_pending:
+            self._backpressure_waits += 1
+            async with self._space:
+                await self._space.wait_for(lambda: self._pending <= self.max_pending)
+
+    async def _drain_shard(self, user_phone: str, shard: Deque[Tuple[float, ProcessedMessage]]):
+        """Route a user's messages one at a time until their shard is empty."""
+        try:
+            while shard:
+                enqueued_at, message = shard[0]
+                async with self._concurrency:
+                    self._busy += 1
+                    wait_seconds = time.monotonic() - enqueued_at
+                    self._total_wait_seconds += wait_seconds
+                    self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+                    try:
+                        await self.handler(message)
+                        self._processed += 1
+                    except Exception as e:
+                        self._failed += 1
+                        logger.error(f"Error routing message {message.message_id}: {e}", exc_info=True)
+                    finally:
+                        self._busy -= 1
+
+                shard.popleft()
+                self._pending -= 1
+                async with self._space:
+                    self._space.notify_all()
+        finally:
+            self._shards.pop(user_phone, None)
+            self._drainers.pop(user_phone, None)
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Wait for every user's queued messages to be routed."""
+        drain_timeout = timeout if timeout is not None else settings.ingestion_drain_timeout_seconds
+        deadline = time.monotonic() + drain_timeout
+
+        while self._drainers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"Dispatcher drain timed out - {self._pending} messages not processed")
+                for task in list(self._drainers.values()):
+                    task.cancel()
+                break
+            await asyncio.wait(list(self._drainers.values()), timeout=remaining)
+
+    def get_status(self, top_shards: int = 10) -> Dict[str, Any]:
+        """Get dispatcher metrics, including the deepest per-user shards."""
+        now = time.monotonic()
+        completed = self._processed + self._failed
+        shards = sorted(self._shards.items(), key=lambda item: len(item[1]), reverse=True)[:top_shards]
+
+        return {
+            "active_users": len(self._drainers),
+            "busy_users": self._busy,
+            "max_concurrent_users": self.max_concurrent_users,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "dispatched": self._dispatched,
+            "processed": self._processed,
+            "failed": self._failed,
+            "backpressure_waits": self._backpressure_waits,
+            "max_shard_depth": self._max_shard_depth,
+            "avg_wait_ms": round(self._total_wait_seconds / completed * 1000, 1) if completed else 0.0,
+            "max_wait_ms": round(self._max_wait_seconds * 1000, 1),
+            "shards": [
+                {
+                    "user": f"***{user_phone[-4:]}",
+                    "depth": len(shard),
+                    "oldest_wait_ms": round((now - shard[0][0]) * 1000, 1) if shard else 0.0
+                }
+                for user_phone, shard in shards
+            ]
+        }
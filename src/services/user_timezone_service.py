@@ -4,7 +4,9 @@ Service for detecting and managing user timezones.
 import logging
 from datetime import datetime, timezone
 from typing import Optional
+from src.config.database import run_query
 from src.services.supabase_service import SupabaseService
+from src.services.user_context_cache import user_context_cache
 from src.utils.timezone_utils import TimezoneManager
 from src.models.database import User
 
@@ -241,9 +243,10 @@ class UserTimezoneService:
                 timezone_str = "UTC"
             
             # Update in database
-            result = self.db_service.admin_client.table("users").update({
+            result = await run_query(self.db_service.admin_client.table("users").update({
                 "timezone": timezone_str
-            }).eq("id", user_id).execute()
+            }).eq("id", user_id))
+            user_context_cache.set_timezone(user_id, timezone_str)
             
             return len(result.data) > 0
             
@@ -262,13 +265,18 @@ class UserTimezoneService:
             User's timezone string, defaults to UTC if not found
         """
         try:
-            result = self.db_service.admin_client.table("users").select("timezone").eq("id", user_id).execute()
+            cached_timezone = user_context_cache.get_timezone(user_id)
+            if cached_timezone:
+                return cached_timezone
+            
+            result = await run_query(self.db_service.admin_client.table("users").select("timezone").eq("id", user_id))
             
             if result.data and result.data[0].get("timezone"):
+                user_context_cache.set_timezone(user_id, result.data[0]["timezone"])
                 return result.data[0]["timezone"]
             else:
                 # User doesn't have timezone set, detect and set it
-                user_result = self.db_service.admin_client.table("users").select("phone_number").eq("id", user_id).execute()
+                user_result = await run_query(self.db_service.admin_client.table("users").select("phone_number").eq("id", user_id))
                 if user_result.data:
                     phone_number = user_result.data[0]["phone_number"]
                     return await self.detect_and_set_timezone(user_id, phone_number)
@@ -0,0 +1,372 @@
+"""
+Per-user in-memory vector index for message search.
+A user's corpus is a few thousand notes at most, so an exact brute-force
+search over their own vectors is both faster and more accurate than the
+shared ivfflat index, which mostly probes other users' vectors and applies
+the similarity threshold after the approximate step. Each active user's
+embeddings are loaded lazily into a float32 matrix of unit vectors, kept
+current by save_message / update_message_vector, and searched with one
+matrix-vector product. Cold users are evicted LRU; entries are reloaded
+after a TTL so writes made by other workers show up.
+
+vector_index_precision trades memory for accuracy: float16 halves the
+matrix with negligible ranking change; int8 (per-row scalar quantisation)
+quarters it and re-ranks an over-fetched candidate set with the exact
+vectors from the database.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from src.config.settings import settings
+from src.utils.vectors import parse_pgvector, quantize_int8
+
+logger = logging.getLogger(__name__)
+
+# Loads (id, content, tags, type, message_timestamp, vector_embedding) rows for a user
+VectorLoader = Callable[[UUID], Awaitable[List[Dict[str, Any]]]]
+# Restricts a search to messages whose metadata it accepts
+VectorPredicate = Callable[[Dict[str, Any]], bool]
+# Fetches exact embeddings by message ID, for re-ranking quantised matches
+VectorFetcher = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+# Rows converted to float32 at a time when scanning a compact matrix
+_SCAN_CHUNK = 4096
+# int8 scores can be off by a few thousandths; keep borderline matches for re-ranking
+_INT8_THRESHOLD_MARGIN = 0.02
+
+
+def to_unit_vector(embedding: Any) -> Optional[np.ndarray]:
+    """float32 unit vector from a list, array or pgvector text form; None if empty."""
+    if embedding is None:
+        return None
+    if isinstance(embedding, str):
+        vector = parse_pgvector(embedding)
+    else:
+        vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if vector.ndim != 1 or not norm:
+        return None
+    return vector / norm
+
+
+class UserVectors:
+    """Unit vectors and result metadata of one user's messages."""
+
+    def __init__(self, dimensions: int, capacity: int = 64, precision: str = "float32"):
+        self.precision = precision
+        self.matrix = np.zeros((capacity, dimensions), dtype=PRECISIONS[precision])
+        # Per-row dequantisation scales (int8 only)
+        self.scales = np.ones(capacity, dtype=np.float32) if precision == "int8" else None
+        self.size = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.metadata: List[Dict[str, Any]] = []
+        self.loaded_at = time.monotonic()
+
+    def upsert(self, message_id: str, vector: np.ndarray, metadata: Dict[str, Any]):
+        """Insert or replace one message's vector."""
+        row = self.rows.get(message_id)
+        if row is None:
+            if self.size == len(self.matrix):
+                grown = np.zeros((len(self.matrix) * 2, self.matrix.shape[1]), dtype=self.matrix.dtype)
+                grown[:self.size] = self.matrix[:self.size]
+                self.matrix = grown
+                if self.scales is not None:
+                    self.scales = np.concatenate([self.scales, np.ones(len(self.scales), dtype=np.float32)])
+            row = self.size
+            self.size += 1
+            self.rows[message_id] = row
+            self.ids.append(message_id)
+            self.metadata.append(metadata)
+        else:
+            self.metadata[row] = {**self.metadata[row], **metadata}
+        if self.scales is not None:
+            codes, scales = quantize_int8(vector)
+            self.matrix[row], self.scales[row] = codes[0], scales[0]
+        else:
+            self.matrix[row] = vector
+
+    def remove(self, message_id: str) -> bool:
+        """Drop one message's vector, moving the last row into its place."""
+        row = self.rows.pop(message_id, None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            if self.scales is not None:
+                self.scales[row] = self.scales[last]
+            self.ids[row], self.metadata[row] = self.ids[last], self.metadata[last]
+            self.rows[self.ids[row]] = row
+        self.ids.pop()
+        self.metadata.pop()
+        self.size = last
+        return True
+    
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+    
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row with a unit query."""
+        if self.matrix.dtype == np.float32:
+            return self.matrix[:self.size] @ query
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, _SCAN_CHUNK):
+            end = min(start + _SCAN_CHUNK, self.size)
+            scores[start:end] = self.matrix[start:end].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[:self.size]
+        return scores
+
+    def search(self, query: np.ndarray, limit: int, threshold: float,
+               predicate: Optional[VectorPredicate] = None) -> List[Dict[str, Any]]:
+        """Top matches above threshold, most similar first."""
+        if not self.size or limit <= 0:
+            return []
+        scores = self._scores(query)
+        candidates = np.flatnonzero(scores > threshold)
+        if predicate is not None and len(candidates):
+            allowed = np.fromiter((predicate(self.metadata[row]) for row in candidates), dtype=bool, count=len(candidates))
+            candidates = candidates[allowed]
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+        return [
+            {"id": self.ids[row], **self.metadata[row], "similarity": float(scores[row])}
+            for row in candidates
+        ]
+
+
+class VectorIndex:
+    """LRU of per-user vector matrices with write-through updates."""
+
+    def __init__(self, max_users: Optional[int] = None, max_vectors: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None, dimensions: Optional[int] = None,
+                 precision: Optional[str] = None):
+        self.enabled = settings.vector_index_enabled
+        self.precision = precision or settings.vector_index_precision
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"vector_index_precision must be one of {sorted(PRECISIONS)}, got {self.precision}")
+        self.rerank_factor = settings.vector_index_rerank_factor
+        self.max_users = max_users or settings.vector_index_max_users
+        self.max_vectors = max_vectors or settings.vector_index_max_vectors
+        self.ttl_seconds = ttl_seconds or settings.vector_index_ttl_seconds
+        self.dimensions = dimensions or settings.vector_dimensions
+        self._users: "OrderedDict[str, UserVectors]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Messages saved without a vector, waiting for update_message_vector
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        # Writes made while a user's vectors load, applied once the load finishes
+        self._loading: Dict[str, List[Callable[[UserVectors], Any]]] = {}
+
+        # Metrics
+        self.searches = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.reranks = 0
+        self._search_seconds = 0.0
+
+    async def search(self, user_id: UUID, query_embedding: Any, limit: int,
+                     similarity_threshold: float, loader: VectorLoader,
+                     predicate: Optional[VectorPredicate] = None,
+                     fetch_vectors: Optional[VectorFetcher] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search one user's messages by cosine similarity.
+
+        Args:
+            predicate: Optional filter on a message's metadata, applied before top-k
+            fetch_vectors: Exact embeddings by ID, used to re-rank int8 matches
+
+        Returns:
+            Matches in the search_messages_by_vector format, or None if the
+            user's vectors couldn't be loaded (callers fall back to the RPC)
+        """
+        query = to_unit_vector(query_embedding)
+        if query is None:
+            return []
+        vectors = await self._get_user(str(user_id), loader)
+        if vectors is None:
+            return None
+
+        started = time.perf_counter()
+        if vectors.precision == "int8":
+            results = vectors.search(query, limit * self.rerank_factor,
+                                     similarity_threshold - _INT8_THRESHOLD_MARGIN, predicate)
+            results = await self._rerank(results, query, limit, similarity_threshold, fetch_vectors)
+        else:
+            results = vectors.search(query, limit, similarity_threshold, predicate)
+        self._search_seconds += time.perf_counter() - started
+        self.searches += 1
+        return results
+    
+    async def _rerank(self, results: List[Dict[str, Any]], query: np.ndarray, limit: int,
+                      similarity_threshold: float, fetch_vectors: Optional[VectorFetcher]) -> List[Dict[str, Any]]:
+        """Replace approximate int8 similarities with exact ones, then cut to limit."""
+        if fetch_vectors is not None and results:
+            try:
+                exact = await fetch_vectors([result["id"] for result in results])
+                for result in results:
+                    vector = to_unit_vector(exact.get(result["id"]))
+                    if vector is not None and len(vector) == len(query):
+                        result["similarity"] = float(vector @ query)
+                self.reranks += 1
+                results.sort(key=lambda result: result["similarity"], reverse=True)
+            except Exception as e:
+                logger.warning(f"Re-ranking quantised vector matches failed, using approximate scores: {e}")
+        return [result for result in results if result["similarity"] > similarity_threshold][:limit]
+
+    async def _get_user(self, user_id: str, loader: VectorLoader) -> Optional[UserVectors]:
+        vectors = self._live(user_id)
+        if vectors is not None:
+            return vectors
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            vectors = self._live(user_id)
+            if vectors is not None:
+                return vectors
+            self._loading[user_id] = []
+            try:
+                rows = await loader(UUID(user_id))
+            except Exception as e:
+                self.load_failures += 1
+                self._loading.pop(user_id, None)
+                logger.error(f"Error loading message vectors for user {user_id}: {e}")
+                return None
+            finally:
+                self._locks.pop(user_id, None)
+
+            vectors = UserVectors(self.dimensions, capacity=max(64, len(rows)), precision=self.precision)
+            for row in rows:
+                vector = to_unit_vector(row.get("vector_embedding"))
+                if vector is not None and len(vector) == self.dimensions:
+                    vectors.upsert(str(row["id"]), vector, self._metadata(row))
+            self._users[user_id] = vectors
+            # The page reads may have missed writes made during the load
+            for change in self._loading.pop(user_id, []):
+                change(vectors)
+            self.loads += 1
+            self._evict()
+            logger.debug(f"Loaded {vectors.size} message vectors for user {user_id}")
+            return vectors
+
+    def _live(self, user_id: str) -> Optional[UserVectors]:
+        vectors = self._users.get(user_id)
+        if vectors is None:
+            return None
+        if time.monotonic() - vectors.loaded_at > self.ttl_seconds:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return vectors
+
+    def _evict(self):
+        total = sum(vectors.size for vectors in self._users.values())
+        while len(self._users) > 1 and (len(self._users) > self.max_users or total > self.max_vectors):
+            _, vectors = self._users.popitem(last=False)
+            total -= vectors.size
+            self.evictions += 1
+
+    @staticmethod
+    def _metadata(row: Dict[str, Any]) -> Dict[str, Any]:
+        timestamp = row.get("message_timestamp")
+        return {
+            "content": row.get("content", ""),
+            "tags": row.get("tags") or [],
+            "type": row.get("type"),
+            "message_timestamp": timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp
+        }
+
+    # Write-through
+    def _apply(self, user_id: str, change: Callable[[UserVectors], Any]):
+        """Apply a change to a user's loaded vectors, or hold it until an in-flight load finishes."""
+        vectors = self._users.get(user_id)
+        if vectors is not None:
+            change(vectors)
+            self._evict()
+        elif user_id in self._loading:
+            self._loading[user_id].append(change)
+        # Otherwise the next load reads the change from the database
+
+    def add_message(self, message: Any):
+        """Record a saved message for users whose vectors are loaded or loading."""
+        if not self.enabled or message.id is None:
+            return
+        user_id, message_id = str(message.user_id), str(message.id)
+        if user_id not in self._users and user_id not in self._loading:
+            return  # Picked up by the next load
+        metadata = self._metadata(message.dict(include={"content", "tags", "type", "message_timestamp"}))
+        vector = to_unit_vector(message.vector_embedding)
+        if vector is not None and len(vector) == self.dimensions:
+            self._apply(user_id, lambda vectors: vectors.upsert(message_id, vector, metadata))
+        else:
+            self._pending[message_id] = (user_id, metadata)
+            while len(self._pending) > settings.vector_index_max_pending:
+                self._pending.popitem(last=False)
+
+    def update_vector(self, message_id: UUID, embedding: List[float]):
+        """Apply a message's new embedding."""
+        message_id = str(message_id)
+        pending = self._pending.pop(message_id, None)
+        vector = to_unit_vector(embedding)
+        if vector is None or len(vector) != self.dimensions:
+            return
+        if pending is not None:
+            user_id, metadata = pending
+            self._apply(user_id, lambda vectors: vectors.upsert(message_id, vector, metadata))
+            return
+        for vectors in self._users.values():
+            if message_id in vectors.rows:
+                vectors.upsert(message_id, vector, {})
+                return
+
+        def replace(vectors: UserVectors):
+            if message_id in vectors.rows:
+                vectors.upsert(message_id, vector, {})
+
+        # The owner isn't known here; the change only affects the user whose load returned the message
+        for changes in self._loading.values():
+            changes.append(replace)
+
+    def remove_message(self, message_id: UUID, user_id: Optional[UUID] = None):
+        """Forget a deleted message."""
+        message_id = str(message_id)
+        self._pending.pop(message_id, None)
+        if user_id is not None:
+            self._apply(str(user_id), lambda vectors: vectors.remove(message_id))
+            return
+        for vectors in self._users.values():
+            if vectors.remove(message_id):
+                return
+        for changes in self._loading.values():
+            changes.append(lambda vectors: vectors.remove(message_id))
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get index size and search metrics."""
+        vectors = sum(user.size for user in self._users.values())
+        return {
+            "enabled": self.enabled,
+            "precision": self.precision,
+            "users": len(self._users),
+            "vectors": vectors,
+            "memory_mb": round(sum(user.nbytes for user in self._users.values()) / 1_048_576, 1),
+            "searches": self.searches,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "evictions": self.evictions,
+            "reranks": self.reranks,
+            "average_search_ms": round(self._search_seconds / self.searches * 1000, 3) if self.searches else 0.0
+        }
+
+
+# Global vector index instance
+vector_index = VectorIndex()
@@ -0,0 +1,278 @@
+"""
+Maintenance of the sharded HNSW message-vector indexes in Postgres.
+Each user-hash shard has its own partial HNSW index (add_vector_shards.sql).
+Once a day the scheduler leader counts embedded rows per shard and retunes:
+shards that outgrew their build parameters are rebuilt with
+CREATE INDEX CONCURRENTLY and swapped in, and ef_search is adjusted in
+vector_index_config (search_messages_by_vector reads it per query). Invalid
+indexes left by an interrupted build are rebuilt too.
+
+Concurrent index builds can't run inside a transaction, so this needs a
+direct Postgres session (DATABASE_URL), like scheduler coordination.
+Index operator class and query casts follow vector_storage_type, so the
+same code serves `vector` and `halfvec` columns.
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from src.config.database import run_blocking
+from src.config.settings import settings
+from src.services.scheduler_coordinator import USER_BUCKETS, user_bucket
+from src.utils.vectors import to_pgvector
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg2 = None
+    PSYCOPG2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Must match the messages.vector_shard generated column
+VECTOR_SHARDS = 16
+
+# Column type -> HNSW operator class for cosine distance
+STORAGE_OPCLASSES = {"vector": "vector_cosine_ops", "halfvec": "halfvec_cosine_ops"}
+
+# Same statement search_messages_by_vector runs, for EXPLAIN
+SEARCH_SQL = """
+SELECT s.id, s.similarity FROM (
+  SELECT m.id, (1 - (m.vector_embedding <=> %(embedding)s::{storage}))::float AS similarity
+  FROM messages m
+  WHERE m.vector_shard = {shard} AND m.user_id = %(user_id)s AND m.vector_embedding IS NOT NULL
+  ORDER BY m.vector_embedding <=> %(embedding)s::{storage}
+  LIMIT %(limit)s
+) s WHERE s.similarity > %(threshold)s ORDER BY s.similarity DESC
+"""
+
+
+def vector_shard(user_id) -> int:
+    """Shard of a user, same as messages.vector_shard."""
+    return user_bucket(user_id) // (USER_BUCKETS // VECTOR_SHARDS)
+
+
+def index_name(shard: int) -> str:
+    return f"idx_messages_vector_s{shard}"
+
+
+@dataclass(frozen=True)
+class HnswParams:
+    """Build (m, ef_construction) and query (ef_search) parameters of a shard index."""
+    m: int
+    ef_construction: int
+    ef_search: int
+
+
+def tuned_params(rows: int) -> HnswParams:
+    """Index parameters for a shard with this many embedded rows."""
+    if rows < 100_000:
+        return HnswParams(m=16, ef_construction=64, ef_search=40)
+    if rows < 1_000_000:
+        return HnswParams(m=16, ef_construction=128, ef_search=64)
+    return HnswParams(m=24, ef_construction=200, ef_search=100)
+
+
+class VectorIndexMaintainer:
+    """Retunes and rebuilds the per-shard HNSW indexes."""
+
+    def __init__(self, database_url: Optional[str] = None, storage_type: Optional[str] = None):
+        self.database_url = database_url if database_url is not None else settings.database_url
+        self.storage_type = storage_type or settings.vector_storage_type
+        if self.storage_type not in STORAGE_OPCLASSES:
+            raise ValueError(f"vector_storage_type must be one of {sorted(STORAGE_OPCLASSES)}, got {self.storage_type}")
+        self._last_run: Optional[datetime] = None
+        self._last_report: Dict[str, Any] = {}
+        self._rebuilds = 0
+        self._errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Maintenance needs psycopg2 and a direct database URL."""
+        return PSYCOPG2_AVAILABLE and bool(self.database_url)
+
+    async def run(self) -> Dict[str, Any]:
+        """Retune every shard; at most vector_index_max_rebuilds_per_run indexes are rebuilt."""
+        if not self.enabled:
+            logger.debug("Vector index maintenance skipped (no DATABASE_URL or psycopg2)")
+            return {}
+        try:
+            report = await run_blocking(self._run)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Vector index maintenance failed: {e}")
+            return {}
+        self._last_run = datetime.now(timezone.utc)
+        self._last_report = report
+        if report["rebuilt"] or report["retuned"]:
+            logger.info(f"Vector index maintenance rebuilt shards {report['rebuilt']}, "
+                        f"retuned ef_search for {report['retuned']}")
+        return report
+
+    def _connect(self):
+        conn = psycopg2.connect(self.database_url)
+        conn.autocommit = True
+        return conn
+
+    def _run(self) -> Dict[str, Any]:
+        """Runs in a worker thread."""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT vector_shard, count(*) FROM messages "
+                    "WHERE vector_embedding IS NOT NULL GROUP BY vector_shard"
+                )
+                row_counts = dict(cursor.fetchall())
+                configs = {row["shard"]: row for row in self._fetch_config(cursor)}
+
+                rebuilt, retuned = [], []
+                for shard in range(VECTOR_SHARDS):
+                    rows = row_counts.get(shard, 0)
+                    params = tuned_params(rows)
+                    config = configs.get(shard)
+                    needs_build = (
+                        config is None
+                        or not config["index_valid"]
+                        or (config["m"], config["ef_construction"]) != (params.m, params.ef_construction)
+                    )
+                    if needs_build and len(rebuilt) < settings.vector_index_max_rebuilds_per_run:
+                        self._rebuild(cursor, shard, params)
+                        rebuilt.append(shard)
+                        self._rebuilds += 1
+                    elif config is not None and config["ef_search"] != params.ef_search:
+                        retuned.append(shard)
+
+                    cursor.execute(
+                        "UPDATE vector_index_config SET row_count = %s, ef_search = %s, updated_at = NOW() "
+                        "WHERE shard = %s",
+                        (rows, params.ef_search, shard)
+                    )
+            return {"rows": sum(row_counts.values()), "rebuilt": rebuilt, "retuned": retuned}
+        finally:
+            conn.close()
+
+    def _rebuild(self, cursor, shard: int, params: HnswParams):
+        """Build a replacement index concurrently, then swap it in."""
+        name = index_name(shard)
+        new_name = f"{name}_new"
+        started = time.monotonic()
+        cursor.execute("SET maintenance_work_mem = %s", (settings.vector_index_maintenance_work_mem,))
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}")  # Left over from an interrupted build
+        cursor.execute(
+            f"CREATE INDEX CONCURRENTLY {new_name} ON messages "
+            f"USING hnsw (vector_embedding {STORAGE_OPCLASSES[self.storage_type]}) "
+            f"WITH (m = {int(params.m)}, ef_construction = {int(params.ef_construction)}) "
+            f"WHERE vector_shard = {int(shard)} AND vector_embedding IS NOT NULL"
+        )
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cursor.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+        cursor.execute(
+            "INSERT INTO vector_index_config (shard, index_name, m, ef_construction, ef_search, built_at) "
+            "VALUES (%s, %s, %s, %s, %s, NOW()) "
+            "ON CONFLICT (shard) DO UPDATE SET m = EXCLUDED.m, ef_construction = EXCLUDED.ef_construction, "
+            "built_at = EXCLUDED.built_at",
+            (shard, name, params.m, params.ef_construction, params.ef_search)
+        )
+        logger.info(f"Rebuilt vector index for shard {shard} with {asdict(params)} "
+                    f"in {time.monotonic() - started:.1f}s")
+
+    @staticmethod
+    def _fetch_config(cursor) -> List[Dict[str, Any]]:
+        """Config rows joined with the live index state."""
+        cursor.execute(
+            "SELECT c.shard, c.index_name, c.method, c.m, c.ef_construction, c.ef_search, c.row_count, "
+            "c.built_at, c.updated_at, COALESCE(i.indisvalid, FALSE) AS index_valid, "
+            "pg_relation_size(i.indexrelid) AS index_bytes "
+            "FROM vector_index_config c "
+            "LEFT JOIN pg_class r ON r.relname = c.index_name AND r.relkind = 'i' "
+            "LEFT JOIN pg_index i ON i.indexrelid = r.oid "
+            "ORDER BY c.shard"
+        )
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    async def get_configuration(self) -> List[Dict[str, Any]]:
+        """Active index configuration of every shard."""
+        if not self.enabled:
+            return []
+
+        def fetch():
+            conn = self._connect()
+            try:
+                with conn.cursor() as cursor:
+                    return self._fetch_config(cursor)
+            finally:
+                conn.close()
+
+        rows = await run_blocking(fetch)
+        return [{key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+                for row in rows]
+
+    async def explain(self, user_id: UUID, embedding: Optional[List[float]] = None,
+                      limit: int = 10, threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        EXPLAIN ANALYZE the vector search a user's query would run.
+
+        Uses the user's most recent stored embedding when none is given.
+        """
+        if not self.enabled:
+            raise RuntimeError("Vector index diagnostics need DATABASE_URL and psycopg2")
+        shard = vector_shard(user_id)
+
+        def explain():
+            conn = psycopg2.connect(self.database_url)
+            try:
+                with conn.cursor() as cursor:
+                    query_embedding = embedding
+                    if query_embedding is None:
+                        cursor.execute(
+                            "SELECT vector_embedding::text FROM messages "
+                            "WHERE user_id = %s AND vector_embedding IS NOT NULL "
+                            "ORDER BY message_timestamp DESC LIMIT 1",
+                            (str(user_id),)
+                        )
+                        row = cursor.fetchone()
+                        if row is None:
+                            raise ValueError("User has no embedded messages")
+                        query_embedding = row[0]
+
+                    cursor.execute("SELECT ef_search FROM vector_index_config WHERE shard = %s", (shard,))
+                    row = cursor.fetchone()
+                    ef_search = max(row[0] if row else 40, limit)
+                    cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+                    cursor.execute(
+                        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+                        + SEARCH_SQL.format(shard=int(shard), storage=self.storage_type),
+                        {"embedding": query_embedding if isinstance(query_embedding, str) else to_pgvector(query_embedding),
+                         "user_id": str(user_id),
+                         "limit": limit, "threshold": threshold}
+                    )
+                    return ef_search, cursor.fetchone()[0]
+            finally:
+                conn.rollback()  # Discards the SET LOCAL
+                conn.close()
+
+        ef_search, plan = await run_blocking(explain)
+        return {"user_id": str(user_id), "shard": shard, "index_name": index_name(shard),
+                "ef_search": ef_search, "plan": plan}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get maintenance run information."""
+        return {
+            "enabled": self.enabled,
+            "shards": VECTOR_SHARDS,
+            "storage_type": self.storage_type,
+            "last_run": self._last_run.isoformat() if self._last_run else None,
+            "last_report": self._last_report,
+            "rebuilds": self._rebuilds,
+            "errors": self._errors
+        }
+
+
+# Global vector index maintainer instance
+vector_index_maintainer = VectorIndexMaintainer()
@@ -4,11 +4,11 @@ WhatsApp Business API service for sending and receiving messages.
 import logging
 import json
 from typing import Dict, Any, Optional, List
-import httpx
 from datetime import datetime, timezone
 from src.config.settings import settings
+from src.services.http_clients import get_http_client
 from src.services.whatsapp_token_manager import token_manager
-from src.models.database import Message, MessageType, SourceType
+from src.services.outbound_message_writer import outbound_message_writer
 from src.models.message_types import (
     WhatsAppTextMessage, WhatsAppInteractiveMessage,
     WhatsAppInteractive, WhatsAppInteractiveBody,
@@ -33,30 +33,17 @@ class WhatsAppService:
         self.db_service = db_service
     
     async def _store_outgoing_message(self, user_phone: str, message_content: str, message_type: str = "text"):
-        """Store outgoing messages in the database."""
+        """Queue an outgoing message for batched storage in the database."""
         if not self.db_service:
             return
             
         try:
-            # Get or create user from phone number
-            user, is_new_user = await self.db_service.get_or_create_user(user_phone)
-            
-            # Create outgoing message record
-            outgoing_message = Message(
-                user_id=user.id,
-                message_timestamp=datetime.now(timezone.utc),
-                type=MessageType.NOTE,  # Bot responses are generally notes/responses
-                content=f"🤖 {message_content}",  # Prefix with robot emoji to indicate bot response
-                source_type=SourceType.TEXT,
-                tags=["bot-response"],  # Tag all bot responses
-                metadata={"direction": "outgoing", "sender": "bot"}  # Store direction in metadata
-            )
-            
-            await self.db_service.save_message(outgoing_message)
-            logger.debug(f"Stored outgoing message to {user_phone}")
+            # Persisted in the background so sending never waits on the database
+            outbound_message_writer.enqueue(user_phone, message_content)
+            logger.debug(f"Queued outgoing message to {user_phone} for storage")
             
         except Exception as e:
-            logger.warning(f"Failed to store outgoing message: {e}")
+            logger.warning(f"Failed to queue outgoing message: {e}")
     
     async def _get_headers(self) -> Dict[str, str]:
         """Get headers with a valid access token."""
@@ -84,24 +71,24 @@ class WhatsAppService:
             
             headers = await self._get_headers()
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=headers,
-                    json=payload.dict()
-                )
+            client = get_http_client("graph")
+            response = await client.post(
+                f"{self.base_url}/messages",
+                headers=headers,
+                json=payload.dict()
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"Message sent successfully to {to}")
+                
+                # Store the outgoing message in database
+                await self._store_outgoing_message(to, message)
+                
+                return True
+            else:
+                logger.error(f"Failed to send message: {response.text}")
+                return False
                 
-                if response.status_code == 200:
-                    logger.info(f"Message sent successfully to {to}")
-                    
-                    # Store the outgoing message in database
-                    await self._store_outgoing_message(to, message)
-                    
-                    return True
-                else:
-                    logger.error(f"Failed to send message: {response.text}")
-                    return False
-                    
         except Exception as e:
             logger.error(f"Error sending WhatsApp message: {e}")
             return False
@@ -143,20 +130,20 @@ class WhatsAppService:
             
             headers = await self._get_headers()
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    headers=headers,
-                    json=payload.dict()
-                )
+            client = get_http_client("graph")
+            response = await client.post(
+                f"{self.base_url}/messages",
+                headers=headers,
+                json=payload.dict()
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"Interactive message sent successfully to {to}")
+                return True
+            else:
+                logger.error(f"Failed to send interactive message: {response.text}")
+                return False
                 
-                if response.status_code == 200:
-                    logger.info(f"Interactive message sent successfully to {to}")
-                    return True
-                else:
-                    logger.error(f"Failed to send interactive message: {response.text}")
-                    return False
-                    
         except Exception as e:
             logger.error(f"Error sending WhatsApp interactive message: {e}")
             return False
@@ -170,57 +157,57 @@ class WhatsAppService:
             headers = await self._get_headers()
             
             # First, get the media URL and metadata
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"https://graph.facebook.com/v18.0/{media_id}",
-                    headers=headers
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Failed to get media URL: {response.text}")
-                    msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_URL_ERROR", 
-                                                  success=False, error=f"Status {response.status_code}: {response.text}")
-                    return None
-                
-                media_data = response.json()
-                media_url = media_data.get("url")
-                mime_type = media_data.get("mime_type")
-                file_size = media_data.get("file_size")
-                
-                logger.info(f"Media info - URL: {bool(media_url)}, MIME: {mime_type}, Size: {file_size}")
-                
-                if not media_url:
-                    logger.error("No URL found in media response")
-                    msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_URL_MISSING", 
-                                                  success=False, error="No URL in response")
-                    return None
-                
-                logger.info(f"Got media URL for {media_id}, downloading content...")
+            client = get_http_client("graph")
+            response = await client.get(
+                f"https://graph.facebook.com/v18.0/{media_id}",
+                headers=headers
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Failed to get media URL: {response.text}")
+                msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_URL_ERROR", 
+                                              success=False, error=f"Status {response.status_code}: {response.text}")
+                return None
+            
+            media_data = response.json()
+            media_url = media_data.get("url")
+            mime_type = media_data.get("mime_type")
+            file_size = media_data.get("file_size")
+            
+            logger.info(f"Media info - URL: {bool(media_url)}, MIME: {mime_type}, Size: {file_size}")
+            
+            if not media_url:
+                logger.error("No URL found in media response")
+                msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_URL_MISSING", 
+                                              success=False, error="No URL in response")
+                return None
+            
+            logger.info(f"Got media URL for {media_id}, downloading content...")
+            
+            # Download the media (served from the CDN, not the Graph API)
+            media_response = await get_http_client("media").get(
+                media_url,
+                headers=headers
+            )
+            
+            if media_response.status_code == 200:
+                content_size = len(media_response.content)
+                logger.info(f"Successfully downloaded media {media_id}: {content_size} bytes")
+                msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_DOWNLOAD_SUCCESS", 
+                                              file_info={"size_bytes": content_size})
                 
-                # Download the media
-                media_response = await client.get(
-                    media_url,
-                    headers=headers
-                )
+                return {
+                    "content": media_response.content,
+                    "mime_type": mime_type,
+                    "file_size": file_size,
+                    "media_id": media_id
+                }
+            else:
+                logger.error(f"Failed to download media: {media_response.text}")
+                msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_DOWNLOAD_ERROR", 
+                                              success=False, error=f"Status {media_response.status_code}: {media_response.text}")
+                return None
                 
-                if media_response.status_code == 200:
-                    content_size = len(media_response.content)
-                    logger.info(f"Successfully downloaded media {media_id}: {content_size} bytes")
-                    msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_DOWNLOAD_SUCCESS", 
-                                                  file_info={"size_bytes": content_size})
-                    
-                    return {
-                        "content": media_response.content,
-                        "mime_type": mime_type,
-                        "file_size": file_size,
-                        "media_id": media_id
-                    }
-                else:
-                    logger.error(f"Failed to download media: {media_response.text}")
-                    msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_DOWNLOAD_ERROR", 
-                                                  success=False, error=f"Status {media_response.status_code}: {media_response.text}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"Error downloading WhatsApp media: {e}")
             msg_logger.log_media_processing("download", media_id, "unknown", "WHATSAPP_MEDIA_EXCEPTION", 
@@ -2,11 +2,11 @@
 WhatsApp token management service for handling access token expiration and renewal.
 """
 import logging
-import httpx
 import json
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
 from src.config.settings import settings
+from src.services.http_clients import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -31,34 +31,34 @@ class WhatsAppTokenManager:
                 "access_token": self.current_token  # Can also use app_token
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
+            client = get_http_client("graph")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                token_data = data.get("data", {})
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    token_data = data.get("data", {})
+                if token_data.get("is_valid", False):
+                    # Extract expiration time if available
+                    expires_at = token_data.get("expires_at")
+                    if expires_at:
+                        self.token_expires_at = datetime.fromtimestamp(expires_at)
                     
-                    if token_data.get("is_valid", False):
-                        # Extract expiration time if available
-                        expires_at = token_data.get("expires_at")
-                        if expires_at:
-                            self.token_expires_at = datetime.fromtimestamp(expires_at)
-                        
-                        logger.info(f"Token is valid. Expires at: {self.token_expires_at}")
-                        return {
-                            "valid": True,
-                            "expires_at": self.token_expires_at,
-                            "scopes": token_data.get("scopes", []),
-                            "app_id": token_data.get("app_id"),
-                            "user_id": token_data.get("user_id")
-                        }
-                    else:
-                        logger.error("Token is invalid")
-                        return {"valid": False, "error": "Token is invalid"}
+                    logger.info(f"Token is valid. Expires at: {self.token_expires_at}")
+                    return {
+                        "valid": True,
+                        "expires_at": self.token_expires_at,
+                        "scopes": token_data.get("scopes", []),
+                        "app_id": token_data.get("app_id"),
+                        "user_id": token_data.get("user_id")
+                    }
                 else:
-                    logger.error(f"Failed to validate token: {response.text}")
-                    return {"valid": False, "error": response.text}
-                    
+                    logger.error("Token is invalid")
+                    return {"valid": False, "error": "Token is invalid"}
+            else:
+                logger.error(f"Failed to validate token: {response.text}")
+                return {"valid": False, "error": response.text}
+                
         except Exception as e:
             logger.error(f"Error validating token: {e}")
             return {"valid": False, "error": str(e)}
@@ -101,25 +101,25 @@ class WhatsAppTokenManager:
                 "fb_exchange_token": self.current_token
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
+            client = get_http_client("graph")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                new_token = data.get("access_token")
+                expires_in = data.get("expires_in")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    new_token = data.get("access_token")
-                    expires_in = data.get("expires_in")
-                    
-                    if new_token:
-                        self.current_token = new_token
-                        if expires_in:
-                            self.token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-                        
-                        logger.info(f"Successfully renewed token. New expiration: {self.token_expires_at}")
-                        return new_token
-                else:
-                    logger.error(f"Failed to renew token: {response.text}")
-                    return None
+                if new_token:
+                    self.current_token = new_token
+                    if expires_in:
+                        self.token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
                     
+                    logger.info(f"Successfully renewed token. New expiration: {self.token_expires_at}")
+                    return new_token
+            else:
+                logger.error(f"Failed to renew token: {response.text}")
+                return None
+                
         except Exception as e:
             logger.error(f"Error renewing token: {e}")
             return None
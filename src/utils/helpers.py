@@ -3,7 +3,8 @@ Common helper functions for the Cute WhatsApp Bot.
 """
 import re
 import hashlib
-from datetime import datetime, timedelta, timezone
+import calendar
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from uuid import uuid4
 
@@ -174,6 +175,26 @@ def group_by_date(items: List[Dict[str, Any]], date_field: str = "timestamp") ->
     return groups
 
 
+def next_birthday_occurrence(birthdate: date, on_or_after: date) -> date:
+    """Next anniversary of a birthdate on or after a day (Feb 29 falls on Feb 28 in other years)."""
+    for year in (on_or_after.year, on_or_after.year + 1):
+        day = min(birthdate.day, calendar.monthrange(year, birthdate.month)[1])
+        occurrence = date(year, birthdate.month, day)
+        if occurrence >= on_or_after:
+            return occurrence
+    return occurrence
+
+
+def birthday_reference_date(now: Optional[datetime] = None) -> date:
+    """Earliest calendar day anywhere in the world (UTC yesterday).
+
+    next_occurrence is computed from this day so a birthday is not rolled over
+    to next year while it is still today in a timezone behind UTC.
+    """
+    now = now or datetime.now(timezone.utc)
+    return (now.astimezone(timezone.utc) - timedelta(days=1)).date()
+
+
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format."""
     if size_bytes == 0:
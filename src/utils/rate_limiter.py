@@ -0,0 +1,69 @@
+"""
+Async token-bucket rate limiter.
+Tokens refill continuously at `rate` per second up to `capacity`, so short
+bursts go out immediately while the sustained rate stays under the limit.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket shared by every coroutine that sends under one limit."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self._acquired = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Wait until `tokens` are available and take them.
+
+        Waiters are served in arrival order because the lock is held while
+        sleeping, which keeps the output rate smooth under contention.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+
+        self._acquired += 1
+        if waited:
+            self._throttled += 1
+            self._total_wait += waited
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limiter statistics."""
+        self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "available_tokens": round(self._tokens, 2),
+            "acquired": self._acquired,
+            "throttled": self._throttled,
+            "total_wait_seconds": round(self._total_wait, 3)
+        }
@@ -0,0 +1,73 @@
+"""
+Set of keys that expire in time buckets.
+Keys are grouped into fixed-width buckets by insertion time; expiring old
+keys drops whole buckets, so cleanup costs O(expired keys) instead of a
+scan over every key.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+
+class TimeBucketedSet:
+    """Membership set whose entries are forgotten after `retention_seconds`."""
+
+    def __init__(self, retention_seconds: float, bucket_seconds: float = 60.0):
+        self.retention_seconds = retention_seconds
+        self.bucket_seconds = bucket_seconds
+        self._buckets: "OrderedDict[int, Set[Hashable]]" = OrderedDict()
+        self._bucket_of: Dict[Hashable, int] = {}
+        self.expired = 0
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def add(self, key: Hashable, now: Optional[float] = None):
+        """Add (or refresh) a key."""
+        now = time.time() if now is None else now
+        self.expire(now)
+        bucket = self._bucket(now)
+        previous = self._bucket_of.get(key)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self._buckets[previous].discard(key)
+        self._buckets.setdefault(bucket, set()).add(key)
+        self._bucket_of[key] = bucket
+
+    def discard(self, key: Hashable):
+        """Remove a key if present."""
+        bucket = self._bucket_of.pop(key, None)
+        if bucket is not None:
+            self._buckets[bucket].discard(key)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop buckets older than the retention window. Returns keys removed."""
+        now = time.time() if now is None else now
+        oldest_kept = self._bucket(now - self.retention_seconds)
+        removed = 0
+        # Buckets are created in time order, so expired ones are at the front
+        while self._buckets:
+            bucket = next(iter(self._buckets))
+            if bucket >= oldest_kept:
+                break
+            for key in self._buckets.pop(bucket):
+                del self._bucket_of[key]
+                removed += 1
+        self.expired += removed
+        return removed
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._bucket_of
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get size statistics."""
+        return {
+            "keys": len(self._bucket_of),
+            "buckets": len(self._buckets),
+            "retention_seconds": self.retention_seconds,
+            "expired": self.expired
+        }
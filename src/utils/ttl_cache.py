@@ -0,0 +1,99 @@
+"""
+Bounded in-memory cache with LRU eviction and per-entry expiry.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """O(1) LRU cache where every entry also expires after a TTL."""
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+            ttl_seconds: Default lifetime of an entry
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, refreshing its LRU position. Expired entries count as misses."""
+        entry = self._data.get(key, self._MISSING)
+        if entry is self._MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Insert or replace a value."""
+        now = time.monotonic()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (now + ttl, value)
+        self._data.move_to_end(key)
+        self._evict(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value if it is still live."""
+        entry = self._data.pop(key, self._MISSING)
+        if entry is self._MISSING or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self):
+        """Remove every entry."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float):
+        """Drop expired entries from the old end, then enforce the size bound."""
+        while self._data:
+            oldest_key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[oldest_key]
+            self.expirations += 1
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,65 @@
+"""
+Compact embedding representation helpers.
+Embeddings are held as array('f') (4 bytes per dimension, one object)
+instead of a list of boxed Python floats (~32 bytes per dimension), and
+travel as pgvector text literals with float32 precision instead of JSON
+float64 reprs. Works with both `vector` and `halfvec` columns.
+"""
+import base64
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# In-process embedding type
+Embedding = array
+
+_LITERAL_FORMATS: Dict[int, str] = {}
+
+
+def to_embedding(value: Any) -> Optional[array]:
+    """array('f') from a list, NumPy array, pgvector literal or base64 float32 string; None if empty."""
+    if value is None:
+        return None
+    if isinstance(value, array) and value.typecode == "f":
+        return value
+    if isinstance(value, str):
+        vector = parse_pgvector(value) if value.startswith("[") else np.frombuffer(base64.b64decode(value), dtype=np.float32)
+    else:
+        vector = np.asarray(value, dtype=np.float32)
+    if vector.ndim != 1 or not len(vector):
+        return None
+    return array("f", vector.astype(np.float32, copy=False).tobytes())
+
+
+def parse_pgvector(literal: str) -> np.ndarray:
+    """float32 array from pgvector's text form, e.g. "[0.1,0.2,...]"."""
+    body = literal.strip()[1:-1]
+    if not body:
+        return np.zeros(0, dtype=np.float32)
+    return np.array(body.split(","), dtype=np.float32)
+
+
+def to_pgvector(embedding: Any) -> Optional[str]:
+    """pgvector text literal with float32 precision (7 significant digits)."""
+    if embedding is None:
+        return None
+    values = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+    template = _LITERAL_FORMATS.get(len(values))
+    if template is None:
+        template = _LITERAL_FORMATS[len(values)] = "[" + ",".join(["%.7g"] * len(values)) + "]"
+    return template % tuple(values)
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 scalar quantisation.
+
+    Returns:
+        (codes, scales) with matrix ~= codes * scales[:, None]
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
@@ -0,0 +1,64 @@
+-- Precomputed upcoming-birthday index
+-- Each birthday stores its next anniversary in next_occurrence, so upcoming
+-- birthdays are a range scan instead of a day-of-year computation per row.
+-- The scheduler leader rolls passed anniversaries forward once a day with
+-- refresh_birthday_occurrences(); save_birthday sets the value on insert.
+-- The reference date is UTC yesterday so a birthday isn't rolled over while
+-- it is still today in a timezone behind UTC.
+--
+-- Required: saving birthdays, upcoming-birthday queries and the birthday
+-- digest all use these columns and functions.
+
+BEGIN;
+
+ALTER TABLE birthdays ADD COLUMN IF NOT EXISTS next_occurrence DATE;
+ALTER TABLE birthdays ADD COLUMN IF NOT EXISTS last_notified_on DATE;
+
+-- Next anniversary on or after a day; Feb 29 falls on Feb 28 in other years
+CREATE OR REPLACE FUNCTION next_birthday_occurrence(birthdate date, on_or_after date)
+RETURNS date
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  month_start date;
+  candidate date;
+BEGIN
+  FOR year_offset IN 0..1 LOOP
+    month_start := make_date(EXTRACT(YEAR FROM on_or_after)::int + year_offset, EXTRACT(MONTH FROM birthdate)::int, 1);
+    candidate := month_start + (LEAST(
+      EXTRACT(DAY FROM birthdate)::int,
+      EXTRACT(DAY FROM month_start + INTERVAL '1 month - 1 day')::int
+    ) - 1);
+    IF candidate >= on_or_after THEN
+      RETURN candidate;
+    END IF;
+  END LOOP;
+  RETURN candidate;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_birthday_occurrences(reference_date date)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  updated int;
+BEGIN
+  UPDATE birthdays
+  SET next_occurrence = next_birthday_occurrence(birthdate, reference_date)
+  WHERE next_occurrence IS NULL OR next_occurrence < reference_date;
+
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$;
+
+-- Backfill existing rows
+SELECT refresh_birthday_occurrences((NOW() AT TIME ZONE 'UTC')::date - 1);
+
+-- Per-user upcoming birthdays and the daily digest window
+CREATE INDEX IF NOT EXISTS idx_birthdays_user_next_occurrence ON birthdays (user_id, next_occurrence);
+CREATE INDEX IF NOT EXISTS idx_birthdays_next_occurrence ON birthdays (next_occurrence);
+
+COMMIT;
@@ -0,0 +1,99 @@
+-- Hybrid message search (full-text + trigram side)
+-- src/services/hybrid_search.py runs this text search and the vector search
+-- concurrently and fuses the two rankings with reciprocal-rank fusion.
+-- Substring matching uses a trigram index (word_similarity via <%) instead
+-- of ILIKE '%...%', which no index can serve and forced a sequential scan of
+-- the user's rows. smart_search_messages gets the same change.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_messages_content_fts ON messages USING gin (to_tsvector('english', content));
+CREATE INDEX IF NOT EXISTS idx_messages_content_trgm ON messages USING gin (content gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_messages_user_timestamp ON messages (user_id, message_timestamp DESC);
+
+CREATE OR REPLACE FUNCTION search_messages_text(
+  user_id uuid,
+  search_query text,
+  match_count int DEFAULT 50,
+  filter_tags text[] DEFAULT NULL,
+  filter_type text DEFAULT NULL,
+  date_from timestamptz DEFAULT NULL,
+  date_to timestamptz DEFAULT NULL
+)
+RETURNS TABLE (
+  id uuid,
+  content text,
+  tags text[],
+  type text,
+  message_timestamp timestamptz,
+  rank float
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    m.id,
+    m.content,
+    m.tags,
+    m.type,
+    m.message_timestamp,
+    (ts_rank_cd(to_tsvector('english', m.content), plainto_tsquery('english', search_query))
+      + word_similarity(search_query, m.content))::float AS rank
+  FROM messages m
+  WHERE m.user_id = search_messages_text.user_id
+    AND (
+      to_tsvector('english', m.content) @@ plainto_tsquery('english', search_query)
+      OR search_query <% m.content
+    )
+    AND (filter_tags IS NULL OR m.tags @> filter_tags)
+    AND (filter_type IS NULL OR m.type = filter_type)
+    AND (date_from IS NULL OR m.message_timestamp >= date_from)
+    AND (date_to IS NULL OR m.message_timestamp < date_to)
+  ORDER BY rank DESC, m.message_timestamp DESC
+  LIMIT match_count;
+$$;
+
+CREATE OR REPLACE FUNCTION smart_search_messages(
+  user_id uuid,
+  search_query text,
+  query_embedding vector(1536) DEFAULT NULL,
+  match_count int DEFAULT 10
+)
+RETURNS TABLE (
+  id uuid,
+  content text,
+  tags text[],
+  message_timestamp timestamptz,
+  search_score float,
+  search_type text
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF query_embedding IS NOT NULL THEN
+    RETURN QUERY
+    SELECT
+      m.id,
+      m.content,
+      m.tags,
+      m.message_timestamp,
+      1 - (m.vector_embedding <=> query_embedding) as search_score,
+      'vector'::text as search_type
+    FROM messages m
+    WHERE m.user_id = smart_search_messages.user_id
+      AND m.vector_embedding IS NOT NULL
+    ORDER BY m.vector_embedding <=> query_embedding
+    LIMIT match_count;
+  ELSE
+    RETURN QUERY
+    SELECT t.id, t.content, t.tags, t.message_timestamp, t.rank, 'text'::text
+    FROM search_messages_text(smart_search_messages.user_id, search_query, match_count) t;
+  END IF;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_messages_text(uuid, text, int, text[], text, timestamptz, timestamptz) TO authenticated;
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- Index files by content hash so repeated media can reuse earlier uploads and AI results
+-- Used by SupabaseService.find_file_by_content_hash (user_id + metadata->>'content_hash')
+
+CREATE INDEX IF NOT EXISTS idx_files_user_content_hash
+ON files (user_id, (metadata->>'content_hash'))
+WHERE deleted_at IS NULL;
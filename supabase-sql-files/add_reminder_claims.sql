@@ -0,0 +1,17 @@
+-- Persistent send claims for reminders
+-- A scheduler instance claims due reminders with a conditional UPDATE before
+-- sending them, so several instances (or a restarted one) never send the same
+-- occurrence twice. Claims older than reminder_claim_timeout_seconds are
+-- treated as abandoned and can be claimed again.
+
+BEGIN;
+
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+
+-- Pending reminders by trigger time (timer queue preload and claims)
+CREATE INDEX IF NOT EXISTS idx_reminders_pending_trigger
+ON reminders (trigger_time)
+WHERE is_active = TRUE AND completed_at IS NULL;
+
+COMMIT;
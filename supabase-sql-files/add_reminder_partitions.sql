@@ -0,0 +1,16 @@
+-- Reminder partitions for horizontally scaled scheduler workers
+-- Each scheduler instance (run_scheduler.py) owns a share of 256 user buckets
+-- through Postgres advisory locks and only loads reminders in its buckets.
+-- The bucket is the first byte of md5(user_id), computed the same way in
+-- src/services/scheduler_coordinator.py.
+
+BEGIN;
+
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS user_bucket SMALLINT
+GENERATED ALWAYS AS (get_byte(decode(md5(user_id::text), 'hex'), 0)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_reminders_bucket_pending
+ON reminders (user_bucket, trigger_time)
+WHERE is_active = TRUE AND completed_at IS NULL;
+
+COMMIT;
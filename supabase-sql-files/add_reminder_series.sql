@@ -0,0 +1,60 @@
+-- Recurring reminder series
+-- Every occurrence of a recurring reminder carries the series_id of the first
+-- occurrence, so finding broken chains becomes an indexed anti-join instead of
+-- one query per completed reminder.
+
+BEGIN;
+
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS repeat_until TIMESTAMP WITH TIME ZONE;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS series_id UUID;
+
+-- Backfill: chains used to be identified by (user_id, title, repeat_type);
+-- the earliest reminder of each group becomes the series
+UPDATE reminders r
+SET series_id = s.first_id
+FROM (
+    SELECT DISTINCT ON (user_id, title, repeat_type)
+        user_id, title, repeat_type, id AS first_id
+    FROM reminders
+    WHERE repeat_type <> 'none'
+    ORDER BY user_id, title, repeat_type, created_at, id
+) s
+WHERE r.user_id = s.user_id
+  AND r.title = s.title
+  AND r.repeat_type = s.repeat_type
+  AND r.series_id IS NULL;
+
+-- Active occurrence lookup for the anti-join
+CREATE INDEX IF NOT EXISTS idx_reminders_series_active
+ON reminders (series_id)
+WHERE is_active = TRUE;
+
+-- Completed recurring occurrences in the lookback window
+CREATE INDEX IF NOT EXISTS idx_reminders_recurring_completed
+ON reminders (completed_at, series_id, trigger_time DESC)
+WHERE is_active = FALSE AND repeat_type <> 'none';
+
+-- Latest completed occurrence of every series that has no active occurrence
+CREATE OR REPLACE FUNCTION get_broken_recurring_chains(hours_back INT DEFAULT 768)
+RETURNS SETOF reminders
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT ON (r.series_id) r.*
+    FROM reminders r
+    WHERE r.is_active = FALSE
+      AND r.repeat_type <> 'none'
+      AND r.series_id IS NOT NULL
+      AND r.completed_at >= NOW() - make_interval(hours => hours_back)
+      AND NOT EXISTS (
+          SELECT 1
+          FROM reminders a
+          WHERE a.series_id = r.series_id
+            AND a.is_active = TRUE
+      )
+    ORDER BY r.series_id, r.trigger_time DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_broken_recurring_chains(INT) TO service_role;
+
+COMMIT;
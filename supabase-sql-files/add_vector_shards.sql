@@ -0,0 +1,97 @@
+-- Sharded HNSW vector indexes for message search
+-- Replaces the single ivfflat index (lists = 100, never retrained) with one
+-- partial HNSW index per user-hash shard. A search only walks the graph of
+-- its user's shard (1/16 of the table), and HNSW needs no retraining as the
+-- table grows. vector_shard is the top 4 bits of the scheduler's user_bucket
+-- (first byte of md5(user_id)), computed the same way in
+-- src/services/vector_index_maintenance.py.
+--
+-- vector_index_config records each shard index's build parameters and the
+-- ef_search used at query time; the scheduler leader retunes them from row
+-- counts (VectorIndexMaintainer), rebuilding with CREATE INDEX CONCURRENTLY.
+--
+-- Adding the generated column rewrites the messages table; run off-peak.
+
+BEGIN;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS vector_shard SMALLINT
+GENERATED ALWAYS AS ((get_byte(decode(md5(user_id::text), 'hex'), 0) / 16)::smallint) STORED;
+
+CREATE TABLE IF NOT EXISTS vector_index_config (
+  shard SMALLINT PRIMARY KEY,
+  index_name TEXT NOT NULL,
+  method TEXT NOT NULL DEFAULT 'hnsw',
+  m INT NOT NULL,
+  ef_construction INT NOT NULL,
+  ef_search INT NOT NULL DEFAULT 40,
+  row_count BIGINT NOT NULL DEFAULT 0,
+  built_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+DROP INDEX IF EXISTS idx_messages_vector;
+DROP INDEX IF EXISTS messages_vector_embedding_idx;
+
+DO $$
+BEGIN
+  FOR shard_number IN 0..15 LOOP
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON messages USING hnsw (vector_embedding vector_cosine_ops) '
+      'WITH (m = 16, ef_construction = 64) WHERE vector_shard = %s AND vector_embedding IS NOT NULL',
+      'idx_messages_vector_s' || shard_number, shard_number
+    );
+    INSERT INTO vector_index_config (shard, index_name, m, ef_construction, ef_search, row_count, built_at)
+    VALUES (
+      shard_number, 'idx_messages_vector_s' || shard_number, 16, 64, 40,
+      (SELECT count(*) FROM messages WHERE vector_shard = shard_number AND vector_embedding IS NOT NULL),
+      NOW()
+    )
+    ON CONFLICT (shard) DO NOTHING;
+  END LOOP;
+END;
+$$;
+
+-- Same signature as before. The shard is inlined as a literal so the planner
+-- can match the partial index; ef_search comes from vector_index_config.
+CREATE OR REPLACE FUNCTION search_messages_by_vector(
+  user_id UUID,
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 10
+)
+RETURNS TABLE(
+  id UUID,
+  content TEXT,
+  tags TEXT[],
+  message_timestamp TIMESTAMP WITH TIME ZONE,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_shard SMALLINT := (get_byte(decode(md5(search_messages_by_vector.user_id::text), 'hex'), 0) / 16)::smallint;
+  v_ef_search INT;
+BEGIN
+  SELECT c.ef_search INTO v_ef_search FROM vector_index_config c WHERE c.shard = v_shard;
+  PERFORM set_config('hnsw.ef_search', GREATEST(COALESCE(v_ef_search, 40), match_count)::text, true);
+  -- pgvector 0.8+: keep walking the graph until enough rows pass the user filter
+  BEGIN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  EXCEPTION WHEN OTHERS THEN
+    NULL;
+  END;
+
+  RETURN QUERY EXECUTE format(
+    'SELECT s.id, s.content, s.tags, s.message_timestamp, s.similarity FROM ('
+    '  SELECT m.id, m.content, m.tags, m.message_timestamp, (1 - (m.vector_embedding <=> $1))::float AS similarity'
+    '  FROM messages m'
+    '  WHERE m.vector_shard = %s AND m.user_id = $2 AND m.vector_embedding IS NOT NULL'
+    '  ORDER BY m.vector_embedding <=> $1'
+    '  LIMIT $3'
+    ') s WHERE s.similarity > $4 ORDER BY s.similarity DESC',
+    v_shard
+  ) USING query_embedding, search_messages_by_vector.user_id, match_count, match_threshold;
+END;
+$$;
+
+COMMIT;
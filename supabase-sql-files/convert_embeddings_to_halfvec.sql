@@ -0,0 +1,122 @@
+-- Store message embeddings as halfvec (pgvector 0.7+)
+-- Halves the size of messages.vector_embedding and of the shard HNSW
+-- indexes (6 KB -> 3 KB per 1536-dimension embedding), so more of the
+-- graphs stay in shared buffers. float16 rounding (~1e-3 relative) doesn't
+-- change cosine rankings in practice.
+--
+-- Run after add_vector_shards.sql, then set VECTOR_STORAGE_TYPE=halfvec so
+-- VectorIndexMaintainer rebuilds shards with halfvec_cosine_ops. The search
+-- functions keep their vector(1536) parameters and cast the query, so
+-- clients don't change.
+--
+-- The column rewrite locks messages and the indexes are rebuilt; run off-peak.
+
+BEGIN;
+
+DO $$
+BEGIN
+  FOR shard_number IN 0..15 LOOP
+    EXECUTE format('DROP INDEX IF EXISTS %I', 'idx_messages_vector_s' || shard_number);
+    EXECUTE format('DROP INDEX IF EXISTS %I', 'idx_messages_vector_s' || shard_number || '_new');
+  END LOOP;
+END;
+$$;
+
+ALTER TABLE messages
+  ALTER COLUMN vector_embedding TYPE halfvec(1536) USING vector_embedding::halfvec(1536);
+
+DO $$
+DECLARE
+  v_config RECORD;
+BEGIN
+  FOR v_config IN SELECT shard, index_name, m, ef_construction FROM vector_index_config ORDER BY shard LOOP
+    EXECUTE format(
+      'CREATE INDEX %I ON messages USING hnsw (vector_embedding halfvec_cosine_ops) '
+      'WITH (m = %s, ef_construction = %s) WHERE vector_shard = %s AND vector_embedding IS NOT NULL',
+      v_config.index_name, v_config.m, v_config.ef_construction, v_config.shard
+    );
+  END LOOP;
+  UPDATE vector_index_config SET built_at = NOW(), updated_at = NOW();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_messages_by_vector(
+  user_id UUID,
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 10
+)
+RETURNS TABLE(
+  id UUID,
+  content TEXT,
+  tags TEXT[],
+  message_timestamp TIMESTAMP WITH TIME ZONE,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_shard SMALLINT := (get_byte(decode(md5(search_messages_by_vector.user_id::text), 'hex'), 0) / 16)::smallint;
+  v_ef_search INT;
+BEGIN
+  SELECT c.ef_search INTO v_ef_search FROM vector_index_config c WHERE c.shard = v_shard;
+  PERFORM set_config('hnsw.ef_search', GREATEST(COALESCE(v_ef_search, 40), match_count)::text, true);
+  BEGIN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  EXCEPTION WHEN OTHERS THEN
+    NULL;
+  END;
+
+  RETURN QUERY EXECUTE format(
+    'SELECT s.id, s.content, s.tags, s.message_timestamp, s.similarity FROM ('
+    '  SELECT m.id, m.content, m.tags, m.message_timestamp, (1 - (m.vector_embedding <=> $1))::float AS similarity'
+    '  FROM messages m'
+    '  WHERE m.vector_shard = %s AND m.user_id = $2 AND m.vector_embedding IS NOT NULL'
+    '  ORDER BY m.vector_embedding <=> $1'
+    '  LIMIT $3'
+    ') s WHERE s.similarity > $4 ORDER BY s.similarity DESC',
+    v_shard
+  ) USING query_embedding::halfvec(1536), search_messages_by_vector.user_id, match_count, match_threshold;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION smart_search_messages(
+  user_id uuid,
+  search_query text,
+  query_embedding vector(1536) DEFAULT NULL,
+  match_count int DEFAULT 10
+)
+RETURNS TABLE (
+  id uuid,
+  content text,
+  tags text[],
+  message_timestamp timestamptz,
+  search_score float,
+  search_type text
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF query_embedding IS NOT NULL THEN
+    RETURN QUERY
+    SELECT
+      m.id,
+      m.content,
+      m.tags,
+      m.message_timestamp,
+      (1 - (m.vector_embedding <=> query_embedding::halfvec(1536)))::float as search_score,
+      'vector'::text as search_type
+    FROM messages m
+    WHERE m.user_id = smart_search_messages.user_id
+      AND m.vector_embedding IS NOT NULL
+    ORDER BY m.vector_embedding <=> query_embedding::halfvec(1536)
+    LIMIT match_count;
+  ELSE
+    RETURN QUERY
+    SELECT t.id, t.content, t.tags, t.message_timestamp, t.rank, 'text'::text
+    FROM search_messages_text(smart_search_messages.user_id, search_query, match_count) t;
+  END IF;
+END;
+$$;
+
+COMMIT;
@@ -43,10 +43,15 @@ CREATE TABLE IF NOT EXISTS reminders (
     trigger_time TIMESTAMP WITH TIME ZONE NOT NULL,
     repeat_type TEXT DEFAULT 'none' CHECK (repeat_type IN ('none', 'daily', 'weekly', 'monthly', 'yearly')),
     repeat_interval INTEGER DEFAULT 1,
+    repeat_until TIMESTAMP WITH TIME ZONE,
+    series_id UUID, -- First occurrence of a recurring reminder (add_reminder_series.sql)
     tags TEXT[] DEFAULT '{}',
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    completed_at TIMESTAMP WITH TIME ZONE
+    completed_at TIMESTAMP WITH TIME ZONE,
+    claimed_at TIMESTAMP WITH TIME ZONE, -- Send claims (add_reminder_claims.sql)
+    claimed_by TEXT,
+    user_bucket SMALLINT GENERATED ALWAYS AS (get_byte(decode(md5(user_id::text), 'hex'), 0)) STORED -- Scheduler partition (add_reminder_partitions.sql)
 );
 
 -- Birthdays table
@@ -57,6 +62,8 @@ CREATE TABLE IF NOT EXISTS birthdays (
     birthdate DATE NOT NULL, -- Year can be 1900 if unknown
     tags TEXT[] DEFAULT '{}',
     notification_settings JSONB DEFAULT '{"days_before": [1, 7], "enabled": true}',
+    next_occurrence DATE, -- Next anniversary (add_birthday_occurrences.sql)
+    last_notified_on DATE, -- Last digest that included this birthday
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -0,0 +1,147 @@
+"""
+Benchmark: broken recurring-chain detection, per-reminder lookups vs. one anti-join.
+
+Builds a synthetic reminders table (default 100k rows) in an in-memory SQLite
+database with the same columns and indexes as Postgres:
+
+- "n+1" is the old get_missed_recurring_reminders: one SELECT for completed
+  recurring reminders in the lookback window, then one SELECT per reminder to
+  look for an active occurrence by (user_id, title, repeat_type).
+- "anti-join" is get_broken_recurring_chains: a single NOT EXISTS query on
+  the indexed series_id that returns only the latest occurrence of each
+  broken series.
+
+Against Supabase every query is also an HTTP round-trip, so the estimated
+wall time adds --latency-ms per query on top of the measured query time.
+
+Usage:
+    python tests/benchmark_recurring_chain_recovery.py [--reminders 100000] [--broken-ratio 0.02] [--latency-ms 20]
+"""
+import argparse
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+REPEAT_TYPES = ["daily", "weekly", "monthly"]
+STEP = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=30)}
+
+
+def build_dataset(conn: sqlite3.Connection, reminders: int, broken_ratio: float, seed: int) -> int:
+    """Create recurring series with completed history; a fraction lose their active occurrence."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    conn.execute("""
+        CREATE TABLE reminders (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            trigger_time TEXT NOT NULL,
+            repeat_type TEXT NOT NULL,
+            is_active INTEGER NOT NULL,
+            completed_at TEXT,
+            series_id TEXT
+        )
+    """)
+    # Indexes the old code relied on (database_schema.sql) ...
+    conn.execute("CREATE INDEX idx_reminders_user_id ON reminders(user_id)")
+    conn.execute("CREATE INDEX idx_reminders_active ON reminders(is_active)")
+    # ... and the ones added by add_reminder_series.sql
+    conn.execute("CREATE INDEX idx_reminders_series_active ON reminders(series_id) WHERE is_active = 1")
+    conn.execute("""
+        CREATE INDEX idx_reminders_recurring_completed ON reminders(completed_at, series_id, trigger_time DESC)
+        WHERE is_active = 0 AND repeat_type <> 'none'
+    """)
+
+    users = [str(uuid.uuid4()) for _ in range(max(reminders // 200, 1))]
+    rows = []
+    broken = 0
+    while len(rows) < reminders:
+        user_id = rng.choice(users)
+        repeat_type = rng.choice(REPEAT_TYPES)
+        series_id = str(uuid.uuid4())
+        title = f"Reminder {series_id[:8]}"
+        history = rng.randint(5, 60)
+        first = now - STEP[repeat_type] * history
+        for i in range(history):
+            trigger = first + STEP[repeat_type] * i
+            rows.append((str(uuid.uuid4()), user_id, title, trigger.isoformat(), repeat_type, 0,
+                         (trigger + timedelta(seconds=5)).isoformat(), series_id))
+        if rng.random() < broken_ratio:
+            broken += 1
+        else:
+            trigger = first + STEP[repeat_type] * history
+            rows.append((str(uuid.uuid4()), user_id, title, trigger.isoformat(), repeat_type, 1, None, series_id))
+
+    conn.executemany("INSERT INTO reminders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("ANALYZE")
+    return broken
+
+
+def detect_n_plus_one(conn: sqlite3.Connection, cutoff: str):
+    completed = conn.execute("""
+        SELECT id, user_id, title, repeat_type FROM reminders
+        WHERE is_active = 0 AND repeat_type <> 'none' AND completed_at >= ?
+    """, (cutoff,)).fetchall()
+    queries = 1
+    broken = set()
+    for _, user_id, title, repeat_type in completed:
+        queries += 1
+        active = conn.execute("""
+            SELECT id FROM reminders
+            WHERE user_id = ? AND title = ? AND is_active = 1 AND repeat_type = ?
+        """, (user_id, title, repeat_type)).fetchall()
+        if not active:
+            broken.add((user_id, title, repeat_type))
+    return len(broken), queries
+
+
+def detect_anti_join(conn: sqlite3.Connection, cutoff: str):
+    # SQLite has no DISTINCT ON; GROUP BY with MAX picks the latest occurrence per series
+    rows = conn.execute("""
+        SELECT r.series_id, MAX(r.trigger_time)
+        FROM reminders r
+        WHERE r.is_active = 0
+          AND r.repeat_type <> 'none'
+          AND r.series_id IS NOT NULL
+          AND r.completed_at >= ?
+          AND NOT EXISTS (
+              SELECT 1 FROM reminders a
+              WHERE a.series_id = r.series_id AND a.is_active = 1
+          )
+        GROUP BY r.series_id
+    """, (cutoff,)).fetchall()
+    return len(rows), 1
+
+
+def measure(name: str, func, conn: sqlite3.Connection, cutoff: str, latency_ms: float):
+    started = time.perf_counter()
+    found, queries = func(conn, cutoff)
+    elapsed = time.perf_counter() - started
+    estimated = elapsed + queries * latency_ms / 1000
+    print(f"{name:<10} {found:7d} broken  {queries:8d} queries  {elapsed * 1000:9.1f}ms local  "
+          f"~{estimated:8.2f}s with {latency_ms:.0f}ms round-trips")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100_000, help="Rows in the synthetic reminders table")
+    parser.add_argument("--broken-ratio", type=float, default=0.02, help="Fraction of series without an active occurrence")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated PostgREST round-trip per query")
+    parser.add_argument("--hours-back", type=int, default=768, help="Lookback window (default 32 days)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    broken = build_dataset(conn, args.reminders, args.broken_ratio, args.seed)
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=args.hours_back)).isoformat()
+    total = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+    print(f"{total} reminders, {broken} broken series, lookback {args.hours_back}h\n")
+
+    measure("n+1", detect_n_plus_one, conn, cutoff, args.latency_ms)
+    measure("anti-join", detect_anti_join, conn, cutoff, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
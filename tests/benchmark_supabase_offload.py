@@ -0,0 +1,75 @@
+"""
+Benchmark: blocking supabase-py calls vs. thread-pool offload.
+
+Simulates N concurrent webhook requests that each make a few database
+round-trips. The "blocking" run calls .execute() directly on the event loop,
+the way SupabaseService used to; the "offloaded" run goes through
+db_manager.run_query(). Query latency is simulated with time.sleep so the
+benchmark needs no Supabase credentials.
+
+Usage:
+    python tests/benchmark_supabase_offload.py [--requests 200] [--queries 4] [--latency-ms 40]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.database import DatabaseManager  # noqa: E402
+
+
+class SimulatedQuery:
+    """Stands in for a supabase-py query builder with a fixed round-trip time."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    def execute(self):
+        time.sleep(self.latency_seconds)
+        return {"data": []}
+
+
+async def blocking_request(queries: int, latency: float):
+    for _ in range(queries):
+        SimulatedQuery(latency).execute()
+
+
+async def offloaded_request(manager: DatabaseManager, queries: int, latency: float):
+    for _ in range(queries):
+        await manager.run_query(SimulatedQuery(latency))
+
+
+async def measure(name: str, coros) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*coros)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<12} {elapsed:8.2f}s  {len(coros) / elapsed:8.1f} req/s")
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Concurrent requests")
+    parser.add_argument("--queries", type=int, default=4, help="Database round-trips per request")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Simulated round-trip latency")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    manager = DatabaseManager()
+    print(f"{args.requests} requests x {args.queries} queries @ {args.latency_ms:.0f}ms, "
+          f"pool size {manager.executor._max_workers}\n")
+
+    blocking = await measure("blocking", [blocking_request(args.queries, latency) for _ in range(args.requests)])
+    offloaded = await measure("offloaded", [offloaded_request(manager, args.queries, latency) for _ in range(args.requests)])
+
+    print(f"\nspeedup: {blocking / offloaded:.1f}x")
+    print(f"offload stats: {manager.get_offload_stats()}")
+    manager.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
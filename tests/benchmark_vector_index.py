@@ -0,0 +1,143 @@
+"""
+Benchmark: per-user in-memory vector index vs. the shared ivfflat RPC path.
+
+Builds a synthetic messages table of --users users with --notes embedded
+notes each (every note mixes two of the user's topics, so neighbourhoods
+overlap the way real notes do):
+
+- "ivfflat" models search_messages_by_vector on the shared index: k-means
+  with lists=100 over every user's vectors, probe 1 list (the pgvector
+  default), then filter by user_id and the similarity threshold - so the
+  probed list mostly holds other users' vectors. Each query also pays one
+  --latency-ms round-trip.
+- "index" is VectorIndex: one matrix-vector product over the user's own
+  unit vectors with top-k selection.
+
+Recall is measured against an exact search of the user's vectors.
+
+Usage:
+    python tests/benchmark_vector_index.py [--users 20] [--notes 2000] [--queries 200] [--latency-ms 30]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.services.vector_index import VectorIndex  # noqa: E402
+
+
+def unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.linalg.norm(rows, axis=-1, keepdims=True)
+
+
+def build_corpus(rng, users: int, notes: int, dims: int, topics: int, spread: float):
+    """Per-user notes that mix two of the user's topics, plus noise."""
+    corpus = {}
+    for _ in range(users):
+        centers = unit(rng.standard_normal((topics, dims), dtype=np.float32))
+        first, second = rng.integers(0, topics, notes), rng.integers(0, topics, notes)
+        weight = rng.uniform(0.5, 1.0, (notes, 1)).astype(np.float32)
+        mixed = weight * centers[first] + (1 - weight) * centers[second]
+        vectors = unit(mixed + spread * rng.standard_normal((notes, dims), dtype=np.float32))
+        corpus[uuid4()] = vectors.astype(np.float32)
+    return corpus
+
+
+def kmeans(rng, vectors: np.ndarray, lists: int, iterations: int = 5) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for i in range(lists):
+            members = vectors[assignment == i]
+            if len(members):
+                centroids[i] = unit(members.mean(axis=0))
+    return centroids
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int, threshold: float) -> set:
+    scores = vectors @ query
+    order = np.argsort(scores)[::-1][:k]
+    return {int(i) for i in order if scores[i] > threshold}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Users in the messages table")
+    parser.add_argument("--notes", type=int, default=2000, help="Embedded notes per user")
+    parser.add_argument("--dims", type=int, default=1536, help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Searches to run")
+    parser.add_argument("--limit", type=int, default=10, help="Results per search")
+    parser.add_argument("--threshold", type=float, default=0.7, help="Similarity threshold")
+    parser.add_argument("--spread", type=float, default=0.015, help="Per-dimension noise around a note's topic")
+    parser.add_argument("--lists", type=int, default=100, help="ivfflat lists")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Simulated RPC round-trip latency")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    corpus = build_corpus(rng, args.users, args.notes, args.dims, topics=8, spread=args.spread)
+    user_ids = list(corpus)
+    print(f"{args.users} users x {args.notes} notes, {args.dims} dims, {args.queries} queries\n")
+
+    # Shared ivfflat index over the whole table
+    all_vectors = np.concatenate([corpus[user_id] for user_id in user_ids])
+    owners = np.repeat(np.arange(len(user_ids)), args.notes)
+    rows = np.tile(np.arange(args.notes), len(user_ids))
+    centroids = kmeans(rng, all_vectors, args.lists)
+    lists = np.argmax(all_vectors @ centroids.T, axis=1)
+
+    # Per-user index, loaded from the same rows
+    index = VectorIndex(max_users=args.users, max_vectors=args.users * args.notes,
+                        ttl_seconds=3600, dimensions=args.dims)
+
+    async def loader(user_id):
+        return [{"id": str(i), "content": "", "tags": [], "message_timestamp": None, "vector_embedding": vector}
+                for i, vector in enumerate(corpus[user_id])]
+
+    for user_id in user_ids:
+        await index.search(user_id, corpus[user_id][0], 1, args.threshold, loader)
+
+    queries = []
+    for _ in range(args.queries):
+        user = int(rng.integers(0, len(user_ids)))
+        base = corpus[user_ids[user]][int(rng.integers(0, args.notes))]
+        queries.append((user, unit(base + args.spread * rng.standard_normal(args.dims, dtype=np.float32))))
+
+    ivf_recall, ivf_seconds = [], 0.0
+    index_recall, index_seconds = [], 0.0
+    for user, query in queries:
+        expected = exact_top_k(corpus[user_ids[user]], query, args.limit, args.threshold)
+
+        started = time.perf_counter()
+        probe = int(np.argmax(centroids @ query))
+        candidates = np.flatnonzero(lists == probe)
+        candidates = candidates[owners[candidates] == user]
+        scores = all_vectors[candidates] @ query
+        keep = candidates[scores > args.threshold]
+        keep = keep[np.argsort(all_vectors[keep] @ query)[::-1][:args.limit]]
+        ivf_seconds += time.perf_counter() - started
+        found = {int(rows[i]) for i in keep}
+        ivf_recall.append(len(found & expected) / len(expected) if expected else 1.0)
+
+        started = time.perf_counter()
+        results = await index.search(user_ids[user], query, args.limit, args.threshold, loader)
+        index_seconds += time.perf_counter() - started
+        found = {int(result["id"]) for result in results}
+        index_recall.append(len(found & expected) / len(expected) if expected else 1.0)
+
+    latency = args.latency_ms / 1000
+    print(f"{'':<9} {'ms/query':>9} {'recall@' + str(args.limit):>10}")
+    print(f"{'ivfflat':<9} {(ivf_seconds / args.queries + latency) * 1000:9.2f} {np.mean(ivf_recall):10.3f}"
+          f"   (incl. {args.latency_ms:.0f}ms round-trip)")
+    print(f"{'index':<9} {index_seconds / args.queries * 1000:9.2f} {np.mean(index_recall):10.3f}")
+    print(f"\nindex stats: {index.get_status()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
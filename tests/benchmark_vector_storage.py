@@ -0,0 +1,144 @@
+"""
+Benchmark: compact embedding storage and quantised vector search.
+
+Reports, for --count embeddings of --dims dimensions:
+
+- memory: heap bytes of List[float] (what Message held before), array('f'),
+  and the float16 / int8 matrices of VectorIndex
+- wire: payload bytes and encode/decode throughput of JSON float lists,
+  pgvector text literals (to_pgvector / parse_pgvector) and base64 float32
+  (the OpenAI encoding_format="base64" response)
+- recall: recall@limit of VectorIndex at each precision against an exact
+  float64 search of the same user's vectors; int8 is measured with and
+  without re-ranking against the exact vectors
+
+Usage:
+    python tests/benchmark_vector_storage.py [--count 2000] [--dims 1536] [--queries 200]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.services.vector_index import VectorIndex  # noqa: E402
+from src.utils.vectors import parse_pgvector, to_embedding, to_pgvector  # noqa: E402
+
+
+def unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.linalg.norm(rows, axis=-1, keepdims=True)
+
+
+def list_bytes(values: list) -> int:
+    """Heap size of a list of floats, including the float objects."""
+    return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+
+def timed(function, items, repeat: int = 1) -> float:
+    """Items per second."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(item)
+    return len(items) * repeat / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="Embedded notes of the benchmark user")
+    parser.add_argument("--dims", type=int, default=1536, help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Searches to run")
+    parser.add_argument("--limit", type=int, default=10, help="Results per search")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Similarity threshold")
+    parser.add_argument("--spread", type=float, default=0.02, help="Per-dimension noise around a note's topic")
+    parser.add_argument("--wire-samples", type=int, default=200, help="Embeddings used for the wire benchmark")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    topics = unit(rng.standard_normal((16, args.dims)))
+    first, second = rng.integers(0, 16, args.count), rng.integers(0, 16, args.count)
+    weight = rng.uniform(0.5, 1.0, (args.count, 1))
+    vectors = unit(weight * topics[first] + (1 - weight) * topics[second]
+                   + args.spread * rng.standard_normal((args.count, args.dims))).astype(np.float32)
+    print(f"{args.count} embeddings x {args.dims} dims\n")
+
+    # Memory
+    sample = vectors[0]
+    per_list = list_bytes(sample.tolist())
+    per_array = sys.getsizeof(to_embedding(sample))
+    print(f"{'memory':<22} {'bytes/vector':>13} {'total MB':>10}")
+    for name, size in [("List[float]", per_list), ("array('f')", per_array),
+                       ("matrix float32", args.dims * 4), ("matrix float16", args.dims * 2),
+                       ("matrix int8 + scale", args.dims + 4)]:
+        print(f"{name:<22} {size:13,d} {size * args.count / 1_048_576:10.1f}")
+
+    # Wire formats
+    wire = vectors[:args.wire_samples]
+    as_lists = [row.tolist() for row in wire]
+    json_payloads = [json.dumps(row) for row in as_lists]
+    literals = [to_pgvector(row) for row in wire]
+    base64_payloads = [base64.b64encode(row.tobytes()).decode("ascii") for row in wire]
+    print(f"\n{'wire':<22} {'bytes/vector':>13} {'encode/s':>10} {'decode/s':>10}")
+    print(f"{'JSON list':<22} {np.mean([len(p) for p in json_payloads]):13,.0f} "
+          f"{timed(json.dumps, as_lists):10,.0f} {timed(json.loads, json_payloads):10,.0f}")
+    print(f"{'pgvector literal':<22} {np.mean([len(p) for p in literals]):13,.0f} "
+          f"{timed(to_pgvector, list(wire)):10,.0f} {timed(parse_pgvector, literals):10,.0f}")
+    print(f"{'base64 float32':<22} {np.mean([len(p) for p in base64_payloads]):13,.0f} "
+          f"{timed(lambda row: base64.b64encode(row.tobytes()), list(wire)):10,.0f} "
+          f"{timed(to_embedding, base64_payloads):10,.0f}")
+    drift = max(float(np.abs(parse_pgvector(literal) - row).max()) for literal, row in zip(literals, wire))
+    print(f"pgvector literal round-trip max error: {drift:.2e}")
+
+    # Recall per precision
+    user_id = uuid4()
+    rows = [{"id": str(i), "content": "", "tags": [], "message_timestamp": None, "vector_embedding": vector}
+            for i, vector in enumerate(vectors)]
+    exact_vectors = {row["id"]: row["vector_embedding"] for row in rows}
+
+    async def loader(_user_id):
+        return rows
+
+    async def fetch_vectors(ids):
+        return {message_id: exact_vectors[message_id] for message_id in ids}
+
+    queries = []
+    for _ in range(args.queries):
+        base = vectors[int(rng.integers(0, args.count))].astype(np.float64)
+        queries.append(unit(base + 2 * args.spread * rng.standard_normal(args.dims)))
+    reference = vectors.astype(np.float64)
+    expected = []
+    for query in queries:
+        scores = reference @ query
+        order = np.argsort(scores)[::-1][:args.limit]
+        expected.append({str(i) for i in order if scores[i] > args.threshold})
+
+    print(f"\n{'precision':<16} {'MB':>7} {'ms/query':>9} {'recall@' + str(args.limit):>10}")
+    for precision, fetcher in [("float32", None), ("float16", None), ("int8", None), ("int8", fetch_vectors)]:
+        index = VectorIndex(max_users=1, max_vectors=args.count, ttl_seconds=3600,
+                            dimensions=args.dims, precision=precision)
+        await index.search(user_id, queries[0], 1, args.threshold, loader)
+
+        recall, seconds = [], 0.0
+        for query, wanted in zip(queries, expected):
+            started = time.perf_counter()
+            results = await index.search(user_id, query, args.limit, args.threshold, loader,
+                                         fetch_vectors=fetcher)
+            seconds += time.perf_counter() - started
+            found = {result["id"] for result in results}
+            recall.append(len(found & wanted) / len(wanted) if wanted else 1.0)
+
+        name = precision + (" + rerank" if fetcher else "")
+        print(f"{name:<16} {index.get_status()['memory_mb']:7.1f} {seconds / args.queries * 1000:9.2f} "
+              f"{np.mean(recall):10.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Regression cases for the deterministic rules of the local classifier.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.ai.local_classifier import LocalClassifier  # noqa: E402
+
+
+@pytest.fixture
+def classifier():
+    # No model file, so only the rules can answer
+    classifier = LocalClassifier(model_path=str(project_root / "models" / "missing.npz"))
+    classifier.enabled = True
+    return classifier
+
+
+@pytest.mark.parametrize("content", [
+    "remind me to call mom at 5pm",
+    "please remind me tomorrow about the rent",
+    "set a reminder for the dentist on Friday",
+    "set reminder: pay rent",
+    "Reminder: dentist tomorrow",
+    "reminder : water the plants",
+    "don't let me forget the keys",
+    "Dont let me forget to book flights",
+])
+def test_reminder_rule_alternatives(classifier, content):
+    result = classifier.classify(content)
+    assert result is not None
+    assert result.message_type == "reminder"
+
+
+@pytest.mark.parametrize("content", [
+    "remind meeting notes are in the drive",
+    "set reminders off for the weekend",
+    "reminders are annoying",
+])
+def test_reminder_rule_needs_whole_phrase(classifier, content):
+    assert classifier._match_rules(content) is None
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Train the local message classifier from logged GPT classifications.
+Reads CLASSIFICATION_LOG_PATH (written by the bot for every LLM
+classification), trains the TF-IDF + logistic regression model and saves it
+to LOCAL_CLASSIFIER_MODEL_PATH. Restart the bot to pick up the new model.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.ai.local_classifier import train_from_log  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="Classification log (default: settings.classification_log_path)")
+    parser.add_argument("--out", help="Model file (default: settings.local_classifier_model_path)")
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fraction of examples held out for evaluation")
+    args = parser.parse_args()
+
+    try:
+        report = train_from_log(args.log, args.out, holdout=args.holdout)
+    except (OSError, ValueError) as e:
+        print(f"❌ Training failed: {e}")
+        sys.exit(1)
+
+    print("✅ Local classifier trained")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()